@@ -0,0 +1,204 @@
+"""
+Representação colunar de atividades
+
+ActivityFrame guarda as atividades da Strava como colunas NumPy (numéricas
+com NaN/máscara para ausentes, objeto para texto e flags), construídas uma
+única vez a partir do JSON. Formatação de /activities, estatísticas e
+insights leem as mesmas colunas, sem copiar dicts a cada etapa; quem ainda
+espera dicts usa as ActivityRow (views com __slots__ sobre uma linha).
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+FLOAT_FIELDS = (
+    'distance', 'total_elevation_gain', 'average_speed', 'max_speed',
+    'average_heartrate', 'max_heartrate', 'average_cadence',
+)
+INT_FIELDS = (
+    'moving_time', 'elapsed_time', 'kudos_count', 'comment_count',
+    'athlete_count', 'photo_count',
+)
+OBJECT_FIELDS = (
+    'id', 'name', 'type', 'sport_type', 'start_date', 'start_date_local',
+    'timezone', 'location_city', 'location_state', 'location_country',
+    'trainer', 'commute', 'manual', 'private', 'flagged', 'workout_type',
+)
+FIELDS = OBJECT_FIELDS + FLOAT_FIELDS + INT_FIELDS
+
+# Campos de /activities (nome na resposta -> campo da Strava)
+EXPORT_FIELDS = (
+    ('id', 'id'), ('name', 'name'), ('type', 'type'), ('sport_type', 'sport_type'),
+    ('distance', 'distance'), ('moving_time', 'moving_time'), ('elapsed_time', 'elapsed_time'),
+    ('elevation_gain', 'total_elevation_gain'), ('average_speed', 'average_speed'),
+    ('max_speed', 'max_speed'), ('average_heartrate', 'average_heartrate'),
+    ('max_heartrate', 'max_heartrate'), ('average_cadence', 'average_cadence'),
+    ('start_date', 'start_date'), ('start_date_local', 'start_date_local'),
+    ('timezone', 'timezone'), ('location_city', 'location_city'),
+    ('location_state', 'location_state'), ('location_country', 'location_country'),
+    ('kudos_count', 'kudos_count'), ('comment_count', 'comment_count'),
+    ('athlete_count', 'athlete_count'), ('photo_count', 'photo_count'),
+    ('trainer', 'trainer'), ('commute', 'commute'), ('manual', 'manual'),
+    ('private', 'private'), ('flagged', 'flagged'), ('workout_type', 'workout_type'),
+)
+
+
+def parse_start_dates(dates: Sequence[Optional[str]]) -> np.ndarray:
+    """start_date ISO 8601 -> epoch (float, NaN quando ausente/inválido)"""
+    starts = np.full(len(dates), np.nan)
+    valid = [i for i, d in enumerate(dates) if d]
+    if not valid:
+        return starts
+
+    values = [dates[i] for i in valid]
+    # Caminho rápido: formato da Strava ('2025-11-20T06:00:00Z' ou sem fuso = UTC)
+    if all(len(d) == 19 or (len(d) == 20 and d[19] == 'Z') for d in values):
+        try:
+            parsed = np.array([d[:19] for d in values], dtype='datetime64[s]')
+            starts[valid] = parsed.astype(np.int64)
+            return starts
+        except ValueError:
+            pass
+
+    for i, d in zip(valid, values):
+        try:
+            dt = datetime.fromisoformat(d.replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        starts[i] = dt.timestamp()
+    return starts
+
+
+class ActivityRow:
+    """View de uma linha do ActivityFrame com a interface de leitura de um dict"""
+
+    __slots__ = ('_frame', '_index')
+
+    def __init__(self, frame: 'ActivityFrame', index: int):
+        self._frame = frame
+        self._index = index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._frame.value(key, self._index)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._frame.columns:
+            raise KeyError(key)
+        return self._frame.value(key, self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self._frame.value(key, self._index) for key in FIELDS}
+
+
+class ActivityFrame:
+    """Atividades em colunas NumPy"""
+
+    __slots__ = ('columns', 'valid', 'start', 'sport', 'sport_names', '_size')
+
+    def __init__(self, columns: Dict[str, np.ndarray], valid: Dict[str, np.ndarray],
+                 start: np.ndarray, sport: np.ndarray, sport_names: List[str]):
+        self.columns = columns
+        self.valid = valid          # máscara de presença das colunas inteiras
+        self.start = start          # start_date em epoch (NaN se ausente)
+        self.sport = sport          # código do esporte (sport_type, type ou 'Unknown')
+        self.sport_names = sport_names
+        self._size = len(start)
+
+    @classmethod
+    def from_strava(cls, activities: Sequence[Dict[str, Any]]) -> 'ActivityFrame':
+        """Constrói as colunas a partir do JSON de /athlete/activities (uma passada por campo)"""
+        n = len(activities)
+        columns: Dict[str, np.ndarray] = {}
+        valid: Dict[str, np.ndarray] = {}
+
+        for key in OBJECT_FIELDS:
+            column = np.empty(n, dtype=object)
+            column[:] = [a.get(key) for a in activities]
+            columns[key] = column
+        for key in FLOAT_FIELDS:
+            columns[key] = np.array([a.get(key) for a in activities], dtype=float)
+        for key in INT_FIELDS:
+            raw = [a.get(key) for a in activities]
+            valid[key] = np.fromiter((v is not None for v in raw), bool, n)
+            columns[key] = np.fromiter((v or 0 for v in raw), np.int64, n)
+
+        # Código por esporte, na ordem da primeira aparição
+        codes: Dict[str, int] = {}
+        names = (a.get('sport_type', a.get('type', 'Unknown')) for a in activities)
+        sport = np.fromiter((codes.setdefault(name, len(codes)) for name in names), np.int64, n)
+        return cls(columns, valid, parse_start_dates(columns['start_date']), sport, list(codes))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[ActivityRow]:
+        for i in range(self._size):
+            yield ActivityRow(self, i)
+
+    def __getitem__(self, index: int) -> ActivityRow:
+        if not -self._size <= index < self._size:
+            raise IndexError(index)
+        return ActivityRow(self, index % self._size)
+
+    def value(self, key: str, index: int) -> Any:
+        """Valor Python de uma célula (None se ausente)"""
+        column = self.columns.get(key)
+        if column is None:
+            return None
+        if key in self.valid:
+            return int(column[index]) if self.valid[key][index] else None
+        value = column[index]
+        if column.dtype == float:
+            return None if value != value else float(value)
+        return value
+
+    def values(self, key: str) -> List[Any]:
+        """Coluna inteira como lista de valores Python (None onde ausente)"""
+        column = self.columns[key]
+        values = column.tolist()
+        if key in self.valid:
+            missing = ~self.valid[key]
+        elif column.dtype == float:
+            missing = np.isnan(column)
+        else:
+            return values
+        for i in np.flatnonzero(missing).tolist():
+            values[i] = None
+        return values
+
+    def numeric(self, key: str, fill: float = 0) -> np.ndarray:
+        """Coluna numérica com ausentes (e, como nos dicts, valores falsy) trocados por fill"""
+        column = self.columns[key]
+        if key in self.valid:
+            return np.where(self.valid[key], column, fill)
+        return np.where(np.isnan(column), fill, column)
+
+    def select(self, mask: np.ndarray) -> 'ActivityFrame':
+        """Subconjunto das linhas (máscara booleana ou índices)"""
+        columns = {key: column[mask] for key, column in self.columns.items()}
+        valid = {key: column[mask] for key, column in self.valid.items()}
+        return ActivityFrame(columns, valid, self.start[mask], self.sport[mask], self.sport_names)
+
+    def where_sport_type(self, sport_type: Optional[str]) -> 'ActivityFrame':
+        """Filtra pelo campo sport_type (sem filtro quando None)"""
+        if not sport_type:
+            return self
+        return self.select(self.columns['sport_type'] == sport_type)
+
+    def to_records(self, fields: Sequence = EXPORT_FIELDS) -> List[Dict[str, Any]]:
+        """
+        Lista de dicts para serialização
+
+        Args:
+            fields: pares (nome na saída, coluna)
+        """
+        names = [name for name, _ in fields]
+        columns = [self.values(key) for _, key in fields]
+        return [dict(zip(names, row)) for row in zip(*columns)]
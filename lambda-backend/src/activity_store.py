@@ -0,0 +1,355 @@
+"""
+Armazenamento persistente de atividades por atleta
+
+As atividades da Strava são praticamente só-inclusão, então em vez de
+baixar a janela inteira a cada /stats ou /insights mantemos uma cópia por
+atleta e sincronizamos apenas o que começou depois da atividade mais
+recente já armazenada.
+
+Backends:
+    - DynamoDBActivityStore: tabela DYNAMODB_TABLE_ACTIVITIES (user_id, activity_id),
+      consultas por período no índice local START_TS_INDEX (user_id, start_ts)
+    - SQLiteActivityStore: arquivo local, para desenvolvimento e testes
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import (
+    ACTIVITY_STORE_BACKEND,
+    ACTIVITY_STORE_SQLITE_PATH,
+    ACTIVITY_SYNC_MIN_INTERVAL,
+    ACTIVITY_SYNC_OVERLAP_SECONDS,
+    AWS_REGION,
+    DYNAMODB_TABLE_ACTIVITIES,
+)
+from page_fetcher import PrefetchingPageFetcher
+from rollups import start_timestamp, update_rollups
+
+logger = logging.getLogger(__name__)
+
+# activity_id reservados para o estado de sincronização e os rollups do atleta
+SYNC_STATE_ID = '#sync'
+ROLLUP_PREFIX = '#rollup#'
+
+# LSI (user_id, start_ts) da tabela de atividades; esparso: os itens de
+# sincronização e de rollup não têm start_ts e ficam fora dele
+START_TS_INDEX = 'UserStartIndex'
+
+
+class ActivityStore:
+    """Interface comum dos backends"""
+
+    def upsert(self, user_id: str, activities: Iterable[Dict[str, Any]]) -> int:
+        """Grava (ou sobrescreve) atividades; retorna quantas foram gravadas"""
+        raise NotImplementedError
+
+    def query(self, user_id: str, after: Optional[int] = None, before: Optional[int] = None,
+              newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        Lista atividades com after < start < before (mesma semântica da Strava)
+
+        Args:
+            user_id: ID do usuário
+            after: Unix timestamp - atividades posteriores
+            before: Unix timestamp - atividades anteriores
+            newest_first: Ordem decrescente de início (padrão: crescente)
+        """
+        raise NotImplementedError
+
+    def get_sync_state(self, user_id: str) -> Optional[Dict[str, int]]:
+        """Retorna {'latest_start_ts', 'synced_at'} ou None se nunca sincronizou"""
+        raise NotImplementedError
+
+    def set_sync_state(self, user_id: str, latest_start_ts: int, synced_at: int) -> None:
+        raise NotImplementedError
+
+    def put_rollups(self, user_id: str, buckets: Dict[str, Dict[str, Any]]) -> None:
+        """Grava buckets de rollup (ver rollups.py), sobrescrevendo os existentes"""
+        raise NotImplementedError
+
+    def get_rollups(self, user_id: str, start: str, end: str) -> Dict[str, Dict[str, Any]]:
+        """Buckets com start <= chave <= end"""
+        raise NotImplementedError
+
+
+class DynamoDBActivityStore(ActivityStore):
+    """Atividades na tabela strava-activities (uma linha por atividade)"""
+
+    def __init__(self, table=None):
+        if table is None:
+            import boto3
+            resource = boto3.resource('dynamodb', region_name=AWS_REGION)
+            table = resource.Table(DYNAMODB_TABLE_ACTIVITIES)
+        self.table = table
+
+    def upsert(self, user_id: str, activities: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        with self.table.batch_writer(overwrite_by_pkeys=['user_id', 'activity_id']) as batch:
+            for activity in activities:
+                batch.put_item(Item={
+                    'user_id': user_id,
+                    'activity_id': str(activity['id']),
+                    'start_ts': start_timestamp(activity),
+                    # JSON evita a conversão float -> Decimal do boto3
+                    'data': json.dumps(activity)
+                })
+                count += 1
+        return count
+
+    def query(self, user_id: str, after: Optional[int] = None, before: Optional[int] = None,
+              newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        Consulta só o intervalo pedido no índice START_TS_INDEX, já ordenado
+        (ConsistentRead: atividades recém-gravadas pela sincronização
+        aparecem na mesma requisição)
+        """
+        from boto3.dynamodb.conditions import Key
+
+        # start_ts é inteiro: after < start < before vira um intervalo fechado
+        low = None if after is None else math.floor(after) + 1
+        high = None if before is None else math.ceil(before) - 1
+        condition = Key('user_id').eq(user_id)
+        if low is not None and high is not None:
+            if low > high:
+                return []
+            condition = condition & Key('start_ts').between(low, high)
+        elif low is not None:
+            condition = condition & Key('start_ts').gte(low)
+        elif high is not None:
+            condition = condition & Key('start_ts').lte(high)
+
+        kwargs = {
+            'IndexName': START_TS_INDEX,
+            'KeyConditionExpression': condition,
+            'ScanIndexForward': not newest_first,
+            'ConsistentRead': True,
+            'ProjectionExpression': '#d',
+            'ExpressionAttributeNames': {'#d': 'data'},
+        }
+        activities = []
+        while True:
+            response = self.table.query(**kwargs)
+            activities.extend(json.loads(item['data']) for item in response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return activities
+
+    def get_sync_state(self, user_id: str) -> Optional[Dict[str, int]]:
+        response = self.table.get_item(Key={'user_id': user_id, 'activity_id': SYNC_STATE_ID})
+        item = response.get('Item')
+        if not item:
+            return None
+        return {
+            'latest_start_ts': int(item['latest_start_ts']),
+            'synced_at': int(item['synced_at'])
+        }
+
+    def set_sync_state(self, user_id: str, latest_start_ts: int, synced_at: int) -> None:
+        self.table.put_item(Item={
+            'user_id': user_id,
+            'activity_id': SYNC_STATE_ID,
+            'latest_start_ts': latest_start_ts,
+            'synced_at': synced_at
+        })
+
+    def put_rollups(self, user_id: str, buckets: Dict[str, Dict[str, Any]]) -> None:
+        with self.table.batch_writer(overwrite_by_pkeys=['user_id', 'activity_id']) as batch:
+            for key, bucket in buckets.items():
+                batch.put_item(Item={
+                    'user_id': user_id,
+                    'activity_id': ROLLUP_PREFIX + key,
+                    'data': json.dumps(bucket)
+                })
+
+    def get_rollups(self, user_id: str, start: str, end: str) -> Dict[str, Dict[str, Any]]:
+        from boto3.dynamodb.conditions import Key
+
+        kwargs = {
+            'KeyConditionExpression': Key('user_id').eq(user_id)
+            & Key('activity_id').between(ROLLUP_PREFIX + start, ROLLUP_PREFIX + end)
+        }
+        buckets = {}
+        while True:
+            response = self.table.query(**kwargs)
+            for item in response.get('Items', []):
+                buckets[item['activity_id'][len(ROLLUP_PREFIX):]] = json.loads(item['data'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return buckets
+
+
+class SQLiteActivityStore(ActivityStore):
+    """Atividades num arquivo SQLite local"""
+
+    def __init__(self, path: str = ACTIVITY_STORE_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS activities ('
+                ' user_id TEXT NOT NULL,'
+                ' activity_id TEXT NOT NULL,'
+                ' start_ts INTEGER NOT NULL,'
+                ' data TEXT NOT NULL,'
+                ' PRIMARY KEY (user_id, activity_id))'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_activities_start ON activities (user_id, start_ts)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                ' user_id TEXT PRIMARY KEY,'
+                ' latest_start_ts INTEGER NOT NULL,'
+                ' synced_at INTEGER NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS rollups ('
+                ' user_id TEXT NOT NULL,'
+                ' bucket TEXT NOT NULL,'
+                ' data TEXT NOT NULL,'
+                ' PRIMARY KEY (user_id, bucket))'
+            )
+
+    def upsert(self, user_id: str, activities: Iterable[Dict[str, Any]]) -> int:
+        rows = [
+            (user_id, str(a['id']), start_timestamp(a), json.dumps(a))
+            for a in activities
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO activities (user_id, activity_id, start_ts, data) '
+                'VALUES (?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def query(self, user_id: str, after: Optional[int] = None, before: Optional[int] = None,
+              newest_first: bool = False) -> List[Dict[str, Any]]:
+        sql = 'SELECT data FROM activities WHERE user_id = ?'
+        params: List[Any] = [user_id]
+        if after is not None:
+            sql += ' AND start_ts > ?'
+            params.append(after)
+        if before is not None:
+            sql += ' AND start_ts < ?'
+            params.append(before)
+        sql += ' ORDER BY start_ts DESC' if newest_first else ' ORDER BY start_ts'
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get_sync_state(self, user_id: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT latest_start_ts, synced_at FROM sync_state WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'latest_start_ts': row[0], 'synced_at': row[1]}
+
+    def set_sync_state(self, user_id: str, latest_start_ts: int, synced_at: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state (user_id, latest_start_ts, synced_at) '
+                'VALUES (?, ?, ?)',
+                (user_id, latest_start_ts, synced_at)
+            )
+
+    def put_rollups(self, user_id: str, buckets: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO rollups (user_id, bucket, data) VALUES (?, ?, ?)',
+                [(user_id, key, json.dumps(bucket)) for key, bucket in buckets.items()]
+            )
+
+    def get_rollups(self, user_id: str, start: str, end: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT bucket, data FROM rollups WHERE user_id = ? AND bucket BETWEEN ? AND ? '
+                'ORDER BY bucket',
+                (user_id, start, end)
+            ).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_store: Optional[ActivityStore] = None
+_store_lock = threading.Lock()
+
+
+def get_activity_store() -> ActivityStore:
+    """Retorna o store do processo, conforme ACTIVITY_STORE_BACKEND"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if ACTIVITY_STORE_BACKEND == 'sqlite':
+                    _store = SQLiteActivityStore()
+                else:
+                    _store = DynamoDBActivityStore()
+                logger.info(f"Activity store: {ACTIVITY_STORE_BACKEND}")
+    return _store
+
+
+def sync_activities(store: ActivityStore,
+                    client,
+                    user_id: str,
+                    min_interval: int = ACTIVITY_SYNC_MIN_INTERVAL,
+                    overlap: int = ACTIVITY_SYNC_OVERLAP_SECONDS,
+                    force: bool = False) -> int:
+    """
+    Traz para o store as atividades novas do atleta
+
+    Na primeira vez baixa o histórico completo (com prefetch de páginas);
+    depois só pede à Strava o que começou após a atividade mais recente
+    armazenada (menos a janela de sobreposição), atualizando os rollups dos
+    dias e meses afetados. Se a última sincronização
+    tem menos de min_interval segundos, não chama a Strava.
+
+    Args:
+        store: Backend de armazenamento
+        client: StravaClient autenticado
+        user_id: ID do usuário
+        min_interval: Intervalo mínimo entre sincronizações (segundos)
+        overlap: Segundos re-buscados antes da atividade mais recente
+        force: Ignora min_interval
+
+    Returns:
+        Número de atividades recebidas da Strava
+    """
+    now = int(time.time())
+    state = store.get_sync_state(user_id)
+
+    if state and not force and now - state['synced_at'] < min_interval:
+        logger.debug(f"Sync recente para {user_id}, pulando")
+        return 0
+
+    if state is None:
+        logger.info(f"Sincronização completa de atividades: {user_id}")
+        activities = list(PrefetchingPageFetcher(client).iter_activities())
+        latest = 0
+    else:
+        latest = state['latest_start_ts']
+        after = max(latest - overlap, 0)
+        logger.info(f"Sincronização incremental de atividades: {user_id}, after={after}")
+        activities = list(client.iter_activities(after=after))
+
+    if activities:
+        store.upsert(user_id, activities)
+        update_rollups(store, user_id, activities)
+        latest = max(latest, max(start_timestamp(a) for a in activities))
+
+    store.set_sync_state(user_id, latest, now)
+    logger.info(f"{len(activities)} atividade(s) sincronizada(s) para {user_id}")
+    return len(activities)
@@ -0,0 +1,226 @@
+"""
+Cliente assíncrono da API Strava sobre httpx
+
+AsyncStravaClient tem a mesma interface do StravaClient (OAuth, atleta,
+stats, atividades, detalhe), com métodos async para serviços asyncio como
+o FastAPI não bloquearem o event loop. Cache LRU, TTLs por endpoint e
+controle de rate limit vêm do StravaClient; só o transporte muda: um
+httpx.AsyncClient com pool, reaproveitado pela vida da aplicação.
+
+Requer httpx (já é dependência do python-fastapi; a Lambda não usa este
+módulo).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+from config import HTTP_POOL_MAXSIZE, HTTP_TIMEOUT
+from rate_limit import Priority, RateLimitGovernor
+from singleflight import AsyncSingleFlight
+from throttle import Throttler
+from strava_client import StravaClient, _CACHE_MISS
+
+logger = logging.getLogger(__name__)
+
+
+def build_async_http(max_connections: int = HTTP_POOL_MAXSIZE,
+                     timeout: float = HTTP_TIMEOUT) -> httpx.AsyncClient:
+    """
+    Cria um httpx.AsyncClient com pool keep-alive
+
+    Deve ser criado uma vez (ex: no lifespan do FastAPI) e fechado com
+    aclose() no desligamento.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections),
+        timeout=timeout,
+        headers={"Accept": "application/json"},
+    )
+
+
+class AsyncStravaClient(StravaClient):
+    """Cliente assíncrono da API Strava (mesmo cache e rate limit do StravaClient)"""
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 access_token: Optional[str] = None,
+                 http: Optional[httpx.AsyncClient] = None,
+                 governor: Optional[RateLimitGovernor] = None,
+                 priority: str = Priority.INTERACTIVE,
+                 throttler: Optional[Throttler] = None,
+                 user_id: Optional[str] = None):
+        """
+        Args:
+            client_id: Strava App Client ID
+            client_secret: Strava App Client Secret
+            access_token: Token de acesso (opcional)
+            http: AsyncClient compartilhado (padrão: um próprio, fechado em aclose())
+            governor: Governador de rate limit; acquire() roda no event loop,
+                então use um com MemoryRateLimitStore (sem I/O)
+            priority: Prioridade das requisições deste cliente no governador
+            throttler: Throttler local (a espera roda numa thread, fora do loop)
+            user_id: Usuário dono do token, para o balde por usuário do throttler
+        """
+        self._owns_http = http is None
+        super().__init__(client_id, client_secret, access_token,
+                         session=http if http is not None else build_async_http(),
+                         governor=governor, priority=priority,
+                         throttler=throttler, user_id=user_id)
+        self._inflight = AsyncSingleFlight()
+
+    async def aclose(self) -> None:
+        """Fecha o AsyncClient se ele foi criado por este cliente"""
+        if self._owns_http:
+            await self.session.aclose()
+
+    async def __aenter__(self) -> "AsyncStravaClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def _post_token(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.session.post(self.TOKEN_URL, data=payload, timeout=10)
+        response.raise_for_status()
+
+        token_data = response.json()
+        self.access_token = token_data["access_token"]
+        return token_data
+
+    async def get_access_token(self, code: str, redirect_uri: str) -> Dict[str, Any]:
+        """Troca authorization code por access token"""
+        token_data = await self._post_token({
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": redirect_uri
+        })
+        logger.info("Access token obtido com sucesso")
+        return token_data
+
+    async def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
+        """Renova token expirado"""
+        token_data = await self._post_token({
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token"
+        })
+        logger.info("Token renovado com sucesso")
+        return token_data
+
+    async def _request(self, method: str, endpoint: str,
+                       use_cache: bool = True, **kwargs) -> Any:
+        """Versão async de StravaClient._request (cache + coalescência)"""
+        self._total_requests += 1
+
+        if method == "GET" and use_cache:
+            cache_key = self._cache_key(method, endpoint, **kwargs)
+            cached = self._cache.get(cache_key, _CACHE_MISS)
+            if cached is not _CACHE_MISS:
+                logger.debug(f"Cache HIT: {endpoint}")
+                return cached
+
+            return await self._inflight.do(
+                cache_key,
+                lambda: self._send(method, endpoint, cache_key=cache_key, **kwargs)
+            )
+
+        return await self._send(method, endpoint, **kwargs)
+
+    async def _send(self, method: str, endpoint: str,
+                    cache_key: Optional[str] = None, **kwargs) -> Any:
+        """Executa a requisição sem bloquear o event loop"""
+        if self.throttler is not None:
+            await asyncio.to_thread(self._throttle)
+        delay = self._acquire_rate_limit()
+        if delay is not None:
+            logger.warning(f"Rate limit atingido. Aguardando {delay:.0f}s")
+            await asyncio.sleep(delay + 1)
+
+        url = f"{self.BASE_URL}{endpoint}"
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+
+        try:
+            response = await self.session.request(method, url, headers=headers,
+                                                  timeout=10, **kwargs)
+        except httpx.HTTPError as e:
+            logger.error(f"Erro na requisição: {e}")
+            raise
+
+        self._update_rate_limit(response.headers)
+        self._check_rate_limited(response)
+        response.raise_for_status()
+        data = response.json()
+        self._store_response(endpoint, cache_key, data, response.content)
+        return data
+
+    async def get_athlete(self, athlete_id: Optional[int] = None) -> Dict[str, Any]:
+        """Obtém dados do atleta autenticado ou específico"""
+        endpoint = "/athlete" if athlete_id is None else f"/athletes/{athlete_id}"
+        return await self._request("GET", endpoint)
+
+    async def get_athlete_stats(self, athlete_id: int) -> Dict[str, Any]:
+        """Obtém estatísticas agregadas do atleta"""
+        return await self._request("GET", f"/athletes/{athlete_id}/stats")
+
+    async def get_activities(self,
+                             before: Optional[int] = None,
+                             after: Optional[int] = None,
+                             page: int = 1,
+                             per_page: int = 30) -> List[Dict[str, Any]]:
+        """Lista atividades do atleta autenticado"""
+        params = {
+            "page": page,
+            "per_page": min(per_page, 200)
+        }
+
+        if before:
+            params["before"] = before
+        if after:
+            params["after"] = after
+
+        return await self._request("GET", "/athlete/activities", params=params)
+
+    async def iter_activities(self,
+                              after: Optional[int] = None,
+                              before: Optional[int] = None,
+                              per_page: int = 200,
+                              on_page: Optional[Callable[[Dict[str, Any]], None]] = None
+                              ) -> AsyncIterator[Dict[str, Any]]:
+        """Itera (async for) sobre todas as atividades do período, página a página"""
+        per_page = min(per_page, 200)
+        self.last_page_timings = []
+        page = 1
+
+        while True:
+            start = time.perf_counter()
+            activities = await self.get_activities(before=before, after=after,
+                                                   page=page, per_page=per_page)
+            timing = {
+                "page": page,
+                "count": len(activities),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+            self.last_page_timings.append(timing)
+            if on_page is not None:
+                on_page(timing)
+
+            for activity in activities:
+                yield activity
+
+            if len(activities) < per_page:
+                break
+            page += 1
+
+    async def get_activity(self, activity_id: int,
+                           include_all_efforts: bool = False) -> Dict[str, Any]:
+        """Obtém detalhes de uma atividade específica"""
+        params = {"include_all_efforts": include_all_efforts}
+        return await self._request("GET", f"/activities/{activity_id}", params=params)
@@ -3,11 +3,9 @@ Handler para OAuth Callback - POST /auth/callback
 """
 import json
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Callable, Optional, TypeVar
 import requests
-from requests_oauthlib import OAuth2Session
-from urllib.parse import urlparse, parse_qs
-import boto3
 
 from config import (
     STRAVA_CLIENT_ID,
@@ -15,15 +13,31 @@ from config import (
     STRAVA_TOKEN_URL,
     STRAVA_API_URL,
     DYNAMODB_TABLE_USERS,
-    AWS_REGION
+    HTTP_TIMEOUT,
+    TOKEN_REFRESH_LOCK_WAIT
 )
-from utils import response_success, response_error, TokenManager
+from utils import response_success, response_error, TokenManager, dynamodb
+from transport import get_session
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
 token_manager = TokenManager()
+http_session = get_session()
+
+T = TypeVar('T')
+
+
+# Intervalo entre leituras do token enquanto outra invocação o renova
+LOCK_POLL_INTERVAL = 0.25
+
+
+class TokenRefreshError(Exception):
+    """Falha ao renovar o access token de um usuário"""
+
+
+class TokenRefreshInProgress(TokenRefreshError):
+    """Outra invocação está renovando o token e não terminou a tempo"""
 
 
 def lambda_handler(event, context):
@@ -49,14 +63,15 @@ def lambda_handler(event, context):
         
         # Trocar code por access_token
         logger.info("Trocando authorization code por access token...")
-        token_response = requests.post(
+        token_response = http_session.post(
             STRAVA_TOKEN_URL,
             data={
                 'client_id': STRAVA_CLIENT_ID,
                 'client_secret': STRAVA_CLIENT_SECRET,
                 'code': code,
                 'grant_type': 'authorization_code'
-            }
+            },
+            timeout=HTTP_TIMEOUT
         )
         
         if token_response.status_code != 200:
@@ -103,30 +118,66 @@ def lambda_handler(event, context):
         return response_error(f'Internal server error: {str(e)}', 500, 'INTERNAL_ERROR')
 
 
-def refresh_access_token(user_id: str) -> Dict[str, Any]:
-    """Renova access token usando refresh token"""
+def refresh_access_token(user_id: str,
+                         tokens: Optional[Dict[str, Any]] = None,
+                         wait: float = TOKEN_REFRESH_LOCK_WAIT) -> Dict[str, Any]:
+    """
+    Renova access token usando refresh token
+    
+    Só uma renovação por usuário acontece por vez: quem ganha o lock no
+    DynamoDB chama a Strava e salva o token novo (liberando o lock na mesma
+    escrita); os demais esperam até wait segundos pelo token salvo.
+    
+    Args:
+        user_id: Usuário dono do token
+        tokens: Tokens atuais, se já lidos (padrão: lidos do DynamoDB)
+        wait: Segundos de espera se outra invocação está renovando
+    
+    Raises:
+        TokenRefreshInProgress: se a outra renovação não terminou em wait
+            segundos, ou se o lock foi perdido antes de salvar e nenhum token
+            novo foi salvo por quem o tomou
+    """
     try:
-        tokens = token_manager.get_token(user_id)
+        if tokens is None:
+            tokens = token_manager.get_token(user_id)
         if not tokens or 'refresh_token' not in tokens:
             raise Exception("Refresh token not found")
         
-        logger.info(f"Renovando access token para usuário: {user_id}")
+        owner = token_manager.try_acquire_refresh_lock(user_id)
+        if owner is None:
+            return wait_for_refreshed_token(user_id, tokens, wait)
         
-        refresh_response = requests.post(
-            STRAVA_TOKEN_URL,
-            data={
-                'client_id': STRAVA_CLIENT_ID,
-                'client_secret': STRAVA_CLIENT_SECRET,
-                'refresh_token': tokens['refresh_token'],
-                'grant_type': 'refresh_token'
-            }
-        )
+        logger.info(f"Renovando access token para usuário: {user_id}")
         
-        if refresh_response.status_code != 200:
-            raise Exception(f"Failed to refresh token: {refresh_response.text}")
+        try:
+            refresh_response = http_session.post(
+                STRAVA_TOKEN_URL,
+                data={
+                    'client_id': STRAVA_CLIENT_ID,
+                    'client_secret': STRAVA_CLIENT_SECRET,
+                    'refresh_token': tokens['refresh_token'],
+                    'grant_type': 'refresh_token'
+                },
+                timeout=HTTP_TIMEOUT
+            )
+            
+            if refresh_response.status_code != 200:
+                raise Exception(f"Failed to refresh token: {refresh_response.text}")
+        except Exception:
+            token_manager.release_refresh_lock(user_id, owner)
+            raise
         
         new_tokens = refresh_response.json()
-        token_manager.save_token(user_id, new_tokens)
+        if not token_manager.save_token(user_id, new_tokens, lock_owner=owner):
+            # Lock expirado e tomado por outra invocação (ou erro na escrita):
+            # os tokens novos não foram salvos, então vale o que está no DynamoDB
+            logger.warning(f"Token renovado mas não salvo (lock perdido): {user_id}")
+            token_manager.release_refresh_lock(user_id, owner)
+            stored = token_manager.get_token(user_id)
+            if stored and stored.get('access_token') != tokens.get('access_token'):
+                return stored
+            raise TokenRefreshInProgress(f"Refresh lock lost for user {user_id}")
         
         logger.info(f"Token renovado com sucesso para: {user_id}")
         return new_tokens
@@ -134,3 +185,53 @@ def refresh_access_token(user_id: str) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Erro ao renovar token: {str(e)}")
         raise
+
+
+def wait_for_refreshed_token(user_id: str, tokens: Dict[str, Any], wait: float) -> Dict[str, Any]:
+    """
+    Espera outra invocação salvar um access token diferente do atual
+    
+    Raises:
+        TokenRefreshInProgress: se nada mudou em wait segundos
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        latest = token_manager.get_token(user_id)
+        if latest and latest.get('access_token') != tokens.get('access_token'):
+            logger.info(f"Token renovado por outra invocação: {user_id}")
+            return latest
+        if time.monotonic() >= deadline:
+            raise TokenRefreshInProgress(f"Token refresh in progress for user {user_id}")
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def fetch_with_token_refresh(user_id: str, client, fetch: Callable[[Any], T],
+                             refresh: Optional[Callable[[str], Dict[str, Any]]] = None) -> T:
+    """
+    Executa fetch(client); se a Strava responder 401, renova o token e
+    tenta mais uma vez
+
+    Args:
+        user_id: Usuário dono do token
+        client: StravaClient já configurado com o access token atual
+        fetch: Função que faz as chamadas à API usando o client
+        refresh: Renovação a usar (padrão: refresh_access_token)
+
+    Raises:
+        TokenRefreshError: se a renovação do token falhar
+        requests.exceptions.HTTPError: para outros erros da API
+    """
+    try:
+        return fetch(client)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 401:
+            raise
+
+    logger.info("Token expirado, renovando...")
+    try:
+        new_tokens = (refresh or refresh_access_token)(user_id)
+    except Exception as e:
+        raise TokenRefreshError(str(e)) from e
+
+    client.access_token = new_tokens.get('access_token')
+    return fetch(client)
@@ -31,9 +31,84 @@ CACHE_TTL_ATHLETE = 3600  # 1 hora
 CACHE_TTL_ACTIVITIES = 1800  # 30 minutos
 CACHE_TTL_STATS = 7200  # 2 horas
 
+# Stale-while-revalidate: por quantos segundos após expirar um item do cache
+# DynamoDB ainda pode ser servido (marcado como stale) enquanto é renovado
+CACHE_MAX_STALENESS = {
+    'activities': int(os.getenv('CACHE_MAX_STALENESS_ACTIVITIES', '900')),
+    'stats': int(os.getenv('CACHE_MAX_STALENESS_STATS', '3600')),
+}
+CACHE_REFRESH_LEASE_SECONDS = int(os.getenv('CACHE_REFRESH_LEASE_SECONDS', '60'))
+
+# Tokens: renovação antes de expirar e cache em memória entre invocações quentes
+TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN', '300'))
+TOKEN_MEMORY_TTL = int(os.getenv('TOKEN_MEMORY_TTL', '900'))
+TOKEN_MEMORY_MAX_ENTRIES = int(os.getenv('TOKEN_MEMORY_MAX_ENTRIES', '1024'))
+# Uma renovação por usuário por vez (lock com escrita condicional no DynamoDB)
+TOKEN_REFRESH_LOCK_SECONDS = int(os.getenv('TOKEN_REFRESH_LOCK_SECONDS', '30'))
+TOKEN_REFRESH_LOCK_WAIT = float(os.getenv('TOKEN_REFRESH_LOCK_WAIT', '5'))
+
+# Agendador de renovação: tokens que expiram em até TOKEN_REFRESH_WINDOW segundos.
+# A Strava só emite um token novo quando falta menos de 1 hora para expirar, e a
+# janela precisa cobrir o intervalo do agendamento (serverless.yml)
+TOKEN_REFRESH_WINDOW = int(os.getenv('TOKEN_REFRESH_WINDOW', '1800'))
+TOKEN_REFRESH_BATCH_SIZE = int(os.getenv('TOKEN_REFRESH_BATCH_SIZE', '25'))
+TOKEN_REFRESH_WORKERS = int(os.getenv('TOKEN_REFRESH_WORKERS', '4'))
+
+# Cache em memória do StravaClient (processos de longa duração)
+CLIENT_CACHE_MAX_ENTRIES = int(os.getenv('CLIENT_CACHE_MAX_ENTRIES', '512'))
+CLIENT_CACHE_MAX_BYTES = int(os.getenv('CLIENT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# HTTP (sessão compartilhada entre invocações)
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', '0.3'))
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', '10'))
+
+# Armazenamento local de atividades (sincronização incremental)
+# 'dynamodb' usa DYNAMODB_TABLE_ACTIVITIES; 'sqlite' é para execuções locais
+ACTIVITY_STORE_BACKEND = os.getenv('ACTIVITY_STORE_BACKEND', 'dynamodb')
+ACTIVITY_STORE_SQLITE_PATH = os.getenv('ACTIVITY_STORE_SQLITE_PATH', '/tmp/strava-activities.db')
+ACTIVITY_SYNC_MIN_INTERVAL = int(os.getenv('ACTIVITY_SYNC_MIN_INTERVAL', '300'))
+# Janela de sobreposição para pegar uploads atrasados (ex: relógio sincronizado depois)
+ACTIVITY_SYNC_OVERLAP_SECONDS = int(os.getenv('ACTIVITY_SYNC_OVERLAP_SECONDS', '86400'))
+
+# Rate limit da Strava (padrões do app até as respostas informarem os reais)
+STRAVA_RATE_LIMIT_SHORT = int(os.getenv('STRAVA_RATE_LIMIT_SHORT', '200'))  # por 15 minutos
+STRAVA_RATE_LIMIT_DAILY = int(os.getenv('STRAVA_RATE_LIMIT_DAILY', '2000'))
+# Fração de cada janela que cada prioridade pode consumir
+RATE_LIMIT_INTERACTIVE_SHARE = float(os.getenv('RATE_LIMIT_INTERACTIVE_SHARE', '0.98'))
+RATE_LIMIT_BACKGROUND_SHARE = float(os.getenv('RATE_LIMIT_BACKGROUND_SHARE', '0.8'))
+RATE_LIMIT_BACKFILL_SHARE = float(os.getenv('RATE_LIMIT_BACKFILL_SHARE', '0.6'))
+# Contadores compartilhados entre containers (DynamoDB); 'false' conta só no processo
+RATE_LIMIT_SHARED = os.getenv('RATE_LIMIT_SHARED', 'true').lower() == 'true'
+# Com o orçamento baixo, itens do cache expirados há até isso ainda são servidos
+RATE_LIMIT_DEGRADED_STALENESS = int(os.getenv('RATE_LIMIT_DEGRADED_STALENESS', '86400'))
+# budget_low relê o uso compartilhado no máximo a cada isso (segundos)
+RATE_LIMIT_USAGE_REFRESH = float(os.getenv('RATE_LIMIT_USAGE_REFRESH', '5'))
+# Itens do cache continuam no DynamoDB por isso depois de expirar (o TTL da
+# tabela apaga por expires_at), para ainda servirem como stale ou degradados
+CACHE_RETENTION_SECONDS = max(RATE_LIMIT_DEGRADED_STALENESS, *CACHE_MAX_STALENESS.values())
+# Clientes sem governador só esperam o reset da janela se ele vier em até isso
+RATE_LIMIT_MAX_SLEEP = int(os.getenv('RATE_LIMIT_MAX_SLEEP', '60'))
+
+# Throttler local (token bucket global e por usuário, filas por prioridade)
+# Global: a janela de 15 minutos espalhada uniformemente, com rajada curta
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'false').lower() == 'true'
+THROTTLE_GLOBAL_RATE = float(os.getenv('THROTTLE_GLOBAL_RATE', str(STRAVA_RATE_LIMIT_SHORT / 900)))
+THROTTLE_GLOBAL_BURST = int(os.getenv('THROTTLE_GLOBAL_BURST', '20'))
+# Por usuário: rajada cobre um dashboard (~15 páginas), depois 1 a cada 20s
+THROTTLE_USER_RATE = float(os.getenv('THROTTLE_USER_RATE', '0.05'))
+THROTTLE_USER_BURST = int(os.getenv('THROTTLE_USER_BURST', '15'))
+# Espera máxima na fila antes de desistir com RateLimitExceeded
+THROTTLE_MAX_WAIT = float(os.getenv('THROTTLE_MAX_WAIT', '30'))
+# Baldes de usuários ociosos (cheios) são descartados acima disso
+THROTTLE_MAX_USERS = int(os.getenv('THROTTLE_MAX_USERS', '1024'))
+
 # Limites
 MAX_ACTIVITIES_PER_REQUEST = 50
 PAGINATION_SIZE = 20
+PAGE_PREFETCH_WORKERS = int(os.getenv('PAGE_PREFETCH_WORKERS', '4'))
 
 # ML Models
 ML_MODEL_PATH = os.getenv('ML_MODEL_PATH', '/opt/ml/model')
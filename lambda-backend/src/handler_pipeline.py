@@ -0,0 +1,414 @@
+"""
+Pipeline compartilhado dos handlers HTTP
+
+Os handlers de atividades, estatísticas, insights e atleta repetiam a mesma
+sequência: extrair user_id, ler o token, montar o client, renovar o token
+depois de um 401 da Strava e repetir a chamada, tratar erros. build_handler()
+monta o lambda_handler a partir de middlewares encadeados e de uma função
+handle(ctx) que contém só a lógica do endpoint:
+
+- timing: duração total e por etapa (ctx.timer) no header Server-Timing e
+  numa linha de log JSON por invocação
+- errors: exceções conhecidas viram as respostas de erro padronizadas
+  (inclusive 429 RATE_LIMITED com Retry-After)
+- degraded_cache: sem orçamento depois de um MISS, repete o handler
+  aceitando itens do cache expirados há até RATE_LIMIT_DEGRADED_STALENESS
+- require_user: user_id obrigatório no path
+
+Tokens ficam num cache em memória entre invocações quentes e são renovados
+antes de expirar (TOKEN_REFRESH_MARGIN), em vez de esperar o 401: um token
+expirado custava 401 + renovação + nova chamada, agora custa renovação +
+chamada. A renovação depois de um 401 continua como proteção (token
+revogado, relógio adiantado).
+
+Todas as chamadas à Strava passam pelo governador de rate limit
+(rate_limit.py). Com o orçamento baixo (uso compartilhado entre os
+containers), ctx.cached() aceita itens do cache expirados há até
+RATE_LIMIT_DEGRADED_STALENESS e as renovações em segundo plano não são
+agendadas. Se o orçamento acabar depois de um MISS, degraded_cache tenta
+esse mesmo cache antes de responder 429.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+import requests
+
+from config import (
+    STRAVA_CLIENT_ID,
+    STRAVA_CLIENT_SECRET,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_MEMORY_TTL,
+    TOKEN_MEMORY_MAX_ENTRIES,
+    RATE_LIMIT_SHARED,
+    RATE_LIMIT_DEGRADED_STALENESS,
+    THROTTLE_ENABLED
+)
+from utils import (
+    response_error, CacheManager, TokenManager, get_token_and_cache, refresh_in_background
+)
+from memory_cache import LRUCache
+from rate_limit import Priority, RateLimitExceeded, RateLimitGovernor, DynamoRateLimitStore
+from throttle import Throttler
+from transport import get_session
+from strava_client import StravaClient
+from auth_handler import refresh_access_token, fetch_with_token_refresh, TokenRefreshError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+T = TypeVar('T')
+
+cache_manager = CacheManager()
+token_manager = TokenManager()
+http_session = get_session()
+governor = RateLimitGovernor(store=DynamoRateLimitStore() if RATE_LIMIT_SHARED else None)
+# Filas por usuário e prioridade entre as requisições deste container
+throttler = Throttler() if THROTTLE_ENABLED else None
+
+# user_id -> tokens; cada entrada expira antes de o token precisar de renovação
+token_cache = LRUCache(max_entries=TOKEN_MEMORY_MAX_ENTRIES, default_ttl=TOKEN_MEMORY_TTL)
+
+
+class Unauthenticated(Exception):
+    """Usuário sem tokens salvos"""
+
+
+# ---------------------------------------------------------------------------
+# Tokens
+# ---------------------------------------------------------------------------
+
+def seconds_to_expiry(tokens: Dict[str, Any]) -> Optional[float]:
+    """Segundos até o access token expirar (None se expires_at é desconhecido)"""
+    expires_at = tokens.get('expires_at')
+    if expires_at is None:
+        return None
+    return float(expires_at) - time.time()
+
+
+def needs_refresh(tokens: Dict[str, Any]) -> bool:
+    """True se o token expira em menos de TOKEN_REFRESH_MARGIN segundos"""
+    remaining = seconds_to_expiry(tokens)
+    return remaining is not None and remaining < TOKEN_REFRESH_MARGIN
+
+
+def remember_tokens(user_id: str, tokens: Dict[str, Any]) -> None:
+    """Guarda os tokens em memória até faltar TOKEN_REFRESH_MARGIN para expirarem"""
+    remaining = seconds_to_expiry(tokens)
+    ttl = TOKEN_MEMORY_TTL
+    if remaining is not None:
+        ttl = min(ttl, remaining - TOKEN_REFRESH_MARGIN)
+    if ttl > 0:
+        token_cache.set(user_id, tokens, ttl=ttl)
+    else:
+        token_cache.delete(user_id)
+
+
+def refresh_tokens(user_id: str, tokens: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Renova o token na Strava, salva no DynamoDB e em memória
+
+    Raises:
+        TokenRefreshError: se a renovação falhar
+    """
+    try:
+        new_tokens = refresh_access_token(user_id, tokens)
+    except Exception as e:
+        token_cache.delete(user_id)
+        raise TokenRefreshError(str(e)) from e
+    remember_tokens(user_id, new_tokens)
+    return new_tokens
+
+
+def valid_tokens(user_id: str, tokens: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Tokens do usuário com access token ainda válido
+
+    Usa os tokens recebidos (ex: da leitura combinada com o cache), senão
+    os da memória, senão os do DynamoDB. A memória nunca guarda token perto
+    de expirar, então uma renovação sempre parte dos tokens do DynamoDB.
+    Se a renovação antecipada falhar e o token ainda não expirou, ele é
+    usado mesmo assim.
+
+    Returns:
+        Tokens, ou None se o usuário não tem tokens salvos
+
+    Raises:
+        TokenRefreshError: se o token expirou e não pôde ser renovado
+    """
+    if tokens is None:
+        tokens = token_cache.get(user_id)
+    if tokens is None:
+        tokens = token_manager.get_token(user_id)
+    if not tokens:
+        return None
+
+    if needs_refresh(tokens):
+        logger.info(f"Token de {user_id} perto de expirar, renovando antes da chamada")
+        try:
+            return refresh_tokens(user_id, tokens)
+        except TokenRefreshError:
+            if seconds_to_expiry(tokens) <= 0:
+                raise
+            logger.warning(f"Renovação antecipada falhou; usando o token atual de {user_id}")
+            return tokens
+
+    remember_tokens(user_id, tokens)
+    return tokens
+
+
+def strava_client(user_id: str, access_token: Optional[str] = None,
+                  priority: str = Priority.INTERACTIVE) -> StravaClient:
+    """
+    StravaClient com um access token válido do usuário, sob o governador
+    de rate limit (e o throttler, se ligado) com a prioridade dada
+
+    Raises:
+        Unauthenticated: se o usuário não tem tokens salvos
+        TokenRefreshError: se o token expirou e não pôde ser renovado
+    """
+    if access_token is None:
+        tokens = valid_tokens(user_id)
+        if not tokens:
+            raise Unauthenticated(user_id)
+        access_token = tokens.get('access_token')
+
+    return StravaClient(
+        STRAVA_CLIENT_ID,
+        STRAVA_CLIENT_SECRET,
+        access_token=access_token,
+        session=http_session,
+        governor=governor,
+        priority=priority,
+        throttler=throttler,
+        user_id=user_id
+    )
+
+
+def fetch_for_user(user_id: str, client: StravaClient, fetch: Callable[[StravaClient], T]) -> T:
+    """fetch_with_token_refresh que também atualiza o token em memória após um 401"""
+    return fetch_with_token_refresh(user_id, client, fetch, refresh=refresh_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Contexto da requisição
+# ---------------------------------------------------------------------------
+
+class RequestContext:
+    """Estado de uma invocação: evento, usuário, tokens e tempos por etapa"""
+
+    def __init__(self, endpoint: str, event: Dict[str, Any], context: Any = None,
+                 fetch_error: Optional[Tuple[str, str]] = None):
+        self.endpoint = endpoint
+        self.event = event
+        self.context = context
+        self.fetch_error = fetch_error
+        self.user_id = (event.get('pathParameters') or {}).get('user_id')
+        self.query: Dict[str, str] = event.get('queryStringParameters') or {}
+        self.timings: Dict[str, float] = {}
+        self._tokens: Optional[Dict[str, Any]] = None
+        self._validated = False
+        # MISS numa leitura que não aceitava itens degradados
+        self.cache_missed = False
+        # Rate limit que levou à repetição com o cache degradado
+        self.degraded: Optional[RateLimitExceeded] = None
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Soma a duração do bloco em timings[stage] (ms)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    def cached(self, cache_key: str,
+               max_staleness: int = 0) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Item do cache DynamoDB (dados, stale)
+
+        Sem token em memória, o token vem na mesma ida ao DynamoDB
+        (get_token_and_cache); com ele, só o cache é lido. Com o orçamento
+        de rate limit baixo, aceita itens expirados há até
+        RATE_LIMIT_DEGRADED_STALENESS.
+
+        Raises:
+            RateLimitExceeded: MISS na repetição de degraded_cache
+        """
+        if self.degraded is not None or governor.budget_low(Priority.BACKGROUND):
+            logger.warning(
+                f"Orçamento de rate limit baixo, {self.endpoint} servindo cache degradado"
+            )
+            max_staleness = max(max_staleness, RATE_LIMIT_DEGRADED_STALENESS)
+        data, stale = self._read_cache(cache_key, max_staleness)
+        if data is None:
+            if self.degraded is not None:
+                raise self.degraded
+            self.cache_missed = max_staleness < RATE_LIMIT_DEGRADED_STALENESS
+        return data, stale
+
+    def _read_cache(self, cache_key: str,
+                    max_staleness: int) -> Tuple[Optional[Dict[str, Any]], bool]:
+        with self.timer('cache'):
+            if self.user_id in token_cache:
+                return cache_manager.get_with_staleness(cache_key, max_staleness)
+
+            tokens, data, stale = get_token_and_cache(
+                token_manager, cache_manager, self.user_id, cache_key, max_staleness
+            )
+        if tokens:
+            self._tokens = tokens
+            # Renovações em segundo plano reaproveitam o token lido aqui
+            if not needs_refresh(tokens):
+                remember_tokens(self.user_id, tokens)
+        return data, stale
+
+    def refresh_stale(self, cache_key: str, load: Callable[..., Any], *args) -> bool:
+        """
+        Agenda load(*args, priority=background) em segundo plano se esta
+        invocação obtiver a reserva do item e houver orçamento de rate limit
+        """
+        if self.degraded is not None or governor.budget_low(Priority.BACKGROUND):
+            return False
+        if not cache_manager.try_acquire_refresh(cache_key):
+            return False
+        refresh_in_background(load, *args, priority=Priority.BACKGROUND)
+        return True
+
+    def access_token(self) -> str:
+        """
+        Access token válido do usuário (renovado se perto de expirar)
+
+        Raises:
+            Unauthenticated: se o usuário não tem tokens salvos
+            TokenRefreshError: se o token expirou e não pôde ser renovado
+        """
+        if not self._validated:
+            with self.timer('token'):
+                self._tokens = valid_tokens(self.user_id, self._tokens)
+            self._validated = True
+        if not self._tokens:
+            raise Unauthenticated(self.user_id)
+        return self._tokens.get('access_token')
+
+    def client(self) -> StravaClient:
+        """StravaClient do usuário sobre a sessão HTTP compartilhada"""
+        return strava_client(self.user_id, self.access_token())
+
+    def fetch(self, fetch: Callable[[StravaClient], T], client: Optional[StravaClient] = None) -> T:
+        """Executa fetch(client) com renovação após 401, cronometrado como 'strava'"""
+        client = client or self.client()
+        with self.timer('strava'):
+            return fetch_for_user(self.user_id, client, fetch)
+
+
+# ---------------------------------------------------------------------------
+# Middlewares
+# ---------------------------------------------------------------------------
+
+Handle = Callable[[RequestContext], Dict[str, Any]]
+Middleware = Callable[[RequestContext, Handle], Dict[str, Any]]
+
+
+def timing(ctx: RequestContext, call_next: Handle) -> Dict[str, Any]:
+    """Server-Timing com total e etapas, e uma linha de log JSON por invocação"""
+    start = time.perf_counter()
+    response = call_next(ctx)
+    ctx.timings['total'] = (time.perf_counter() - start) * 1000
+
+    response.setdefault('headers', {})['Server-Timing'] = ', '.join(
+        f'{stage};dur={duration:.1f}' for stage, duration in ctx.timings.items()
+    )
+    logger.info(json.dumps({
+        'endpoint': ctx.endpoint,
+        'user_id': ctx.user_id,
+        'status': response.get('statusCode'),
+        'timings_ms': {stage: round(duration, 1) for stage, duration in ctx.timings.items()}
+    }))
+    return response
+
+
+def errors(ctx: RequestContext, call_next: Handle) -> Dict[str, Any]:
+    """Converte exceções nas respostas de erro padronizadas"""
+    try:
+        return call_next(ctx)
+    except Unauthenticated:
+        return response_error('User not authenticated', 401, 'UNAUTHENTICATED')
+    except TokenRefreshError:
+        return response_error('Token refresh failed', 401, 'TOKEN_REFRESH_FAILED')
+    except RateLimitExceeded as e:
+        logger.warning(f"Rate limit em {ctx.endpoint}: {e}")
+        response = response_error('Strava rate limit reached', 429, 'RATE_LIMITED')
+        response['headers']['Retry-After'] = str(int(e.retry_after) + 1)
+        return response
+    except requests.exceptions.HTTPError as e:
+        if ctx.fetch_error is None:
+            raise
+        logger.error(f"Erro na API Strava em {ctx.endpoint}: {e}")
+        message, code = ctx.fetch_error
+        return response_error(message, 400, code)
+
+
+def degraded_cache(ctx: RequestContext, call_next: Handle) -> Dict[str, Any]:
+    """
+    Sem orçamento depois de um MISS do cache, repete o handler uma vez com
+    ctx.cached() aceitando itens expirados há até RATE_LIMIT_DEGRADED_STALENESS;
+    se ainda for MISS, o RateLimitExceeded original segue para o 429
+    """
+    try:
+        return call_next(ctx)
+    except RateLimitExceeded as e:
+        if not ctx.cache_missed or ctx.degraded is not None:
+            raise
+        logger.warning(f"Rate limit em {ctx.endpoint} após MISS, tentando o cache degradado")
+        ctx.degraded = e
+        return call_next(ctx)
+
+
+def internal_errors(ctx: RequestContext, call_next: Handle) -> Dict[str, Any]:
+    """Qualquer outra exceção vira 500 INTERNAL_ERROR"""
+    try:
+        return call_next(ctx)
+    except Exception as e:
+        logger.error(f"Erro em {ctx.endpoint}: {str(e)}")
+        return response_error(f'Internal server error: {str(e)}', 500, 'INTERNAL_ERROR')
+
+
+def require_user(ctx: RequestContext, call_next: Handle) -> Dict[str, Any]:
+    """400 MISSING_USER_ID sem user_id no path"""
+    if not ctx.user_id:
+        return response_error('User ID is required', 400, 'MISSING_USER_ID')
+    return call_next(ctx)
+
+
+DEFAULT_MIDDLEWARES: Sequence[Middleware] = (
+    timing, internal_errors, errors, degraded_cache, require_user
+)
+
+
+def build_handler(endpoint: str,
+                  handle: Handle,
+                  fetch_error: Optional[Tuple[str, str]] = None,
+                  middlewares: Sequence[Middleware] = DEFAULT_MIDDLEWARES
+                  ) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    """
+    Monta um lambda_handler: middlewares (de fora para dentro) e depois handle
+
+    Args:
+        endpoint: Nome do endpoint nos logs (ex: 'GET /stats')
+        handle: Lógica do endpoint; recebe o RequestContext e retorna a resposta
+        fetch_error: (mensagem, código) do 400 para erros HTTP da Strava
+        middlewares: Cadeia de middlewares (padrão: DEFAULT_MIDDLEWARES)
+    """
+    chain = handle
+    for middleware in reversed(middlewares):
+        chain = (lambda mw, nxt: lambda ctx: mw(ctx, nxt))(middleware, chain)
+
+    def lambda_handler(event, context):
+        return chain(RequestContext(endpoint, event or {}, context, fetch_error))
+
+    lambda_handler.__doc__ = handle.__doc__
+    return lambda_handler
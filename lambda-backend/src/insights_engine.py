@@ -0,0 +1,245 @@
+"""
+Motor vetorizado das análises de /insights
+
+As atividades são convertidas uma única vez em colunas NumPy (ActivityFrame:
+velocidade, distância, tempo, elevação, início em epoch e código do esporte)
+e as quatro análises do insights_handler são refeitas sobre esses arrays,
+sem voltar a percorrer a lista de dicts nem reprocessar start_date.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from activity_frame import ActivityFrame
+
+DAY = 86400
+WEEK = 7 * DAY
+
+
+class ActivityColumns:
+    """Colunas usadas pelas análises, lidas de um ActivityFrame"""
+
+    def __init__(self, activities: Union[ActivityFrame, List[Dict[str, Any]]]):
+        frame = activities
+        if not isinstance(frame, ActivityFrame):
+            frame = ActivityFrame.from_strava(activities)
+        self.size = len(frame)
+        self.ids = frame.columns['id'].tolist()
+        self.names = frame.columns['name'].tolist()
+        self.speed = frame.numeric('average_speed')
+        self.distance = frame.numeric('distance')
+        self.moving_time = frame.numeric('moving_time')
+        self.elevation = frame.numeric('total_elevation_gain')
+        self.start = frame.start
+        self.sport = frame.sport
+        self.sport_names = frame.sport_names
+
+
+class InsightsEngine:
+    """Análises de desempenho, recomendações, tendências e anomalias"""
+
+    def __init__(self, activities: Union[ActivityFrame, List[Dict[str, Any]]]):
+        self.columns = ActivityColumns(activities)
+
+    def analyze_performance(self) -> Dict[str, Any]:
+        """Analisa desempenho e tendências de velocidade por esporte"""
+        performance = {
+            'analysis': 'Performance over time',
+            'metrics': {}
+        }
+        cols = self.columns
+        if not cols.size:
+            return performance
+
+        speeds_kmh = cols.speed * 3.6
+        has_speed = cols.speed != 0
+        for code, sport_type in enumerate(cols.sport_names):
+            speeds = speeds_kmh[(cols.sport == code) & has_speed]
+            if speeds.size:
+                performance['metrics'][sport_type] = {
+                    'avg_speed_kmh': round(np.mean(speeds), 2),
+                    'max_speed_kmh': round(np.max(speeds), 2),
+                    'std_dev_speed': round(np.std(speeds), 2) if speeds.size > 1 else 0,
+                    'improvement': calculate_improvement(speeds),
+                    'consistency': calculate_consistency(speeds)
+                }
+
+        return performance
+
+    def generate_recommendations(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Gera recomendações de treino baseado em padrões"""
+        recommendations = {
+            'suggestions': []
+        }
+        cols = self.columns
+        if not cols.size:
+            return recommendations
+
+        now = time.time() if now is None else now
+        recent = cols.start > now - WEEK
+
+        # Recomendação 1: Frequência de treino
+        activity_freq = int(np.count_nonzero(recent))
+        if activity_freq < 3:
+            recommendations['suggestions'].append({
+                'category': 'frequency',
+                'severity': 'warning',
+                'message': f'Apenas {activity_freq} atividades nos últimos 7 dias. '
+                           'Considere aumentar a frequência de treino.',
+                'recommendation': 'Objetivo: 3-5 atividades por semana para melhores resultados'
+            })
+        elif activity_freq > 7:
+            recommendations['suggestions'].append({
+                'category': 'recovery',
+                'severity': 'info',
+                'message': f'{activity_freq} atividades nos últimos 7 dias.',
+                'recommendation': 'Considere incluir dias de recuperação ativa ou repouso'
+            })
+
+        # Recomendação 2: Variedade
+        if len(cols.sport_names) < 2:
+            recommendations['suggestions'].append({
+                'category': 'variety',
+                'severity': 'info',
+                'message': f'Treino focado em {cols.sport_names[0]}.',
+                'recommendation': 'Adicionar outras modalidades para trabalhar '
+                                  'diferentes grupos musculares'
+            })
+
+        # Recomendação 3: Intensidade
+        total_distance = float(cols.distance[recent].sum()) / 1000  # km
+        avg_distance = total_distance / activity_freq if activity_freq else 0
+
+        if avg_distance > 50:
+            recommendations['suggestions'].append({
+                'category': 'intensity',
+                'severity': 'warning',
+                'message': f'Média de {avg_distance:.1f}km por atividade.',
+                'recommendation': 'Considere balancear com atividades de menor intensidade'
+            })
+        elif avg_distance < 5 and activity_freq:
+            recommendations['suggestions'].append({
+                'category': 'intensity',
+                'severity': 'info',
+                'message': f'Média de {avg_distance:.1f}km por atividade.',
+                'recommendation': 'Considere aumentar distância ou intensidade'
+            })
+
+        return recommendations
+
+    def analyze_trends(self) -> Dict[str, Any]:
+        """Analisa tendências semanais (semanas começando na segunda-feira, UTC)"""
+        trends = {
+            'trend_analysis': 'Performance trends over time',
+            'data': {}
+        }
+        cols = self.columns
+        dated = ~np.isnan(cols.start)
+        if not dated.any():
+            return trends
+
+        order = np.argsort(cols.start[dated], kind='stable')
+        start = cols.start[dated][order]
+        start_day = np.floor(start / DAY).astype(np.int64)
+        # 01/01/1970 foi quinta-feira (weekday 3)
+        week_start = start_day - (start_day + 3) % 7
+
+        weeks, week_of = np.unique(week_start, return_inverse=True)
+        week_of = week_of.ravel()
+
+        def weekly(weights=None):
+            return np.bincount(week_of, weights=weights, minlength=weeks.size)
+
+        activities = weekly()
+        distance = weekly(cols.distance[dated][order] / 1000)
+        moving_time = weekly(cols.moving_time[dated][order])
+        elevation = weekly(cols.elevation[dated][order])
+
+        weekly_data = {}
+        for i, monday in enumerate(weeks.tolist()):
+            week_key = datetime.fromtimestamp(monday * DAY, tz=timezone.utc).strftime('%Y-W%U')
+            bucket = weekly_data.setdefault(
+                week_key, {'activities': 0, 'distance': 0, 'time': 0, 'elevation': 0}
+            )
+            bucket['activities'] += int(activities[i])
+            bucket['distance'] += float(distance[i])
+            bucket['time'] += int(moving_time[i])
+            bucket['elevation'] += float(elevation[i])
+
+        trends['data'] = weekly_data
+        return trends
+
+    def detect_anomalies(self) -> Dict[str, Any]:
+        """Detecta anomalias de velocidade e distância (|z| > 2)"""
+        anomalies = {
+            'anomalies_detected': [],
+            'analysis': 'Detects unusual activity patterns'
+        }
+        cols = self.columns
+        if cols.size < 3:
+            return anomalies
+
+        flagged = set()
+        detected = anomalies['anomalies_detected']
+        checks = (('speed_anomaly', cols.speed * 3.6), ('distance_anomaly', cols.distance / 1000))
+        for kind, values in checks:
+            present = values[values != 0]
+            if not present.size:
+                continue
+            mean = np.mean(present)
+            std = np.std(present)
+
+            for i in np.flatnonzero((np.abs(values - mean) > 2 * std) & (values > 0)):
+                activity_id = cols.ids[i]
+                if activity_id in flagged:
+                    continue
+                flagged.add(activity_id)
+                detected.append({
+                    'activity_id': activity_id,
+                    'name': cols.names[i],
+                    'type': kind,
+                    'value': round(values[i], 2),
+                    'mean': round(mean, 2),
+                    'std_dev': round(std, 2),
+                    'z_score': round((values[i] - mean) / std, 2)
+                })
+
+        return anomalies
+
+
+def calculate_improvement(values: List[float]) -> str:
+    """Calcula melhoria comparando primeira e última metade"""
+    if len(values) < 2:
+        return 'insufficient_data'
+
+    mid = len(values) // 2
+    first_half = np.mean(values[:mid])
+    second_half = np.mean(values[mid:])
+
+    improvement_pct = ((second_half - first_half) / first_half * 100) if first_half > 0 else 0
+
+    if improvement_pct > 5:
+        return f'improving_{int(improvement_pct)}%'
+    elif improvement_pct < -5:
+        return f'declining_{int(-improvement_pct)}%'
+    else:
+        return 'stable'
+
+
+def calculate_consistency(values: List[float]) -> str:
+    """Calcula consistência do desempenho"""
+    if len(values) < 2:
+        return 'insufficient_data'
+
+    cv = (np.std(values) / np.mean(values) * 100) if np.mean(values) > 0 else 0
+
+    if cv < 10:
+        return 'very_consistent'
+    elif cv < 20:
+        return 'consistent'
+    elif cv < 30:
+        return 'moderate'
+    else:
+        return 'variable'
@@ -0,0 +1,158 @@
+"""
+Cache em memória com LRU, TTL por entrada e limite de bytes
+
+Usado pelo StravaClient em processos de longa duração (FastAPI, Streamlit,
+containers Lambda quentes), onde um dict sem despejo cresce sem limite.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Estimativa barata do tamanho em bytes de um payload JSON"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class LRUCache:
+    """
+    Cache LRU limitado por número de entradas e por bytes
+
+    Cada entrada guarda (valor, expira_em, tamanho). Entradas expiradas são
+    removidas ao serem acessadas ou por purge_expired(); quando um limite é
+    ultrapassado, a entrada menos usada recentemente é despejada em O(1).
+    """
+
+    def __init__(self,
+                 max_entries: int = 512,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 default_ttl: float = 300,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_entries: Máximo de entradas mantidas
+            max_bytes: Máximo de bytes somados das entradas
+            default_ttl: TTL (segundos) quando set() não recebe um
+            clock: Fonte de tempo (injetável em testes)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor se presente e não expirado (conta hit/miss)"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if self._clock() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            size: Optional[int] = None) -> bool:
+        """
+        Armazena um valor
+
+        Args:
+            key: Chave
+            value: Valor
+            ttl: Segundos até expirar (padrão: default_ttl)
+            size: Tamanho em bytes, se já conhecido (ex: len(response.content))
+
+        Returns:
+            False se o valor sozinho excede max_bytes e não foi armazenado
+        """
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return False
+
+        expires_at = self._clock() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove uma entrada; retorna True se existia"""
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            return True
+
+    def purge_expired(self) -> int:
+        """Remove todas as entradas expiradas; retorna quantas saíram"""
+        now = self._clock()
+        with self._lock:
+            expired = [k for k, (_, expires_at, _) in self._data.items() if now >= expires_at]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        """Esvazia o cache (os contadores são mantidos)"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Verifica presença e validade sem afetar contadores nem a ordem LRU"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and self._clock() < entry[1]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores e ocupação do cache"""
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
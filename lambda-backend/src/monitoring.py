@@ -5,23 +5,52 @@ APM tracing, metrics, and dashboards for Strava Connect
 
 import logging
 import os
+import threading
 from functools import wraps
 from datetime import datetime
-from typing import Callable, Any
-
-# Datadog imports
-try:
-    from ddtrace import tracer, initialize, config
-    from ddtrace.profiling import prof
-    from datadog import initialize as dd_initialize, api
-    DATADOG_AVAILABLE = True
-except ImportError:
-    DATADOG_AVAILABLE = False
-    print("⚠️  Datadog SDK não instalado. Instale: pip install datadog ddtrace")
+from types import SimpleNamespace
+from typing import Callable, Optional
 
 
 logger = logging.getLogger(__name__)
 
+# ddtrace/datadog são importados no primeiro uso (não no cold start de
+# quem só importa este módulo): None = ainda não tentado, False = ausentes
+_datadog = None
+_datadog_lock = threading.Lock()
+
+
+def load_datadog() -> Optional[SimpleNamespace]:
+    """
+    Importa o SDK do Datadog sob demanda
+    
+    Returns:
+        Namespace com tracer, initialize, config, prof e api, ou None se
+        ddtrace/datadog não estão instalados
+    """
+    global _datadog
+    if _datadog is None:
+        with _datadog_lock:
+            if _datadog is None:
+                try:
+                    from ddtrace import tracer, initialize, config
+                    from ddtrace.profiling import prof
+                    from datadog import api
+                    _datadog = SimpleNamespace(
+                        tracer=tracer, initialize=initialize, config=config, prof=prof, api=api
+                    )
+                except ImportError:
+                    logger.warning(
+                        "Datadog SDK não instalado. Instale: pip install datadog ddtrace"
+                    )
+                    _datadog = False
+    return _datadog or None
+
+
+def datadog_available() -> bool:
+    """True se ddtrace e datadog estão instalados (importa na primeira chamada)"""
+    return load_datadog() is not None
+
 
 class DatadogConfig:
     """Configuração centralizada do Datadog"""
@@ -38,29 +67,30 @@ class DatadogConfig:
     @classmethod
     def initialize(cls):
         """Inicializar Datadog APM"""
-        if not DATADOG_AVAILABLE:
+        dd = load_datadog()
+        if dd is None:
             logger.warning("Datadog não disponível")
             return
         
         try:
             # Configurar tracer
-            config.env = cls.ENVIRONMENT
-            config.version = cls.VERSION
+            dd.config.env = cls.ENVIRONMENT
+            dd.config.version = cls.VERSION
             
-            initialize(
+            dd.initialize(
                 statsd_host=cls.AGENT_HOST,
                 statsd_port=cls.AGENT_PORT
             )
             
             # Tracer setup
-            tracer.configure(
+            dd.tracer.configure(
                 hostname=cls.AGENT_HOST,
                 port=cls.AGENT_PORT,
                 enabled=True
             )
             
             # Start profiler
-            prof.start()
+            dd.prof.start()
             
             logger.info(
                 f"✅ Datadog inicializado - "
@@ -88,10 +118,11 @@ def datadog_trace(
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if not DATADOG_AVAILABLE:
+            dd = load_datadog()
+            if dd is None:
                 return func(*args, **kwargs)
             
-            with tracer.trace(
+            with dd.tracer.trace(
                 operation_name,
                 service=DatadogConfig.SERVICE_NAME,
                 tags=tags or {}
@@ -136,7 +167,8 @@ class DatadogMetrics:
         tags: dict = None
     ):
         """Incrementar métrica"""
-        if not DATADOG_AVAILABLE:
+        dd = load_datadog()
+        if dd is None:
             return
         
         try:
@@ -147,7 +179,7 @@ class DatadogMetrics:
                 f"service:{DatadogConfig.SERVICE_NAME}"
             ])
             
-            api.Metric.send(
+            dd.api.Metric.send(
                 metric=metric_path,
                 points=value,
                 type="gauge",
@@ -168,11 +200,12 @@ class DatadogMetrics:
         tags: dict = None
     ):
         """Enviar históograma (distribuição)"""
-        if not DATADOG_AVAILABLE:
+        dd = load_datadog()
+        if dd is None:
             return
         
         try:
-            api.Metric.send(
+            dd.api.Metric.send(
                 metric=f"strava_connect.{metric_name}",
                 points=value,
                 type="histogram",
@@ -188,7 +221,8 @@ class DatadogDashboard:
     @staticmethod
     def create_monitoring_dashboard():
         """Criar dashboard de monitoramento"""
-        if not DATADOG_AVAILABLE or not DatadogConfig.API_KEY:
+        dd = load_datadog()
+        if dd is None or not DatadogConfig.API_KEY:
             logger.warning("Não é possível criar dashboard sem credenciais")
             return
         
@@ -239,7 +273,7 @@ class DatadogDashboard:
         }
         
         try:
-            response = api.Dashboard.create(**dashboard_config)
+            response = dd.api.Dashboard.create(**dashboard_config)
             logger.info(f"✅ Dashboard criado: {response}")
             return response
         except Exception as e:
@@ -253,7 +287,7 @@ class DatadogLogger:
         self.logger = logging.getLogger(name)
         
         # Handler de eventos para Datadog
-        if DATADOG_AVAILABLE:
+        if datadog_available():
             try:
                 from ddtrace.profiling import enable_event_tracing
                 enable_event_tracing()
@@ -268,7 +302,8 @@ class DatadogLogger:
         alert_type: str = "info"
     ):
         """Enviar evento para Datadog"""
-        if not DATADOG_AVAILABLE or not DatadogConfig.API_KEY:
+        dd = load_datadog()
+        if dd is None or not DatadogConfig.API_KEY:
             self.logger.info(f"{title}: {text}")
             return
         
@@ -281,7 +316,7 @@ class DatadogLogger:
                 "timestamp": int(datetime.now().timestamp())
             }
             
-            api.Event.create(**event_data)
+            dd.api.Event.create(**event_data)
             self.logger.info(f"✅ Evento enviado: {title}")
         except Exception as e:
             self.logger.error(f"Erro ao enviar evento: {e}")
@@ -405,14 +440,16 @@ STRAVA_CLIENT_SECRET=your_strava_secret
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Inicializar Datadog
     DatadogConfig.initialize()
     
     # Exemplo de uso
-    logger = DatadogLogger(__name__)
+    dd_logger = DatadogLogger(__name__)
     
     # Enviar evento
-    logger.log_event(
+    dd_logger.log_event(
         title="Strava Connect - Deployment",
         text="Lambda backend deployed successfully",
         tags={"version": "1.0.0", "environment": "production"},
@@ -425,4 +462,4 @@ if __name__ == "__main__":
         tags={"service": "strava-connect"}
     )
     
-    print("✅ Datadog integrado com sucesso!")
+    logger.info("✅ Datadog integrado com sucesso!")
@@ -0,0 +1,103 @@
+"""
+Busca concorrente de páginas de atividades
+
+Para históricos grandes (period=all) percorrer /athlete/activities uma
+página por vez deixa a latência da Strava somada N vezes. O
+PrefetchingPageFetcher mantém até k páginas em voo enquanto a página
+atual é consumida, preservando a ordem de entrega.
+"""
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import PAGE_PREFETCH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchingPageFetcher:
+    """Itera sobre atividades buscando as próximas páginas em paralelo"""
+
+    def __init__(self, client, max_workers: int = PAGE_PREFETCH_WORKERS, per_page: int = 200):
+        """
+        Args:
+            client: StravaClient usado para buscar as páginas
+            max_workers: Máximo de páginas em voo ao mesmo tempo
+            per_page: Atividades por página (máx 200)
+        """
+        self.client = client
+        self.max_workers = max(1, max_workers)
+        self.per_page = min(per_page, 200)
+        self.cancelled_pages = 0
+
+    def _window(self) -> int:
+        """Quantas páginas podem estar em voo, respeitando o rate limit"""
+        if self.client._rate_limit_exceeded():
+            # Sem orçamento: volta ao modo sequencial e deixa o _request esperar
+            return 1
+        remaining = self.client._rate_limit_remaining
+        if remaining is not None:
+            return max(1, min(self.max_workers, remaining))
+        return self.max_workers
+
+    def _fetch_page(self, page: int, after: Optional[int], before: Optional[int]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        activities = self.client.get_activities(before=before, after=after,
+                                                page=page, per_page=self.per_page)
+        return {
+            "activities": activities,
+            "timing": {
+                "page": page,
+                "count": len(activities),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+        }
+
+    def iter_activities(self,
+                        after: Optional[int] = None,
+                        before: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Itera sobre todas as atividades do período, na ordem das páginas
+
+        As páginas N+1..N+k são pedidas enquanto a página N é consumida. Na
+        primeira página incompleta as buscas pendentes são canceladas. O
+        timing de cada página fica em client.last_page_timings.
+
+        Args:
+            after: Unix timestamp - atividades posteriores
+            before: Unix timestamp - atividades anteriores
+
+        Yields:
+            Atividades, na mesma ordem de StravaClient.iter_activities
+        """
+        self.client.last_page_timings = []
+        self.cancelled_pages = 0
+        pending: Dict[int, Future] = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                  thread_name_prefix="strava-page")
+        current = 1
+        next_page = 1
+
+        try:
+            while True:
+                while next_page < current + self._window():
+                    pending[next_page] = pool.submit(self._fetch_page, next_page, after, before)
+                    next_page += 1
+
+                result = pending.pop(current).result()
+                self.client.last_page_timings.append(result["timing"])
+
+                activities: List[Dict[str, Any]] = result["activities"]
+                yield from activities
+
+                if len(activities) < self.per_page:
+                    break
+                current += 1
+        finally:
+            for future in pending.values():
+                if future.cancel():
+                    self.cancelled_pages += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+            if pending:
+                logger.debug(f"Prefetch encerrado: {len(pending)} página(s) descartada(s)")
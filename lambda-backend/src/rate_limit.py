@@ -0,0 +1,436 @@
+"""
+Governador de rate limit da API Strava
+
+A Strava limita o app inteiro (todos os usuários juntos) em duas janelas:
+15 minutos, zerada em :00, :15, :30 e :45, e diária, zerada à meia-noite
+UTC. Cada resposta traz X-RateLimit-Limit e X-RateLimit-Usage no formato
+"curta,diária" (ex: "200,2000" e "34,310"), e X-ReadRateLimit-* com o
+limite só de leituras.
+
+O RateLimitGovernor admite cada requisição antes de ela sair. Um contador
+por janela, compartilhado entre os containers Lambda (ADD atômico e
+condicional no DynamoDB), garante que juntos eles não passem do teto. Os
+headers de cada resposta corrigem o contador para cima, por exemplo com
+requisições feitas fora do governador. Prioridades:
+
+- interactive: requisições de usuário, até RATE_LIMIT_INTERACTIVE_SHARE da janela
+- background: renovações e sincronizações agendadas, só até
+  RATE_LIMIT_BACKGROUND_SHARE, deixando o resto do orçamento para as interativas
+- backfill: importações de histórico, só até RATE_LIMIT_BACKFILL_SHARE
+
+Sem orçamento, acquire() levanta RateLimitExceeded em vez de dormir; os
+handlers respondem com o cache (mesmo stale) ou 429 com Retry-After.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from config import (
+    STRAVA_RATE_LIMIT_SHORT,
+    STRAVA_RATE_LIMIT_DAILY,
+    RATE_LIMIT_INTERACTIVE_SHARE,
+    RATE_LIMIT_BACKGROUND_SHARE,
+    RATE_LIMIT_BACKFILL_SHARE,
+    RATE_LIMIT_USAGE_REFRESH,
+    DYNAMODB_TABLE_CACHE
+)
+from utils import TableManager, client_error_code
+
+logger = logging.getLogger(__name__)
+
+SHORT_WINDOW_SECONDS = 15 * 60
+DAY_SECONDS = 24 * 60 * 60
+
+
+class Priority:
+    """Classes de prioridade das requisições à Strava (da mais para a menos urgente)"""
+    INTERACTIVE = 'interactive'
+    BACKGROUND = 'background'
+    BACKFILL = 'backfill'
+
+    ORDER = (INTERACTIVE, BACKGROUND, BACKFILL)
+
+
+class RateLimitExceeded(Exception):
+    """Sem orçamento na janela de rate limit da Strava"""
+
+    def __init__(self, retry_after: float, window: str = 'short'):
+        super().__init__(f"Strava rate limit ({window}) reached, retry in {retry_after:.0f}s")
+        self.retry_after = max(retry_after, 0.0)
+        self.window = window
+
+
+def short_window(now: float) -> int:
+    """Índice da janela de 15 minutos que contém now"""
+    return int(now // SHORT_WINDOW_SECONDS)
+
+
+def day_window(now: float) -> str:
+    """Dia UTC (YYYY-MM-DD) que contém now"""
+    return time.strftime('%Y-%m-%d', time.gmtime(now))
+
+
+def seconds_to_reset(now: float, window: str) -> float:
+    """Segundos até a janela ('short' ou 'long') zerar"""
+    period = SHORT_WINDOW_SECONDS if window == 'short' else DAY_SECONDS
+    return period - now % period
+
+
+@dataclass
+class WindowUsage:
+    """Limite e uso de uma janela"""
+    limit: int
+    usage: int
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.usage, 0)
+
+
+@dataclass
+class RateLimitState:
+    """Uso das janelas curta e diária, como informado pela Strava"""
+    short: WindowUsage
+    long: Optional[WindowUsage]
+    observed_at: float
+
+    @property
+    def remaining(self) -> int:
+        """Requisições restantes (a menor das janelas)"""
+        if self.long is None:
+            return self.short.remaining
+        return min(self.short.remaining, self.long.remaining)
+
+    def exhausted_window(self) -> Optional[str]:
+        """'long' ou 'short' se uma janela esgotou (a diária prevalece), senão None"""
+        if self.long is not None and self.long.remaining <= 0:
+            return 'long'
+        if self.short.remaining <= 0:
+            return 'short'
+        return None
+
+
+def _numbers(value: Optional[str]) -> Tuple[int, ...]:
+    if not value:
+        return ()
+    try:
+        return tuple(int(part) for part in value.split(','))
+    except ValueError:
+        return ()
+
+
+def _windows(limit_header: Optional[str], usage_header: Optional[str]):
+    limits, usages = _numbers(limit_header), _numbers(usage_header)
+    if not limits:
+        return None
+    usages = usages + (0,) * (len(limits) - len(usages))
+    short = WindowUsage(limits[0], usages[0])
+    long = WindowUsage(limits[1], usages[1]) if len(limits) > 1 else None
+    return short, long
+
+
+def _tighter(a: Optional[WindowUsage], b: Optional[WindowUsage]) -> Optional[WindowUsage]:
+    if a is None or b is None:
+        return a or b
+    return a if a.remaining <= b.remaining else b
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str],
+                             now: Optional[float] = None) -> Optional[RateLimitState]:
+    """
+    Lê X-RateLimit-Limit/Usage ("curta,diária") e, se presentes, os
+    X-ReadRateLimit-*; por janela vale o par com menos requisições restantes
+
+    Returns:
+        None se a resposta não traz headers de rate limit
+    """
+    overall = _windows(headers.get('X-RateLimit-Limit'), headers.get('X-RateLimit-Usage'))
+    read = _windows(headers.get('X-ReadRateLimit-Limit'), headers.get('X-ReadRateLimit-Usage'))
+    if overall is None and read is None:
+        return None
+    overall = overall or (None, None)
+    read = read or (None, None)
+    return RateLimitState(
+        short=_tighter(overall[0], read[0]),
+        long=_tighter(overall[1], read[1]),
+        observed_at=time.time() if now is None else now
+    )
+
+
+# ---------------------------------------------------------------------------
+# Contadores compartilhados
+# ---------------------------------------------------------------------------
+
+class _Rejected(Exception):
+    """Admissão recusada: a janela já está no teto"""
+
+
+class MemoryRateLimitStore:
+    """Contadores no processo (um só container, testes, FastAPI)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._daily: Dict[str, int] = {}
+        self._short: Dict[int, int] = {}
+
+    def admit(self, day: str, short_id: int,
+              short_ceiling: int, long_ceiling: int) -> Tuple[int, int]:
+        """Conta uma requisição se as duas janelas estão abaixo do teto; retorna (curta, diária)"""
+        with self._lock:
+            short, daily = self._short.get(short_id, 0), self._daily.get(day, 0)
+            if short >= short_ceiling or daily >= long_ceiling:
+                raise _Rejected()
+            self._set(day, short_id, short + 1, daily + 1)
+            return short + 1, daily + 1
+
+    def _set(self, day: str, short_id: int, short: int, daily: Optional[int]) -> None:
+        # Só as duas janelas mais recentes de cada tipo interessam
+        self._short[short_id] = short
+        self._short = dict(sorted(self._short.items())[-2:])
+        if daily is not None:
+            self._daily[day] = daily
+            self._daily = dict(sorted(self._daily.items())[-2:])
+
+    def usage(self, day: str, short_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._short.get(short_id, 0), self._daily.get(day, 0)
+
+    def raise_to(self, day: str, short_id: int,
+                 short_usage: int, long_usage: Optional[int]) -> None:
+        """Sobe os contadores para o uso informado pela Strava (nunca desce)"""
+        with self._lock:
+            self._set(day, short_id, max(self._short.get(short_id, 0), short_usage),
+                      None if long_usage is None else max(self._daily.get(day, 0), long_usage))
+
+
+class DynamoRateLimitStore(TableManager):
+    """
+    Contadores no DynamoDB, compartilhados entre containers
+
+    Um item por dia UTC na tabela de cache (chave 'ratelimit:<dia>'), com o
+    uso diário e um atributo por janela de 15 minutos. A admissão é um
+    único UpdateItem: ADD nas duas janelas, condicionado a ambas estarem
+    abaixo do teto, então containers concorrentes nunca passam dele.
+    expires_at (epoch) deixa o TTL da tabela apagar os dias antigos.
+    """
+
+    TABLE_NAME = DYNAMODB_TABLE_CACHE
+
+    @staticmethod
+    def _key(day: str) -> Dict[str, str]:
+        return {'cache_key': f'ratelimit:{day}'}
+
+    @staticmethod
+    def _expires_at(now: float) -> int:
+        return int(now - now % DAY_SECONDS + 2 * DAY_SECONDS)
+
+    def admit(self, day: str, short_id: int,
+              short_ceiling: int, long_ceiling: int) -> Tuple[int, int]:
+        """Conta uma requisição se as duas janelas estão abaixo do teto; retorna (curta, diária)"""
+        try:
+            response = self.table.update_item(
+                Key=self._key(day),
+                UpdateExpression='ADD daily_usage :one, #short :one '
+                                 'SET expires_at = if_not_exists(expires_at, :expires)',
+                ConditionExpression='(attribute_not_exists(daily_usage) OR daily_usage < :long)'
+                                    ' AND (attribute_not_exists(#short) OR #short < :short)',
+                ExpressionAttributeNames={'#short': f's{short_id}'},
+                ExpressionAttributeValues={
+                    ':one': 1,
+                    ':long': long_ceiling,
+                    ':short': short_ceiling,
+                    ':expires': self._expires_at(time.time())
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+        except Exception as e:
+            if client_error_code(e) == 'ConditionalCheckFailedException':
+                raise _Rejected() from e
+            raise
+        attributes = response['Attributes']
+        return int(attributes[f's{short_id}']), int(attributes['daily_usage'])
+
+    def usage(self, day: str, short_id: int) -> Tuple[int, int]:
+        item = self.table.get_item(Key=self._key(day), ConsistentRead=True).get('Item', {})
+        return int(item.get(f's{short_id}', 0)), int(item.get('daily_usage', 0))
+
+    def raise_to(self, day: str, short_id: int,
+                 short_usage: int, long_usage: Optional[int]) -> None:
+        """Sobe os contadores para o uso informado pela Strava (nunca desce)"""
+        updates = [(f's{short_id}', short_usage)]
+        if long_usage is not None:
+            updates.append(('daily_usage', long_usage))
+        for attribute, value in updates:
+            try:
+                self.table.update_item(
+                    Key=self._key(day),
+                    UpdateExpression='SET #attr = :value, '
+                                     'expires_at = if_not_exists(expires_at, :expires)',
+                    ConditionExpression='attribute_not_exists(#attr) OR #attr < :value',
+                    ExpressionAttributeNames={'#attr': attribute},
+                    ExpressionAttributeValues={
+                        ':value': value, ':expires': self._expires_at(time.time())
+                    }
+                )
+            except Exception as e:
+                if client_error_code(e) != 'ConditionalCheckFailedException':
+                    raise
+
+
+# ---------------------------------------------------------------------------
+# Governador
+# ---------------------------------------------------------------------------
+
+class RateLimitGovernor:
+    """Admissão por prioridade contra os orçamentos curto e diário da Strava"""
+
+    def __init__(self,
+                 store=None,
+                 short_limit: int = STRAVA_RATE_LIMIT_SHORT,
+                 long_limit: int = STRAVA_RATE_LIMIT_DAILY,
+                 shares: Optional[Dict[str, float]] = None,
+                 usage_refresh: float = RATE_LIMIT_USAGE_REFRESH,
+                 clock=time.time):
+        """
+        Args:
+            store: Contadores (padrão: MemoryRateLimitStore; DynamoRateLimitStore
+                para compartilhar entre containers)
+            short_limit: Limite da janela de 15 minutos até a Strava informar o real
+            long_limit: Limite diário até a Strava informar o real
+            shares: Fração de cada janela que cada prioridade pode usar
+            usage_refresh: Intervalo mínimo entre leituras do uso compartilhado
+                em budget_low, em segundos
+            clock: Fonte de tempo (injetável em testes)
+        """
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.shares = shares or {
+            Priority.INTERACTIVE: RATE_LIMIT_INTERACTIVE_SHARE,
+            Priority.BACKGROUND: RATE_LIMIT_BACKGROUND_SHARE,
+            Priority.BACKFILL: RATE_LIMIT_BACKFILL_SHARE,
+        }
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._limits = [short_limit, long_limit]
+        # Último uso conhecido: (janela curta, dia) -> (curta, diária)
+        self._seen: Tuple[Tuple[int, str], Tuple[int, int]] = ((-1, ''), (0, 0))
+        self.usage_refresh = usage_refresh
+        self._usage_read_at = float('-inf')
+        self.admitted = {priority: 0 for priority in self.shares}
+        self.rejected = {priority: 0 for priority in self.shares}
+        self.store_errors = 0
+
+    def _windows(self, now: float) -> Tuple[int, str]:
+        return short_window(now), day_window(now)
+
+    def _ceilings(self, priority: str) -> Tuple[int, int]:
+        share = self.shares.get(priority, self.shares[Priority.BACKGROUND])
+        return tuple(max(int(limit * share), 1) for limit in self._limits)
+
+    def _known_usage(self, windows: Tuple[int, str]) -> Tuple[int, int]:
+        seen_windows, (short, daily) = self._seen
+        if seen_windows == windows:
+            return short, daily
+        if seen_windows[1] == windows[1]:
+            return 0, daily
+        return 0, 0
+
+    def _remember(self, windows: Tuple[int, str], short: int, daily: int) -> None:
+        with self._lock:
+            known = self._known_usage(windows)
+            self._seen = (windows, (max(known[0], short), max(known[1], daily)))
+
+    def _exceeded(self, priority: str, windows: Tuple[int, str], now: float) -> RateLimitExceeded:
+        short, daily = self._known_usage(windows)
+        short_ceiling, long_ceiling = self._ceilings(priority)
+        window = 'long' if daily >= long_ceiling else 'short'
+        return RateLimitExceeded(seconds_to_reset(now, window), window)
+
+    def acquire(self, priority: str = Priority.INTERACTIVE) -> None:
+        """
+        Reserva orçamento para uma requisição
+
+        Se os contadores compartilhados falharem, decide pelo último uso
+        conhecido (o 429 da Strava continua sendo a última barreira).
+
+        Raises:
+            RateLimitExceeded: se a janela já está no teto desta prioridade
+        """
+        now = self._clock()
+        windows = self._windows(now)
+        short_ceiling, long_ceiling = self._ceilings(priority)
+
+        try:
+            short, daily = self.store.admit(windows[1], windows[0], short_ceiling, long_ceiling)
+        except _Rejected:
+            try:
+                self._remember(windows, *self.store.usage(windows[1], windows[0]))
+            except Exception as e:
+                logger.warning(f"Erro ao ler uso do rate limit: {e}")
+            self.rejected[priority] = self.rejected.get(priority, 0) + 1
+            raise self._exceeded(priority, windows, now)
+        except Exception as e:
+            self.store_errors += 1
+            logger.error(f"Erro nos contadores de rate limit, usando o último uso conhecido: {e}")
+            short, daily = self._known_usage(windows)
+            if short >= short_ceiling or daily >= long_ceiling:
+                self.rejected[priority] = self.rejected.get(priority, 0) + 1
+                raise self._exceeded(priority, windows, now)
+            short, daily = short + 1, daily + 1
+
+        self._remember(windows, short, daily)
+        self.admitted[priority] = self.admitted.get(priority, 0) + 1
+
+    def observe(self, state: RateLimitState) -> None:
+        """Atualiza limites e uso a partir dos headers de uma resposta"""
+        windows = self._windows(state.observed_at)
+        with self._lock:
+            self._limits[0] = state.short.limit
+            if state.long is not None:
+                self._limits[1] = state.long.limit
+            known_short, known_daily = self._known_usage(windows)
+
+        long_usage = state.long.usage if state.long is not None else None
+        if state.short.usage <= known_short and (long_usage is None or long_usage <= known_daily):
+            return
+        try:
+            self.store.raise_to(windows[1], windows[0], state.short.usage, long_usage)
+        except Exception as e:
+            self.store_errors += 1
+            logger.error(f"Erro ao sincronizar uso do rate limit: {e}")
+        daily = known_daily if long_usage is None else long_usage
+        self._remember(windows, state.short.usage, daily)
+
+    def budget_low(self, priority: str = Priority.BACKGROUND) -> bool:
+        """
+        True se o uso da janela já atingiu o teto da prioridade
+
+        O uso vem do store (inclui o consumo dos outros containers), lido no
+        máximo a cada usage_refresh segundos; entre leituras, e se o store
+        falhar, vale o último uso conhecido.
+        """
+        now = self._clock()
+        windows = self._windows(now)
+        if now - self._usage_read_at >= self.usage_refresh:
+            self._usage_read_at = now
+            try:
+                self._remember(windows, *self.store.usage(windows[1], windows[0]))
+            except Exception as e:
+                self.store_errors += 1
+                logger.warning(f"Erro ao ler uso do rate limit: {e}")
+        short, daily = self._known_usage(windows)
+        short_ceiling, long_ceiling = self._ceilings(priority)
+        return short >= short_ceiling or daily >= long_ceiling
+
+    def stats(self) -> Dict[str, Any]:
+        short, daily = self._known_usage(self._windows(self._clock()))
+        return {
+            'short_usage': short,
+            'daily_usage': daily,
+            'short_limit': self._limits[0],
+            'daily_limit': self._limits[1],
+            'admitted': dict(self.admitted),
+            'rejected': dict(self.rejected),
+            'store_errors': self.store_errors,
+        }
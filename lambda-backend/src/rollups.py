@@ -0,0 +1,160 @@
+"""
+Agregados pré-calculados (rollups) para /stats
+
+Cada dia e cada mês com atividades guarda o estado de um StatsAccumulator
+(um para todas as atividades e um por sport_type). Os períodos
+week/month/year/all viram a fusão de poucos buckets em vez de uma varredura
+de todas as atividades.
+
+Buckets (chaves ordenáveis lexicograficamente, dias em UTC):
+    - 'D2025-11-20': dia
+    - 'M2025-11': mês (fusão dos dias do mês)
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from stats_accumulator import StatsAccumulator
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+
+def start_timestamp(activity: Dict[str, Any]) -> int:
+    """Converte start_date (ISO 8601, UTC) em Unix timestamp"""
+    start_date = activity.get('start_date')
+    if not start_date:
+        return 0
+    return int(datetime.fromisoformat(start_date.replace('Z', '+00:00')).timestamp())
+
+
+def day_key(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('D%Y-%m-%d')
+
+
+def month_key(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('M%Y-%m')
+
+
+def _next_month_start(ts: int) -> int:
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    if dt.month == 12:
+        nxt = datetime(dt.year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        nxt = datetime(dt.year, dt.month + 1, 1, tzinfo=timezone.utc)
+    return int(nxt.timestamp())
+
+
+def _bucket_from_activities(activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bucket = acumulador de todas as atividades + um por sport_type"""
+    by_sport: Dict[str, List[Dict[str, Any]]] = {}
+    for activity in activities:
+        if activity.get('sport_type'):
+            by_sport.setdefault(activity['sport_type'], []).append(activity)
+    return {
+        'all': StatsAccumulator().add_all(activities).to_dict(),
+        'sports': {sport: StatsAccumulator().add_all(items).to_dict()
+                   for sport, items in by_sport.items()}
+    }
+
+
+def _merge_buckets(buckets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged_all = StatsAccumulator()
+    merged_sports: Dict[str, StatsAccumulator] = {}
+    for bucket in buckets:
+        merged_all = merged_all.merge(StatsAccumulator.from_dict(bucket['all']))
+        for sport, data in bucket['sports'].items():
+            merged = merged_sports.get(sport, StatsAccumulator())
+            merged_sports[sport] = merged.merge(StatsAccumulator.from_dict(data))
+    return {
+        'all': merged_all.to_dict(),
+        'sports': {sport: rollup.to_dict() for sport, rollup in merged_sports.items()}
+    }
+
+
+def _select(bucket: Dict[str, Any], sport_type: Optional[str]) -> StatsAccumulator:
+    if sport_type:
+        data = bucket['sports'].get(sport_type)
+        return StatsAccumulator.from_dict(data) if data else StatsAccumulator()
+    return StatsAccumulator.from_dict(bucket['all'])
+
+
+def update_rollups(store, user_id: str, activities: List[Dict[str, Any]]) -> int:
+    """
+    Recalcula os buckets de dia e mês afetados por atividades recém-gravadas
+
+    Os dias afetados são refeitos a partir do store (uma consulta do dia mais
+    antigo ao mais recente) e os meses a partir dos seus dias.
+
+    Returns:
+        Número de buckets gravados
+    """
+    if not activities:
+        return 0
+
+    starts = [start_timestamp(a) for a in activities]
+    days = {day_key(ts) for ts in starts}
+    oldest_day = min(starts) - min(starts) % DAY
+    newest_day = max(starts) - max(starts) % DAY
+
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    for activity in store.query(user_id, after=oldest_day - 1, before=newest_day + DAY):
+        key = day_key(start_timestamp(activity))
+        if key in days:
+            by_day.setdefault(key, []).append(activity)
+
+    buckets = {key: _bucket_from_activities(items) for key, items in by_day.items()}
+    store.put_rollups(user_id, buckets)
+
+    months = {'M' + key[1:8] for key in days}
+    month_days: Dict[str, List[Dict[str, Any]]] = {}
+    month_range = ('D' + min(months)[1:], 'D' + max(months)[1:] + '~')
+    for key, bucket in store.get_rollups(user_id, *month_range).items():
+        month = 'M' + key[1:8]
+        if month in months:
+            month_days.setdefault(month, []).append(bucket)
+
+    month_buckets = {month: _merge_buckets(month_days[month]) for month in sorted(month_days)}
+    store.put_rollups(user_id, month_buckets)
+
+    logger.info(
+        f"Rollups atualizados para {user_id}: "
+        f"{len(buckets)} dia(s), {len(month_buckets)} mês(es)"
+    )
+    return len(buckets) + len(month_buckets)
+
+
+def stats_from_rollups(store,
+                       user_id: str,
+                       after: Optional[int] = None,
+                       sport_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Estatísticas das atividades com início > after, a partir dos rollups
+
+    Igual a calculate_stats(store.query(user_id, after), sport_type): o dia
+    parcial do início da janela é agregado a partir das atividades e o resto
+    vem dos buckets de dia (até o fim daquele mês) e de mês.
+    """
+    if not after:
+        merged = StatsAccumulator()
+        for bucket in store.get_rollups(user_id, 'M', 'M~').values():
+            merged = merged.merge(_select(bucket, sport_type))
+        return merged.to_stats()
+
+    next_day = after - after % DAY + DAY
+    merged = StatsAccumulator()
+    for activity in store.query(user_id, after=after, before=next_day):
+        if not sport_type or activity.get('sport_type') == sport_type:
+            merged.add(activity)
+
+    next_month = _next_month_start(after)
+    if next_day < next_month:
+        days = store.get_rollups(user_id, day_key(next_day), day_key(next_month - DAY))
+        for bucket in days.values():
+            merged = merged.merge(_select(bucket, sport_type))
+
+    for bucket in store.get_rollups(user_id, month_key(next_month), 'M~').values():
+        merged = merged.merge(_select(bucket, sport_type))
+
+    return merged.to_stats()
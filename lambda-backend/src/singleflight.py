@@ -0,0 +1,104 @@
+"""
+Single-flight: coalescência de chamadas concorrentes idênticas
+
+Quando várias threads pedem a mesma chave ao mesmo tempo, só a primeira
+executa a chamada; as demais esperam e recebem o mesmo resultado (ou a
+mesma exceção). AsyncSingleFlight faz o mesmo entre corrotinas.
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Grupo de chamadas em voo, indexado por chave"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Executa fn() uma única vez por chave entre chamadas concorrentes
+
+        Args:
+            key: Identifica chamadas equivalentes
+            fn: Função que faz o trabalho de fato
+
+        Returns:
+            Resultado de fn(), compartilhado entre todos os chamadores
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Número de chaves com chamada em andamento"""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Versão asyncio do SingleFlight
+
+    Corrotinas concorrentes com a mesma chave aguardam a mesma task; o
+    cancelamento de um chamador não cancela a chamada compartilhada.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Aguarda fn() uma única vez por chave entre chamadores concorrentes"""
+        # asyncio só é carregado por quem usa a versão async (não pelos handlers)
+        import asyncio
+
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Número de chaves com chamada em andamento"""
+        return len(self._tasks)
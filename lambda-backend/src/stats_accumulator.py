@@ -0,0 +1,257 @@
+"""
+Acumulador de estatísticas em uma passada
+
+StatsAccumulator consome atividades uma a uma com memória constante:
+somas exatas, contagens, máximos e um heap limitado com as maiores
+atividades por distância. Acumuladores de partes diferentes do histórico
+(shards, buckets de rollup) podem ser fundidos em qualquer ordem com o
+mesmo resultado.
+"""
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+TOP_ACTIVITIES = 5
+
+
+class ExactSum:
+    """
+    Soma de floats corretamente arredondada e independente da ordem
+
+    Guarda parciais não sobrepostos (algoritmo de Shewchuk, o mesmo do
+    math.fsum), então somar em outra ordem ou fundir somas parciais dá
+    exatamente o mesmo valor final.
+    """
+
+    __slots__ = ('partials',)
+
+    def __init__(self, partials: Optional[List[float]] = None):
+        self.partials = list(partials) if partials else []
+
+    def add(self, x: float) -> None:
+        partials = self.partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def merge(self, other: 'ExactSum') -> 'ExactSum':
+        merged = ExactSum(self.partials)
+        for x in other.partials:
+            merged.add(x)
+        return merged
+
+    @property
+    def value(self) -> float:
+        return math.fsum(self.partials)
+
+
+class StatsAccumulator:
+    """Estado parcial e fundível das estatísticas de /stats"""
+
+    _SUMS = ('distance', 'elevation_gain', 'speed_distance', 'hr_sum')
+
+    def __init__(self, top_n: int = TOP_ACTIVITIES):
+        self.top_n = top_n
+        self.count = 0
+        self.distance = ExactSum()
+        self.moving_time = 0
+        self.elevation_gain = ExactSum()
+        self.speed_distance = ExactSum()
+        self.hr_sum = ExactSum()
+        self.hr_count = 0
+        self.max_speed = 0
+        self.max_heartrate = 0
+        self.activities_by_type: Dict[str, int] = {}
+        self.distance_by_type: Dict[str, ExactSum] = {}
+        self.time_by_type: Dict[str, int] = {}
+        # Min-heap de (distância, data, id, seq, entrada) com as top_n maiores
+        self._top: List[tuple] = []
+        self._seq = itertools.count()
+
+    def add(self, activity: Dict[str, Any]) -> None:
+        """Consome uma atividade"""
+        self._add(
+            activity.get('sport_type', activity.get('type', 'Unknown')),
+            activity.get('id'), activity.get('name'), activity.get('start_date'),
+            activity.get('distance', 0), activity.get('moving_time'),
+            activity.get('total_elevation_gain', 0), activity.get('average_speed', 0),
+            activity.get('max_speed', 0), activity.get('average_heartrate'),
+            activity.get('max_heartrate')
+        )
+
+    def _add(self, activity_type, activity_id, name, start_date, distance, moving_time,
+             elevation_gain, avg_speed, max_speed, avg_heartrate, max_heartrate) -> None:
+        distance = distance / 1000  # Converter para km
+        time = 0 if moving_time is None else moving_time
+
+        self.count += 1
+        self.distance.add(distance)
+        self.moving_time += time
+        self.elevation_gain.add(elevation_gain)
+
+        # Por tipo
+        self.activities_by_type[activity_type] = self.activities_by_type.get(activity_type, 0) + 1
+        self.distance_by_type.setdefault(activity_type, ExactSum()).add(distance)
+        self.time_by_type[activity_type] = self.time_by_type.get(activity_type, 0) + time
+
+        # Velocidade (o tempo da média ponderada cai para 1s quando ausente)
+        if avg_speed > 0:
+            self.speed_distance.add(avg_speed * (1 if moving_time is None else moving_time))
+
+        if max_speed > self.max_speed:
+            self.max_speed = max_speed
+
+        # Frequência cardíaca
+        if avg_heartrate:
+            self.hr_sum.add(avg_heartrate)
+            self.hr_count += 1
+
+        if max_heartrate and max_heartrate > self.max_heartrate:
+            self.max_heartrate = max_heartrate
+
+        # Top atividades por distância
+        self._push_top(distance, start_date or '', str(activity_id), {
+            'id': activity_id,
+            'name': name,
+            'distance': round(distance, 2),
+            'moving_time': moving_time,
+            'date': start_date,
+            'type': activity_type
+        })
+
+    def add_all(self, activities: Iterable[Dict[str, Any]]) -> 'StatsAccumulator':
+        for activity in activities:
+            self.add(activity)
+        return self
+
+    def add_frame(self, frame) -> 'StatsAccumulator':
+        """
+        Consome um ActivityFrame coluna a coluna
+
+        Mesmo resultado de add_all() sobre as linhas, sem criar uma view
+        por atividade.
+        """
+        sport_names = frame.sport_names
+        types = [sport_names[code] for code in frame.sport.tolist()]
+        zero_filled = {
+            key: [0 if v is None else v for v in frame.values(key)]
+            for key in ('distance', 'total_elevation_gain', 'average_speed', 'max_speed')
+        }
+        for row in zip(types, frame.values('id'), frame.values('name'), frame.values('start_date'),
+                       zero_filled['distance'], frame.values('moving_time'),
+                       zero_filled['total_elevation_gain'], zero_filled['average_speed'],
+                       zero_filled['max_speed'], frame.values('average_heartrate'),
+                       frame.values('max_heartrate')):
+            self._add(*row)
+        return self
+
+    def _push_top(self, distance: float, date: str, activity_id: str,
+                  entry: Dict[str, Any]) -> None:
+        item = (distance, date, activity_id, next(self._seq), entry)
+        if len(self._top) < self.top_n:
+            heapq.heappush(self._top, item)
+        elif item[:3] > self._top[0][:3]:
+            heapq.heapreplace(self._top, item)
+
+    @property
+    def top_activities(self) -> List[Dict[str, Any]]:
+        """Maiores atividades por distância, da maior para a menor"""
+        return [item[4] for item in sorted(self._top, key=lambda item: item[:3], reverse=True)]
+
+    def merge(self, other: 'StatsAccumulator') -> 'StatsAccumulator':
+        """Novo acumulador com as atividades dos dois"""
+        merged = StatsAccumulator(self.top_n)
+        merged.count = self.count + other.count
+        merged.moving_time = self.moving_time + other.moving_time
+        merged.hr_count = self.hr_count + other.hr_count
+        merged.max_speed = max(self.max_speed, other.max_speed)
+        merged.max_heartrate = max(self.max_heartrate, other.max_heartrate)
+        for name in self._SUMS:
+            setattr(merged, name, getattr(self, name).merge(getattr(other, name)))
+
+        for name in ('activities_by_type', 'time_by_type'):
+            combined = dict(getattr(self, name))
+            for key, value in getattr(other, name).items():
+                combined[key] = combined.get(key, 0) + value
+            setattr(merged, name, combined)
+
+        merged.distance_by_type = dict(self.distance_by_type)
+        for key, value in other.distance_by_type.items():
+            merged.distance_by_type[key] = merged.distance_by_type[key].merge(value) \
+                if key in merged.distance_by_type else value
+
+        for distance, date, activity_id, _, entry in self._top + other._top:
+            merged._push_top(distance, date, activity_id, entry)
+        return merged
+
+    def to_stats(self) -> Dict[str, Any]:
+        """Dicionário de estatísticas no formato de /stats"""
+        stats = {
+            'total_activities': self.count,
+            'total_distance': round(self.distance.value, 2),
+            'total_moving_time': self.moving_time,
+            'total_elevation_gain': round(self.elevation_gain.value, 0),
+            'average_speed': 0,
+            'max_speed': round(self.max_speed * 3.6, 2),  # m/s para km/h
+            'average_heartrate': 0,
+            'max_heartrate': self.max_heartrate,
+            'activities_by_type': dict(self.activities_by_type),
+            'distance_by_type': {k: round(v.value, 2) for k, v in self.distance_by_type.items()},
+            'time_by_type': dict(self.time_by_type),
+            'top_activities': self.top_activities
+        }
+
+        if self.hr_count:
+            average_heartrate = self.hr_sum.value / self.hr_count
+            stats['average_heartrate'] = round(average_heartrate, 0) if average_heartrate > 0 else 0
+
+        # Calcular médias
+        if self.count > 0:
+            stats['average_distance'] = round(self.distance.value / self.count, 2)
+            stats['average_moving_time'] = self.moving_time // self.count
+            stats['average_speed'] = (
+                round(self.speed_distance.value / self.moving_time * 3.6, 2)
+                if self.moving_time > 0 else 0
+            )
+
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado serializável em JSON"""
+        data = {
+            'count': self.count,
+            'moving_time': self.moving_time,
+            'hr_count': self.hr_count,
+            'max_speed': self.max_speed,
+            'max_heartrate': self.max_heartrate,
+            'activities_by_type': self.activities_by_type,
+            'distance_by_type': {k: v.partials for k, v in self.distance_by_type.items()},
+            'time_by_type': self.time_by_type,
+            'top': [[distance, date, activity_id, entry]
+                    for distance, date, activity_id, _, entry in self._top]
+        }
+        for name in self._SUMS:
+            data[name] = getattr(self, name).partials
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], top_n: int = TOP_ACTIVITIES) -> 'StatsAccumulator':
+        acc = cls(top_n)
+        for name in ('count', 'moving_time', 'hr_count', 'max_speed', 'max_heartrate',
+                     'activities_by_type', 'time_by_type'):
+            setattr(acc, name, data[name])
+        for name in cls._SUMS:
+            setattr(acc, name, ExactSum(data[name]))
+        acc.distance_by_type = {k: ExactSum(v) for k, v in data['distance_by_type'].items()}
+        for distance, date, activity_id, entry in data['top']:
+            acc._push_top(distance, date, activity_id, entry)
+        return acc
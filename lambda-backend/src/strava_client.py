@@ -7,15 +7,32 @@ Implementação completa com cache, rate limiting e Datadog tracing
 """
 import os
 import time
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any
 from datetime import datetime, timedelta
 import requests
-from requests_oauthlib import OAuth2Session
 from functools import wraps
 import logging
 
+from config import (
+    CACHE_TTL_ATHLETE,
+    CACHE_TTL_ACTIVITIES,
+    CACHE_TTL_STATS,
+    CLIENT_CACHE_MAX_ENTRIES,
+    CLIENT_CACHE_MAX_BYTES,
+    RATE_LIMIT_MAX_SLEEP,
+)
+from memory_cache import LRUCache
+from rate_limit import (
+    Priority, RateLimitExceeded, RateLimitGovernor, parse_rate_limit_headers, seconds_to_reset
+)
+from singleflight import SingleFlight
+from throttle import Throttler
+from transport import get_session
+
 logger = logging.getLogger(__name__)
 
+_CACHE_MISS = object()
+
 
 class StravaClient:
     """Cliente da API Strava com rate limiting, cache e monitoramento"""
@@ -27,22 +44,51 @@ class StravaClient:
     def __init__(self, 
                  client_id: str, 
                  client_secret: str, 
-                 access_token: Optional[str] = None):
+                 access_token: Optional[str] = None,
+                 session: Optional[requests.Session] = None,
+                 governor: Optional[RateLimitGovernor] = None,
+                 priority: str = Priority.INTERACTIVE,
+                 throttler: Optional[Throttler] = None,
+                 user_id: Optional[str] = None):
         """
         Args:
             client_id: Strava App Client ID
             client_secret: Strava App Client Secret
             access_token: Token de acesso (opcional)
+            session: Sessão HTTP (padrão: sessão compartilhada do processo)
+            governor: Governador de rate limit (com ele, sem orçamento levanta
+                RateLimitExceeded em vez de esperar)
+            priority: Prioridade das requisições deste cliente no governador
+                e no throttler
+            throttler: Throttler local (espera a vez antes de cada requisição)
+            user_id: Usuário dono do token, para o balde por usuário do throttler
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.access_token = access_token
-        self._cache: Dict[str, tuple] = {}  # (data, timestamp)
-        self._cache_ttl = 300  # 5 minutos
+        self.session = session if session is not None else get_session()
+        self._cache_ttl = 300  # 5 minutos (endpoints sem TTL específico)
+        self._endpoint_ttls = {
+            "athlete": CACHE_TTL_ATHLETE,
+            "activities": CACHE_TTL_ACTIVITIES,
+            "stats": CACHE_TTL_STATS,
+        }
+        self._cache = LRUCache(
+            max_entries=CLIENT_CACHE_MAX_ENTRIES,
+            max_bytes=CLIENT_CACHE_MAX_BYTES,
+            default_ttl=self._cache_ttl
+        )
+        self.governor = governor
+        self.priority = priority
+        self.throttler = throttler
+        self.user_id = user_id
         self._rate_limit_remaining = None
         self._rate_limit_reset = None
+        self._rate_limit_window = None
         self._request_count = 0
         self._total_requests = 0
+        self.last_page_timings: List[Dict[str, Any]] = []
+        self._inflight = SingleFlight()
     
     def _cache_key(self, method: str, endpoint: str, **params) -> str:
         """Gera chave de cache única"""
@@ -51,10 +97,17 @@ class StravaClient:
     
     def _is_cache_valid(self, key: str) -> bool:
         """Verifica se cache ainda é válido"""
-        if key not in self._cache:
-            return False
-        data, timestamp = self._cache[key]
-        return (time.time() - timestamp) < self._cache_ttl
+        return key in self._cache
+    
+    def _ttl_for(self, endpoint: str) -> int:
+        """TTL de cache do endpoint (atleta, atividades ou stats)"""
+        if endpoint.startswith("/athlete/activities") or endpoint.startswith("/activities/"):
+            return self._endpoint_ttls["activities"]
+        if endpoint.endswith("/stats"):
+            return self._endpoint_ttls["stats"]
+        if endpoint.startswith("/athlete"):
+            return self._endpoint_ttls["athlete"]
+        return self._cache_ttl
     
     def _rate_limit_exceeded(self) -> bool:
         """Verifica se atingiu rate limit"""
@@ -73,6 +126,9 @@ class StravaClient:
         Returns:
             (auth_url, state)
         """
+        # requests_oauthlib só é usado aqui; fora do import do módulo
+        from requests_oauthlib import OAuth2Session
+        
         if scopes is None:
             scopes = ["read", "activity:read_all"]
         
@@ -103,7 +159,7 @@ class StravaClient:
             "redirect_uri": redirect_uri
         }
         
-        response = requests.post(self.TOKEN_URL, data=payload, timeout=10)
+        response = self.session.post(self.TOKEN_URL, data=payload, timeout=10)
         response.raise_for_status()
         
         token_data = response.json()
@@ -120,7 +176,7 @@ class StravaClient:
             "grant_type": "refresh_token"
         }
         
-        response = requests.post(self.TOKEN_URL, data=payload, timeout=10)
+        response = self.session.post(self.TOKEN_URL, data=payload, timeout=10)
         response.raise_for_status()
         
         token_data = response.json()
@@ -147,22 +203,35 @@ class StravaClient:
         # Verificar cache
         if method == "GET" and use_cache:
             cache_key = self._cache_key(method, endpoint, **kwargs)
-            if self._is_cache_valid(cache_key):
+            cached = self._cache.get(cache_key, _CACHE_MISS)
+            if cached is not _CACHE_MISS:
                 logger.debug(f"Cache HIT: {endpoint}")
-                return self._cache[cache_key][0]
+                return cached
+            
+            # Chamadas idênticas concorrentes compartilham uma única requisição
+            return self._inflight.do(
+                cache_key,
+                lambda: self._send(method, endpoint, cache_key=cache_key, **kwargs)
+            )
         
+        return self._send(method, endpoint, **kwargs)
+    
+    def _send(self, method: str, endpoint: str,
+              cache_key: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Executa a requisição HTTP e grava no cache quando cache_key é informado"""
         # Verificar rate limit
-        if self._rate_limit_exceeded():
-            sleep_time = self._rate_limit_reset - time.time()
-            logger.warning(f"Rate limit atingido. Aguardando {sleep_time}s")
-            time.sleep(sleep_time + 1)
+        self._throttle()
+        delay = self._acquire_rate_limit()
+        if delay is not None:
+            logger.warning(f"Rate limit atingido. Aguardando {delay:.0f}s")
+            time.sleep(delay + 1)
         
         # Fazer requisição
         url = f"{self.BASE_URL}{endpoint}"
         headers = {"Authorization": f"Bearer {self.access_token}"}
         
         try:
-            response = requests.request(
+            response = self.session.request(
                 method=method,
                 url=url,
                 headers=headers,
@@ -173,22 +242,87 @@ class StravaClient:
             logger.error(f"Erro na requisição: {e}")
             raise
         
-        # Atualizar rate limit
-        if "X-RateLimit-Limit" in response.headers:
-            self._rate_limit_remaining = int(response.headers.get("X-RateLimit-Limit", 600))
-            self._rate_limit_reset = int(response.headers.get("X-RateLimit-Reset", 0))
-        
+        self._update_rate_limit(response.headers)
+        self._check_rate_limited(response)
         response.raise_for_status()
         data = response.json()
+        self._store_response(endpoint, cache_key, data, response.content)
+        return data
+    
+    def _throttle(self) -> None:
+        """Espera a vez no throttler, se houver (RateLimitExceeded se demorar demais)"""
+        if self.throttler is None:
+            return
+        waited = self.throttler.acquire(self.user_id or '', self.priority)
+        if waited > 1:
+            logger.info(f"Throttler: {waited:.1f}s na fila ({self.priority})")
+    
+    def _acquire_rate_limit(self) -> Optional[float]:
+        """
+        Reserva orçamento antes de uma requisição
         
-        # Cachear resultado
-        if method == "GET" and use_cache:
-            cache_key = self._cache_key(method, endpoint, **kwargs)
-            self._cache[cache_key] = (data, time.time())
+        Com governador, ele decide (e levanta RateLimitExceeded sem
+        orçamento). Sem governador, vale a última resposta: se a janela
+        esgotou e zera em até RATE_LIMIT_MAX_SLEEP segundos, retorna quanto
+        esperar; se zera depois, levanta RateLimitExceeded.
+        
+        Returns:
+            Segundos a esperar antes da requisição, ou None
+        """
+        if self.governor is not None:
+            self.governor.acquire(self.priority)
+            return None
+        delay = self._rate_limit_delay()
+        if delay is not None and delay > RATE_LIMIT_MAX_SLEEP:
+            raise RateLimitExceeded(delay, self._rate_limit_window or 'short')
+        return delay
+    
+    def _check_rate_limited(self, response) -> None:
+        """429 vira RateLimitExceeded quando há governador (quem chama degrada para o cache)"""
+        if response.status_code != 429 or self.governor is None:
+            return
+        window = self._rate_limit_window or 'short'
+        raise RateLimitExceeded(seconds_to_reset(time.time(), window), window)
+    
+    def _rate_limit_delay(self) -> Optional[float]:
+        """Segundos até o reset do rate limit, ou None se não foi atingido"""
+        if not self._rate_limit_exceeded():
+            return None
+        return self._rate_limit_reset - time.time()
+    
+    def _update_rate_limit(self, headers) -> None:
+        """
+        Atualiza o estado de rate limit a partir dos headers da resposta
+        
+        X-RateLimit-Limit/Usage trazem as janelas de 15 minutos e diária
+        ("200,2000" / "34,310"). _rate_limit_reset só é preenchido quando
+        uma janela esgotou: é quando ela zera (a Strava não envia Reset).
+        """
+        now = time.time()
+        state = parse_rate_limit_headers(headers, now)
+        if state is None:
+            return
+        self._rate_limit_remaining = state.remaining
+        self._rate_limit_window = state.exhausted_window()
+        self._rate_limit_reset = None
+        if self._rate_limit_window:
+            self._rate_limit_reset = now + seconds_to_reset(now, self._rate_limit_window)
+        if self.governor is not None:
+            self.governor.observe(state)
+    
+    def _store_response(self, endpoint: str, cache_key: Optional[str],
+                        data: Any, content: Any) -> None:
+        """Cacheia o resultado (quando cache_key é informado) e conta a requisição"""
+        if cache_key is not None:
+            self._cache.set(
+                cache_key,
+                data,
+                ttl=self._ttl_for(endpoint),
+                size=len(content) if isinstance(content, (bytes, bytearray)) else None
+            )
             logger.debug(f"Cache SET: {endpoint}")
         
         self._request_count += 1
-        return data
     
     def get_athlete(self, athlete_id: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -245,6 +379,51 @@ class StravaClient:
         
         return self._request("GET", "/athlete/activities", params=params)
     
+    def iter_activities(self,
+                        after: Optional[int] = None,
+                        before: Optional[int] = None,
+                        per_page: int = 200,
+                        on_page: Optional[Callable[[Dict[str, Any]], None]] = None
+                        ) -> Iterator[Dict[str, Any]]:
+        """
+        Itera sobre todas as atividades do período, página a página
+
+        As páginas são buscadas sob demanda: a próxima só é pedida quando o
+        consumidor esgota a atual, e a iteração termina na primeira página
+        incompleta.
+
+        Args:
+            after: Unix timestamp - atividades posteriores
+            before: Unix timestamp - atividades anteriores
+            per_page: Atividades por página (máx 200)
+            on_page: Callback chamado com o timing de cada página
+
+        Yields:
+            Atividades, na ordem retornada pela API
+        """
+        per_page = min(per_page, 200)
+        self.last_page_timings = []
+        page = 1
+
+        while True:
+            start = time.perf_counter()
+            activities = self.get_activities(before=before, after=after,
+                                             page=page, per_page=per_page)
+            timing = {
+                "page": page,
+                "count": len(activities),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+            self.last_page_timings.append(timing)
+            if on_page is not None:
+                on_page(timing)
+
+            yield from activities
+
+            if len(activities) < per_page:
+                break
+            page += 1
+
     def get_activity(self, activity_id: int, include_all_efforts: bool = False) -> Dict[str, Any]:
         """
         Obtém detalhes de uma atividade específica
@@ -266,10 +445,19 @@ class StravaClient:
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Retorna estatísticas do cache"""
+        cache = self._cache.stats()
         return {
-            "cache_size": len(self._cache),
+            "cache_size": cache["entries"],
+            "cache_bytes": cache["bytes"],
+            "cache_max_entries": cache["max_entries"],
+            "cache_max_bytes": cache["max_bytes"],
+            "cache_hits": cache["hits"],
+            "cache_misses": cache["misses"],
+            "cache_evictions": cache["evictions"],
+            "cache_expirations": cache["expirations"],
             "cache_ttl": self._cache_ttl,
             "rate_limit_remaining": self._rate_limit_remaining,
             "total_requests": self._total_requests,
+            "coalesced_requests": self._inflight.coalesced,
             "cached_requests": self._request_count
         }
@@ -0,0 +1,312 @@
+"""
+Throttler local de requisições à Strava: token buckets e filas por prioridade
+
+O RateLimitGovernor (rate_limit.py) decide se ainda há orçamento na janela;
+o throttler decide quem usa esse orçamento, e quando. Cada requisição
+precisa de uma ficha do balde global (a cota do app espalhada ao longo da
+janela) e de uma do balde do usuário (um atleta fazendo backfill não
+consome a cota de todos). Enquanto espera, a requisição fica numa fila
+por prioridade:
+
+- interactive: leituras do dashboard
+- background: sincronizações agendadas e renovações do cache
+- backfill: importações de histórico
+
+Cada ficha global liberada vai para a classe mais urgente com alguém cujo
+balde de usuário tem ficha; dentro da classe, os usuários se revezam
+(round-robin), então um usuário com muitas requisições na fila não passa
+na frente dos outros.
+
+ThrottleScheduler é o núcleo, sem threads e sem relógio próprio (o tempo
+é sempre passado), o que permite replays determinísticos
+(tests/performance/simulate_throttle.py). Throttler envolve o scheduler
+para uso concorrente, bloqueando a thread até a sua vez.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import (
+    THROTTLE_GLOBAL_RATE,
+    THROTTLE_GLOBAL_BURST,
+    THROTTLE_USER_RATE,
+    THROTTLE_USER_BURST,
+    THROTTLE_MAX_WAIT,
+    THROTTLE_MAX_USERS
+)
+from rate_limit import Priority, RateLimitExceeded
+
+# Tolerância de ponto flutuante no reabastecimento dos baldes
+_EPSILON = 1e-9
+
+# Esperas recentes guardadas por prioridade para os percentis
+WAIT_SAMPLES = 512
+
+
+class TokenBucket:
+    """Balde de fichas: rate fichas por segundo, até capacity acumuladas"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def available(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1 - _EPSILON
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def ready_at(self, now: float) -> float:
+        """Instante em que haverá uma ficha"""
+        self._refill(now)
+        if self.tokens >= 1 - _EPSILON:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity - _EPSILON
+
+
+class Ticket:
+    """Uma requisição na fila do throttler"""
+
+    __slots__ = ("user_id", "priority", "enqueued_at", "granted_at")
+
+    def __init__(self, user_id: str, priority: str, enqueued_at: float):
+        self.user_id = user_id
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.granted_at: Optional[float] = None
+
+    @property
+    def wait(self) -> Optional[float]:
+        """Segundos na fila (None enquanto não liberada)"""
+        if self.granted_at is None:
+            return None
+        return self.granted_at - self.enqueued_at
+
+
+class ThrottleScheduler:
+    """Filas por prioridade servidas por um balde global e baldes por usuário"""
+
+    def __init__(self,
+                 global_rate: float = THROTTLE_GLOBAL_RATE,
+                 global_burst: int = THROTTLE_GLOBAL_BURST,
+                 user_rate: Optional[float] = THROTTLE_USER_RATE,
+                 user_burst: int = THROTTLE_USER_BURST,
+                 max_users: int = THROTTLE_MAX_USERS,
+                 now: float = 0.0):
+        """
+        Args:
+            global_rate: Fichas por segundo para o app inteiro
+            global_burst: Fichas globais acumuláveis
+            user_rate: Fichas por segundo por usuário (None: sem limite por usuário)
+            user_burst: Fichas acumuláveis por usuário
+            max_users: Acima disso, baldes de usuários ociosos são descartados
+            now: Instante inicial (baldes começam cheios)
+        """
+        self._global = TokenBucket(global_rate, global_burst, now)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self._users: Dict[str, TokenBucket] = {}
+        # Prioridade -> usuário -> fila; a ordem dos usuários é o round-robin
+        self._queues: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {
+            priority: OrderedDict() for priority in Priority.ORDER
+        }
+        self._depth = {priority: 0 for priority in Priority.ORDER}
+        self.max_depth = {priority: 0 for priority in Priority.ORDER}
+        self.granted = {priority: 0 for priority in Priority.ORDER}
+        self.cancelled = {priority: 0 for priority in Priority.ORDER}
+        self._wait_total = {priority: 0.0 for priority in Priority.ORDER}
+        self._wait_max = {priority: 0.0 for priority in Priority.ORDER}
+        self._waits: Dict[str, Deque[float]] = {
+            priority: deque(maxlen=WAIT_SAMPLES) for priority in Priority.ORDER
+        }
+
+    @property
+    def waiting(self) -> int:
+        """Requisições na fila (todas as prioridades)"""
+        return sum(self._depth.values())
+
+    def _class(self, priority: str) -> str:
+        return priority if priority in self._queues else Priority.BACKGROUND
+
+    def _user_bucket(self, user_id: str, now: float) -> TokenBucket:
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = self._users[user_id] = TokenBucket(self.user_rate, self.user_burst, now)
+        return bucket
+
+    def _user_ready(self, user_id: str, now: float) -> bool:
+        return self.user_rate is None or self._user_bucket(user_id, now).available(now)
+
+    def submit(self, user_id: str, priority: str, now: float) -> Ticket:
+        """Coloca uma requisição na fila (liberada por dispatch)"""
+        priority = self._class(priority)
+        ticket = Ticket(user_id, priority, now)
+        self._queues[priority].setdefault(user_id, deque()).append(ticket)
+        self._depth[priority] += 1
+        self.max_depth[priority] = max(self.max_depth[priority], self._depth[priority])
+        return ticket
+
+    def cancel(self, ticket: Ticket) -> bool:
+        """Tira da fila uma requisição ainda não liberada (ex: desistiu de esperar)"""
+        tickets = self._queues[ticket.priority].get(ticket.user_id)
+        if ticket.granted_at is not None or tickets is None or ticket not in tickets:
+            return False
+        tickets.remove(ticket)
+        if not tickets:
+            del self._queues[ticket.priority][ticket.user_id]
+        self._depth[ticket.priority] -= 1
+        self.cancelled[ticket.priority] += 1
+        return True
+
+    def _next_ticket(self, now: float) -> Optional[Ticket]:
+        for priority in Priority.ORDER:
+            queue = self._queues[priority]
+            for user_id in queue:
+                if not self._user_ready(user_id, now):
+                    continue
+                tickets = queue[user_id]
+                ticket = tickets.popleft()
+                if tickets:
+                    queue.move_to_end(user_id)
+                else:
+                    del queue[user_id]
+                return ticket
+        return None
+
+    def dispatch(self, now: float) -> List[Ticket]:
+        """
+        Libera as requisições que já têm fichas
+
+        Returns:
+            Requisições liberadas, na ordem em que foram atendidas
+        """
+        granted = []
+        while self.waiting and self._global.available(now):
+            ticket = self._next_ticket(now)
+            if ticket is None:
+                break
+            self._global.take(now)
+            if self.user_rate is not None:
+                self._users[ticket.user_id].take(now)
+            ticket.granted_at = now
+            self._record(ticket)
+            granted.append(ticket)
+        if len(self._users) > self.max_users:
+            self._prune(now)
+        return granted
+
+    def _record(self, ticket: Ticket) -> None:
+        priority, wait = ticket.priority, ticket.wait
+        self._depth[priority] -= 1
+        self.granted[priority] += 1
+        self._wait_total[priority] += wait
+        self._wait_max[priority] = max(self._wait_max[priority], wait)
+        self._waits[priority].append(wait)
+
+    def _prune(self, now: float) -> None:
+        # Balde cheio equivale a um novo: descartar não muda nada
+        waiting = {user_id for queue in self._queues.values() for user_id in queue}
+        for user_id in [u for u, b in self._users.items() if u not in waiting and b.full(now)]:
+            del self._users[user_id]
+
+    def next_ready_at(self, now: float) -> Optional[float]:
+        """Próximo instante em que dispatch pode liberar algo (None com a fila vazia)"""
+        if not self.waiting:
+            return None
+        ready_at = self._global.ready_at(now)
+        if self.user_rate is not None:
+            users = {user_id for queue in self._queues.values() for user_id in queue}
+            ready_at = max(ready_at, min(self._user_bucket(u, now).ready_at(now) for u in users))
+        return ready_at
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profundidade das filas e tempos de espera por prioridade"""
+        wait = {}
+        for priority in Priority.ORDER:
+            samples = sorted(self._waits[priority])
+            count = self.granted[priority]
+            wait[priority] = {
+                'avg_ms': round(self._wait_total[priority] / count * 1000, 1) if count else 0.0,
+                'p95_ms': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 1)
+                if samples else 0.0,
+                'max_ms': round(self._wait_max[priority] * 1000, 1),
+            }
+        return {
+            'queue_depth': dict(self._depth),
+            'max_queue_depth': dict(self.max_depth),
+            'granted': dict(self.granted),
+            'cancelled': dict(self.cancelled),
+            'wait': wait,
+            'users': len(self._users),
+        }
+
+
+class Throttler:
+    """ThrottleScheduler para uso entre threads: acquire() bloqueia até a vez"""
+
+    def __init__(self,
+                 scheduler: Optional[ThrottleScheduler] = None,
+                 max_wait: float = THROTTLE_MAX_WAIT,
+                 clock=time.monotonic):
+        """
+        Args:
+            scheduler: Núcleo (padrão: limites do config)
+            max_wait: Espera máxima padrão na fila, em segundos
+            clock: Fonte de tempo monotônica (injetável em testes)
+        """
+        self._clock = clock
+        self.scheduler = scheduler if scheduler is not None else ThrottleScheduler(now=clock())
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+
+    def acquire(self, user_id: str, priority: str = Priority.INTERACTIVE,
+                max_wait: Optional[float] = None) -> float:
+        """
+        Espera a vez de uma requisição
+
+        Quem está esperando também despacha: cada thread, ao acordar,
+        libera as fichas disponíveis e acorda as demais.
+
+        Returns:
+            Segundos na fila
+
+        Raises:
+            RateLimitExceeded: se a vez não chegou em max_wait segundos
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._cond:
+            now = self._clock()
+            deadline = now + max_wait
+            ticket = self.scheduler.submit(user_id, priority, now)
+            while True:
+                if self.scheduler.dispatch(now):
+                    self._cond.notify_all()
+                if ticket.granted_at is not None:
+                    return ticket.wait
+                ready_at = self.scheduler.next_ready_at(now)
+                if now >= deadline:
+                    self.scheduler.cancel(ticket)
+                    raise RateLimitExceeded(max(ready_at - now, 0.0), 'throttle')
+                self._cond.wait(max(min(ready_at, deadline) - now, 0.001))
+                now = self._clock()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return self.scheduler.metrics()
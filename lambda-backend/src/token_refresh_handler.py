@@ -0,0 +1,102 @@
+"""
+Handler agendado para renovação antecipada de tokens (EventBridge)
+
+Percorre strava-users atrás de tokens que expiram em até
+TOKEN_REFRESH_WINDOW segundos e os renova antes que uma requisição
+precise deles, em lotes de TOKEN_REFRESH_BATCH_SIZE usuários renovados
+em paralelo. Cada renovação passa pelo lock de refresh_access_token, então
+um usuário que já está sendo renovado por uma requisição é apenas pulado.
+Perto do timeout da Lambda o handler para; os restantes ficam para a
+próxima execução.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Tuple
+
+from config import TOKEN_REFRESH_WINDOW, TOKEN_REFRESH_BATCH_SIZE, TOKEN_REFRESH_WORKERS
+from auth_handler import refresh_access_token, token_manager, TokenRefreshInProgress
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Margem mantida antes do timeout da Lambda para não iniciar outro lote
+TIME_MARGIN_MS = 10_000
+
+
+def lambda_handler(event, context):
+    """
+    Handler do agendamento (rate(10 minutes) no serverless.yml)
+
+    Event (opcional):
+    - window: segundos à frente para considerar um token expirando
+    """
+    window = int((event or {}).get('window', TOKEN_REFRESH_WINDOW))
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+
+    summary = refresh_expiring_tokens(window=window, remaining_ms=remaining_ms)
+    logger.info(f"Renovação agendada de tokens: {summary}")
+    return summary
+
+
+def refresh_expiring_tokens(window: int = TOKEN_REFRESH_WINDOW,
+                            batch_size: int = TOKEN_REFRESH_BATCH_SIZE,
+                            workers: int = TOKEN_REFRESH_WORKERS,
+                            remaining_ms=None) -> Dict[str, int]:
+    """
+    Renova os tokens que expiram nos próximos window segundos
+
+    Args:
+        window: Segundos à frente
+        batch_size: Usuários por lote
+        workers: Renovações simultâneas dentro de um lote
+        remaining_ms: context.get_remaining_time_in_millis da Lambda (opcional)
+
+    Returns:
+        Contadores: expiring (lidos), refreshed, skipped (outra invocação
+        renovando), failed e deferred (o lote que não coube no tempo; as
+        páginas seguintes nem são lidas e ficam para a próxima execução)
+    """
+    summary = {'expiring': 0, 'refreshed': 0, 'skipped': 0, 'failed': 0, 'deferred': 0}
+    before = time.time() + window
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for batch in _batches(_expiring_users(before), batch_size):
+            summary['expiring'] += len(batch)
+            if remaining_ms is not None and remaining_ms() < TIME_MARGIN_MS:
+                summary['deferred'] = len(batch)
+                break
+            for outcome in pool.map(_refresh_one, batch):
+                summary[outcome] += 1
+
+    return summary
+
+
+def _expiring_users(before: float) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    for page in token_manager.scan_expiring(before):
+        yield from page
+
+
+def _batches(users: Iterable[Tuple[str, Dict[str, Any]]],
+             size: int) -> Iterable[List[Tuple[str, Dict[str, Any]]]]:
+    batch = []
+    for user in users:
+        batch.append(user)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _refresh_one(user: Tuple[str, Dict[str, Any]]) -> str:
+    """Renova um usuário sem esperar por outra renovação em andamento"""
+    user_id, tokens = user
+    try:
+        refresh_access_token(user_id, tokens, wait=0)
+        return 'refreshed'
+    except TokenRefreshInProgress:
+        return 'skipped'
+    except Exception as e:
+        logger.error(f"Falha na renovação agendada de {user_id}: {e}")
+        return 'failed'
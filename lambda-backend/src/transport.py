@@ -0,0 +1,95 @@
+"""
+Camada de transporte HTTP compartilhada
+
+Mantém uma única requests.Session em escopo de módulo, com pool de conexões
+keep-alive e retries, para que invocações "quentes" da Lambda reaproveitem
+conexões TCP/TLS com a API da Strava em vez de abrir uma nova a cada chamada.
+"""
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+)
+
+logger = logging.getLogger(__name__)
+
+# Erros transitórios do lado do servidor. 429 fica de fora de propósito:
+# o rate limit é tratado pelo StravaClient, não por retries cegos.
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def build_session(pool_connections: int = HTTP_POOL_CONNECTIONS,
+                  pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                  max_retries: int = HTTP_MAX_RETRIES,
+                  backoff_factor: float = HTTP_BACKOFF_FACTOR) -> requests.Session:
+    """
+    Cria uma Session com HTTPAdapter configurado
+
+    Args:
+        pool_connections: Número de pools (hosts) mantidos
+        pool_maxsize: Conexões mantidas por host
+        max_retries: Tentativas em erros de conexão e 5xx
+        backoff_factor: Fator de backoff exponencial entre tentativas
+
+    Returns:
+        requests.Session pronta para uso
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a Session compartilhada do processo
+
+    Criada na primeira chamada e reaproveitada enquanto o container da
+    Lambda (ou o processo local) estiver vivo.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+                logger.info("Sessão HTTP compartilhada criada")
+    return _session
+
+
+def reset_session() -> None:
+    """Fecha e descarta a Session compartilhada (útil em testes)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
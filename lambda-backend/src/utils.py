@@ -4,61 +4,258 @@ Utilitários para Backend APIs
 import json
 import logging
 import hashlib
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from config import (
     DYNAMODB_TABLE_CACHE,
     DYNAMODB_TABLE_USERS,
     AWS_REGION,
     CACHE_TTL_ATHLETE,
     CACHE_TTL_ACTIVITIES,
-    CACHE_TTL_STATS
+    CACHE_TTL_STATS,
+    CACHE_REFRESH_LEASE_SECONDS,
+    CACHE_RETENTION_SECONDS,
+    TOKEN_REFRESH_LOCK_SECONDS
 )
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
 
+class LazyResource:
+    """
+    boto3 resource criado no primeiro uso
+    
+    Importar boto3 e criar o resource custa ~130ms; fora do import do
+    módulo, caminhos que não tocam a AWS (validação, 4xx, testes) não
+    pagam isso no cold start. Atributos são repassados ao resource real.
+    """
+    
+    def __init__(self, service: str, region_name: str = AWS_REGION):
+        self._service = service
+        self._region_name = region_name
+        self._resource = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self._resource is None:
+            with self._lock:
+                if self._resource is None:
+                    import boto3
+                    self._resource = boto3.resource(self._service, region_name=self._region_name)
+        return self._resource
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+dynamodb = LazyResource('dynamodb')
+
+# Renovações de cache em segundo plano. Na Lambda a thread é congelada junto
+# com o container quando a resposta sai e continua na próxima invocação.
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
 
-class CacheManager:
-    """Gerencia cache no DynamoDB"""
+# Limites do DynamoDB por BatchGetItem e tentativas para UnprocessedKeys
+BATCH_GET_LIMIT = 100
+BATCH_MAX_ATTEMPTS = 5
+BATCH_RETRY_BASE_DELAY = 0.05
+
+
+def batch_get_items(resource,
+                    keys_by_table: Dict[str, List[Dict[str, Any]]]
+                    ) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lê chaves de uma ou mais tabelas com BatchGetItem
+    
+    Divide em lotes de BATCH_GET_LIMIT chaves e reenvia UnprocessedKeys com
+    backoff exponencial. Chaves repetidas são lidas uma vez.
     
-    def __init__(self):
-        self.table = dynamodb.Table(DYNAMODB_TABLE_CACHE)
+    Returns:
+        Itens encontrados por tabela (chaves ausentes simplesmente não aparecem)
+    """
+    pending = []
+    for table_name, keys in keys_by_table.items():
+        seen = set()
+        for key in keys:
+            marker = tuple(sorted(key.items()))
+            if marker not in seen:
+                seen.add(marker)
+                pending.append((table_name, key))
+    
+    items = {table_name: [] for table_name in keys_by_table}
+    for start in range(0, len(pending), BATCH_GET_LIMIT):
+        request = {}
+        for table_name, key in pending[start:start + BATCH_GET_LIMIT]:
+            request.setdefault(table_name, {'Keys': []})['Keys'].append(key)
+        
+        attempt = 0
+        while request:
+            response = resource.batch_get_item(RequestItems=request)
+            for table_name, found in response.get('Responses', {}).items():
+                items[table_name].extend(found)
+            request = response.get('UnprocessedKeys') or {}
+            if request:
+                attempt += 1
+                if attempt >= BATCH_MAX_ATTEMPTS:
+                    raise RuntimeError(
+                        f"BatchGetItem: chaves não processadas após {attempt} tentativas"
+                    )
+                time.sleep(BATCH_RETRY_BASE_DELAY * (2 ** attempt))
+    return items
+
+
+def client_error_code(error: Exception) -> Optional[str]:
+    """Código de erro de um ClientError do botocore (sem importar botocore)"""
+    response = getattr(error, 'response', None)
+    return response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+
+
+class TableManager:
+    """Base dos gerenciadores: a tabela só é aberta no primeiro acesso"""
+    
+    TABLE_NAME = ''
+    
+    def __init__(self, resource=None):
+        """
+        Args:
+            resource: boto3 DynamoDB resource (padrão: o do módulo, criado sob demanda)
+        """
+        self.dynamodb = resource if resource is not None else dynamodb
+        self._table = None
+    
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self.dynamodb.Table(self.TABLE_NAME)
+        return self._table
+    
+    @table.setter
+    def table(self, table) -> None:
+        self._table = table
+
+
+class CacheManager(TableManager):
+    """
+    Gerencia cache no DynamoDB
+    
+    fresh_until marca o fim do TTL do item; expires_at (epoch) é o atributo
+    de TTL da tabela, CACHE_RETENTION_SECONDS depois. Leituras não apagam
+    itens expirados: o TTL do DynamoDB os remove.
+    """
+    
+    TABLE_NAME = DYNAMODB_TABLE_CACHE
     
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Recupera item do cache se não expirou"""
+        data, _ = self.get_with_staleness(key)
+        return data
+    
+    def get_with_staleness(self, key: str,
+                           max_staleness: int = 0) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Recupera item do cache, aceitando itens expirados há no máximo max_staleness segundos
+        
+        Returns:
+            (dados, stale) - dados é None em MISS; stale indica item expirado
+            que deve ser renovado
+        """
         try:
             response = self.table.get_item(Key={'cache_key': key})
-            if 'Item' in response:
-                item = response['Item']
-                # Verifica expiração
-                if datetime.fromisoformat(item['expires_at']) > datetime.now(datetime.now().astimezone().tzinfo):
-                    logger.info(f"Cache HIT: {key}")
-                    return json.loads(item['data'])
-                else:
-                    logger.info(f"Cache EXPIRED: {key}")
-                    self.delete(key)
-            logger.info(f"Cache MISS: {key}")
-            return None
+            return self.read_item(key, response.get('Item'), max_staleness)
         except Exception as e:
             logger.error(f"Erro ao recuperar cache: {e}")
-            return None
+            return None, False
     
-    def set(self, key: str, data: Dict[str, Any], ttl: int) -> bool:
-        """Armazena item no cache com TTL"""
+    def read_item(self, key: str, item: Optional[Dict[str, Any]],
+                  max_staleness: int = 0) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Interpreta um item lido do cache (get_item ou BatchGetItem)
+        
+        Itens gravados antes de fresh_until existir contam como MISS (o
+        próximo set os substitui).
+        
+        Returns:
+            (dados, stale) - como get_with_staleness
+        """
+        if item is not None and 'fresh_until' in item:
+            fresh_until = datetime.fromisoformat(item['fresh_until'])
+            now = datetime.now()
+            # Verifica expiração
+            if fresh_until > now:
+                logger.info(f"Cache HIT: {key}")
+                return json.loads(item['data']), False
+            if now - fresh_until <= timedelta(seconds=max_staleness):
+                logger.info(f"Cache STALE: {key}")
+                return json.loads(item['data']), True
+            logger.info(f"Cache EXPIRED: {key}")
+            return None, False
+        logger.info(f"Cache MISS: {key}")
+        return None, False
+    
+    def batch_get(self, keys: Iterable[str],
+                  max_staleness: int = 0) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """
+        Recupera várias chaves com BatchGetItem
+        
+        Returns:
+            {chave: (dados, stale)} só para as chaves presentes e dentro da
+            janela
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            found = batch_get_items(self.dynamodb, {
+                self.table.name: [{'cache_key': key} for key in keys]
+            })[self.table.name]
+        except Exception as e:
+            logger.error(f"Erro ao recuperar cache em lote: {e}")
+            return {}
+        
+        results = {}
+        for item in found:
+            key = item['cache_key']
+            data, stale = self.read_item(key, item, max_staleness)
+            if data is not None:
+                results[key] = (data, stale)
+        return results
+    
+    def try_acquire_refresh(self, key: str,
+                            lease_seconds: int = CACHE_REFRESH_LEASE_SECONDS) -> bool:
+        """
+        Reserva a renovação de um item stale para esta invocação
+        
+        Escrita condicional no DynamoDB: só uma invocação por janela de
+        lease_seconds ganha a reserva, as demais apenas servem o item stale.
+        """
+        now = datetime.now()
         try:
-            expires_at = datetime.now() + timedelta(seconds=ttl)
-            self.table.put_item(
-                Item={
-                    'cache_key': key,
-                    'data': json.dumps(data),
-                    'expires_at': expires_at.isoformat(),
-                    'created_at': datetime.now().isoformat()
+            self.table.update_item(
+                Key={'cache_key': key},
+                UpdateExpression='SET refresh_lease_until = :until',
+                ConditionExpression='attribute_exists(cache_key) AND '
+                                    '(attribute_not_exists(refresh_lease_until)'
+                                    ' OR refresh_lease_until < :now)',
+                ExpressionAttributeValues={
+                    ':until': (now + timedelta(seconds=lease_seconds)).isoformat(),
+                    ':now': now.isoformat()
                 }
             )
+            return True
+        except Exception as e:
+            if client_error_code(e) == 'ConditionalCheckFailedException':
+                return False
+            logger.error(f"Erro ao reservar renovação de cache: {e}")
+            return False
+    
+    def set(self, key: str, data: Dict[str, Any], ttl: int) -> bool:
+        """Armazena item no cache com TTL"""
+        try:
+            self.table.put_item(Item=self._item(key, data, ttl))
             logger.info(f"Cache SET: {key} (TTL: {ttl}s)")
             return True
         except Exception as e:
@@ -73,40 +270,168 @@ class CacheManager:
         except Exception as e:
             logger.error(f"Erro ao deletar cache: {e}")
             return False
+    
+    @staticmethod
+    def _item(key: str, data: Dict[str, Any], ttl: int) -> Dict[str, Any]:
+        now = datetime.now()
+        return {
+            'cache_key': key,
+            'data': json.dumps(data),
+            'fresh_until': (now + timedelta(seconds=ttl)).isoformat(),
+            'expires_at': int(time.time()) + ttl + CACHE_RETENTION_SECONDS,
+            'created_at': now.isoformat()
+        }
+    
+    def batch_set(self, items: Dict[str, Dict[str, Any]], ttl: int) -> bool:
+        """Armazena vários itens com o mesmo TTL (BatchWriteItem, 25 por requisição)"""
+        try:
+            with self.table.batch_writer(overwrite_by_pkeys=['cache_key']) as batch:
+                for key, data in items.items():
+                    batch.put_item(Item=self._item(key, data, ttl))
+            logger.info(f"Cache SET em lote: {len(items)} itens (TTL: {ttl}s)")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao armazenar cache em lote: {e}")
+            return False
+    
+    def batch_delete(self, keys: Iterable[str]) -> bool:
+        """Remove várias chaves (BatchWriteItem, 25 por requisição)"""
+        try:
+            with self.table.batch_writer(overwrite_by_pkeys=['cache_key']) as batch:
+                for key in keys:
+                    batch.delete_item(Key={'cache_key': key})
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao deletar cache em lote: {e}")
+            return False
 
 
-class TokenManager:
+class TokenManager(TableManager):
     """Gerencia tokens de autenticação"""
     
-    def __init__(self):
-        self.table = dynamodb.Table(DYNAMODB_TABLE_USERS)
+    TABLE_NAME = DYNAMODB_TABLE_USERS
+    
+    @staticmethod
+    def _token_attributes(tokens: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'access_token': tokens.get('access_token'),
+            'refresh_token': tokens.get('refresh_token'),
+            'expires_at': tokens.get('expires_at'),
+            'token_type': tokens.get('token_type', 'Bearer')
+        }
     
-    def save_token(self, user_id: str, tokens: Dict[str, Any]) -> bool:
-        """Salva access_token e refresh_token para um usuário"""
+    def save_token(self, user_id: str, tokens: Dict[str, Any],
+                   lock_owner: Optional[str] = None) -> bool:
+        """
+        Salva access_token e refresh_token para um usuário
+        
+        Com lock_owner, só grava se o lock de renovação ainda é desse dono,
+        e o libera na mesma escrita.
+        """
+        update = 'SET #tokens = :tokens, #updated = :updated'
+        values = {
+            ':tokens': self._token_attributes(tokens),
+            ':updated': datetime.now().isoformat()
+        }
+        condition = {}
+        if lock_owner is not None:
+            update += ' REMOVE refresh_lock_owner, refresh_lock_until'
+            values[':owner'] = lock_owner
+            condition['ConditionExpression'] = 'refresh_lock_owner = :owner'
         try:
             self.table.update_item(
                 Key={'user_id': user_id},
-                UpdateExpression='SET #tokens = :tokens, #updated = :updated',
+                UpdateExpression=update,
                 ExpressionAttributeNames={
                     '#tokens': 'tokens',
                     '#updated': 'updated_at'
                 },
-                ExpressionAttributeValues={
-                    ':tokens': {
-                        'access_token': tokens.get('access_token'),
-                        'refresh_token': tokens.get('refresh_token'),
-                        'expires_at': tokens.get('expires_at'),
-                        'token_type': tokens.get('token_type', 'Bearer')
-                    },
-                    ':updated': datetime.now().isoformat()
-                }
+                ExpressionAttributeValues=values,
+                **condition
             )
             logger.info(f"Tokens salvos para usuário: {user_id}")
             return True
         except Exception as e:
+            if client_error_code(e) == 'ConditionalCheckFailedException':
+                logger.warning(f"Lock de renovação perdido, tokens não salvos: {user_id}")
+                return False
             logger.error(f"Erro ao salvar tokens: {e}")
             return False
     
+    def try_acquire_refresh_lock(self, user_id: str,
+                                 lease_seconds: int = TOKEN_REFRESH_LOCK_SECONDS) -> Optional[str]:
+        """
+        Reserva a renovação do token de um usuário
+        
+        Escrita condicional no DynamoDB: só um chamador por vez ganha o
+        lock (até lease_seconds, caso ele morra sem liberar). As demais
+        invocações esperam o token novo em vez de renovar de novo.
+        
+        Returns:
+            Identificador do dono (para save_token/release_refresh_lock), ou
+            None se outro chamador já tem o lock
+        """
+        owner = uuid.uuid4().hex
+        now = time.time()
+        try:
+            self.table.update_item(
+                Key={'user_id': user_id},
+                UpdateExpression='SET refresh_lock_owner = :owner, refresh_lock_until = :until',
+                ConditionExpression='attribute_exists(user_id) AND '
+                                    '(attribute_not_exists(refresh_lock_until)'
+                                    ' OR refresh_lock_until < :now)',
+                ExpressionAttributeValues={
+                    ':owner': owner,
+                    ':until': int(now + lease_seconds),
+                    ':now': int(now)
+                }
+            )
+            return owner
+        except Exception as e:
+            if client_error_code(e) == 'ConditionalCheckFailedException':
+                return None
+            logger.error(f"Erro ao reservar renovação de token: {e}")
+            return None
+    
+    def release_refresh_lock(self, user_id: str, owner: str) -> bool:
+        """Libera o lock de renovação, se ainda pertence a owner"""
+        try:
+            self.table.update_item(
+                Key={'user_id': user_id},
+                UpdateExpression='REMOVE refresh_lock_owner, refresh_lock_until',
+                ConditionExpression='refresh_lock_owner = :owner',
+                ExpressionAttributeValues={':owner': owner}
+            )
+            return True
+        except Exception as e:
+            if client_error_code(e) != 'ConditionalCheckFailedException':
+                logger.error(f"Erro ao liberar renovação de token: {e}")
+            return False
+    
+    def scan_expiring(self, before: float,
+                      page_size: int = 100) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Usuários cujo access token expira antes de before (epoch), por página
+        
+        Scan paginado com filtro em tokens.expires_at; cada página rende
+        uma lista de (user_id, tokens), páginas sem resultados são puladas.
+        """
+        kwargs = {
+            'FilterExpression': '#tokens.expires_at < :before',
+            'ProjectionExpression': 'user_id, #tokens',
+            'ExpressionAttributeNames': {'#tokens': 'tokens'},
+            'ExpressionAttributeValues': {':before': int(before)},
+            'Limit': page_size
+        }
+        while True:
+            response = self.table.scan(**kwargs)
+            page = [(item['user_id'], item['tokens']) for item in response.get('Items', [])]
+            if page:
+                yield page
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
     def get_token(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Recupera tokens de um usuário"""
         try:
@@ -117,6 +442,102 @@ class TokenManager:
         except Exception as e:
             logger.error(f"Erro ao recuperar tokens: {e}")
             return None
+    
+    def batch_get(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Tokens de vários usuários com BatchGetItem ({user_id: tokens}, só os encontrados)"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        try:
+            found = batch_get_items(self.dynamodb, {
+                self.table.name: [{'user_id': user_id} for user_id in user_ids]
+            })[self.table.name]
+        except Exception as e:
+            logger.error(f"Erro ao recuperar tokens em lote: {e}")
+            return {}
+        return {item['user_id']: item['tokens'] for item in found if 'tokens' in item}
+    
+    def batch_set(self, tokens_by_user: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Salva tokens de vários usuários (BatchWriteItem)
+        
+        Diferente de save_token, grava o item inteiro: atributos do usuário
+        além de tokens e updated_at não são preservados.
+        """
+        try:
+            updated_at = datetime.now().isoformat()
+            with self.table.batch_writer(overwrite_by_pkeys=['user_id']) as batch:
+                for user_id, tokens in tokens_by_user.items():
+                    batch.put_item(Item={
+                        'user_id': user_id,
+                        'tokens': self._token_attributes(tokens),
+                        'updated_at': updated_at
+                    })
+            logger.info(f"Tokens salvos em lote: {len(tokens_by_user)} usuários")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar tokens em lote: {e}")
+            return False
+    
+    def batch_delete(self, user_ids: Iterable[str]) -> bool:
+        """Remove os itens de vários usuários (BatchWriteItem)"""
+        try:
+            with self.table.batch_writer(overwrite_by_pkeys=['user_id']) as batch:
+                for user_id in user_ids:
+                    batch.delete_item(Key={'user_id': user_id})
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao deletar tokens em lote: {e}")
+            return False
+
+
+def get_token_and_cache(token_manager: TokenManager,
+                        cache_manager: CacheManager,
+                        user_id: str,
+                        cache_key: str,
+                        max_staleness: int = 0
+                        ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], bool]:
+    """
+    Tokens do usuário e item do cache numa única ida ao DynamoDB
+    
+    Um BatchGetItem lê as duas tabelas de uma vez, em vez de get_item no
+    cache e depois get_item nos usuários. Se o lote falhar, cai nas
+    leituras individuais (tokens só em MISS, como antes).
+    
+    Returns:
+        (tokens, dados, stale) - tokens e dados são None quando ausentes
+    """
+    try:
+        found = batch_get_items(cache_manager.dynamodb, {
+            cache_manager.table.name: [{'cache_key': cache_key}],
+            token_manager.table.name: [{'user_id': user_id}],
+        })
+    except Exception as e:
+        logger.error(f"Erro na leitura em lote de token e cache: {e}")
+        data, stale = cache_manager.get_with_staleness(cache_key, max_staleness)
+        if data:
+            return None, data, stale
+        return token_manager.get_token(user_id), None, False
+    
+    cache_items = found[cache_manager.table.name]
+    data, stale = cache_manager.read_item(
+        cache_key, cache_items[0] if cache_items else None, max_staleness
+    )
+    
+    user_items = found[token_manager.table.name]
+    tokens = user_items[0].get('tokens') if user_items else None
+    return tokens, data, stale
+
+
+def refresh_in_background(fn: Callable[..., Any], *args, **kwargs) -> None:
+    """Agenda fn(*args, **kwargs) em segundo plano; falhas são apenas logadas"""
+    def run():
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Erro ao renovar cache em segundo plano: {e}")
+    
+    _refresh_executor.submit(run)
 
 
 def response_success(data: Dict[str, Any], status_code: int = 200) -> Dict[str, Any]:
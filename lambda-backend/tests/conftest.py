@@ -285,3 +285,61 @@ def mock_requests_get(monkeypatch):
 
 
 import time
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """Tokens em memória dos handlers não vazam entre testes"""
+    import handler_pipeline
+    handler_pipeline.token_cache.clear()
+    yield
+    handler_pipeline.token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def memory_governor():
+    """Governador de rate limit em memória e zerado em cada teste (sem DynamoDB)"""
+    import handler_pipeline
+    from rate_limit import RateLimitGovernor
+    with patch.object(handler_pipeline, 'governor', RateLimitGovernor()) as governor:
+        yield governor
+
+
+@pytest.fixture
+def activities_table(monkeypatch):
+    """Tabela de atividades no moto, com o mesmo esquema do serverless.yml"""
+    moto = pytest.importorskip("moto")
+    import boto3
+    from activity_store import START_TS_INDEX
+    from config import DYNAMODB_TABLE_ACTIVITIES
+
+    for var, value in {
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+    }.items():
+        monkeypatch.setenv(var, value)
+
+    with moto.mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        yield resource.create_table(
+            TableName=DYNAMODB_TABLE_ACTIVITIES,
+            KeySchema=[
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'activity_id', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'activity_id', 'AttributeType': 'S'},
+                {'AttributeName': 'start_ts', 'AttributeType': 'N'},
+            ],
+            LocalSecondaryIndexes=[{
+                'IndexName': START_TS_INDEX,
+                'KeySchema': [
+                    {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'start_ts', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['data']},
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
@@ -37,7 +37,7 @@ class TestStravaAPIIntegration:
         # tokens = client.get_access_token(authorization_code, "http://localhost:8080/callback")
         # assert "access_token" in tokens
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_athlete_with_cache(self, mock_request, strava_client, mock_athlete_response):
         """Teste: obter atleta com cache funciona"""
         mock_response = MagicMock()
@@ -62,7 +62,7 @@ class TestStravaAPIIntegration:
         # Não deve fazer nova requisição (ainda 1)
         assert mock_request.call_count == 1
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_full_workflow(self, mock_request, strava_client, mock_athlete_response, mock_activities_response, mock_stats_response):
         """Teste: workflow completo (atleta → atividades → stats)"""
         
@@ -112,7 +112,7 @@ class TestStravaAPIIntegration:
 class TestCachePerformance:
     """Testes de performance do cache"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_cache_reduces_requests(self, mock_request, strava_client, mock_athlete_response):
         """Teste: cache reduz número de requisições"""
         mock_response = MagicMock()
@@ -132,7 +132,7 @@ class TestCachePerformance:
         # Deve ter feito apenas 1 requisição HTTP real
         assert mock_request.call_count == 1
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_cache_expiration(self, mock_request, strava_client, mock_athlete_response):
         """Teste: cache expira após TTL"""
         mock_response = MagicMock()
@@ -145,12 +145,14 @@ class TestCachePerformance:
         mock_response.raise_for_status.return_value = None
         mock_request.return_value = mock_response
         
+        # TTL curto para o endpoint de atleta
+        strava_client._endpoint_ttls["athlete"] = 1  # 1 segundo
+        
         # Primeira requisição
         strava_client.get_athlete()
         assert mock_request.call_count == 1
         
         # Simular expiração de cache
-        strava_client._cache_ttl = 1  # 1 segundo
         time.sleep(1.1)  # Aguardar expiração
         
         # Segunda requisição deve fazer nova chamada HTTP
@@ -162,7 +164,7 @@ class TestCachePerformance:
 class TestRateLimitHandling:
     """Testes de tratamento de rate limiting"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     @patch('time.sleep')
     def test_rate_limit_handling(self, mock_sleep, mock_request, strava_client):
         """Teste: tratar rate limit corretamente"""
@@ -193,7 +195,7 @@ class TestRateLimitHandling:
 class TestTokenRefresh:
     """Testes de renovação de token"""
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_token_refresh_flow(self, mock_post, strava_client):
         """Teste: Fluxo de renovação de token"""
         mock_response = MagicMock()
@@ -216,7 +218,7 @@ class TestTokenRefresh:
 class TestErrorRecovery:
     """Testes de recuperação de erros"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_retry_on_network_error(self, mock_request, strava_client):
         """Teste: não fazer retry automático (deixar para o client)"""
         mock_request.side_effect = requests.exceptions.ConnectionError("Network error")
@@ -224,7 +226,7 @@ class TestErrorRecovery:
         with pytest.raises(requests.exceptions.ConnectionError):
             strava_client.get_athlete()
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_handle_invalid_json_response(self, mock_request, strava_client):
         """Teste: tratamento de JSON inválido"""
         mock_response = MagicMock()
@@ -0,0 +1,140 @@
+"""
+⚡ Benchmark: ActivityFrame vs lista de dicts
+
+Gera atividades no formato da API da Strava e compara, para o mesmo
+payload, a memória retida pela representação e o tempo do pipeline
+formatação de /activities + estatísticas + insights.
+
+Uso:
+    python tests/performance/benchmark_activity_frame.py [--size 50000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from activity_frame import EXPORT_FIELDS, ActivityFrame  # noqa: E402
+from insights_engine import InsightsEngine  # noqa: E402
+from reference_insights import analyze_performance, analyze_trends, detect_anomalies  # noqa: E402
+from stats_handler import calculate_stats  # noqa: E402
+
+
+def strava_payload(count: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    sports = ['Run', 'Ride', 'TrailRun', 'Walk', 'Swim']
+    activities = []
+    for i in range(count):
+        sport = rng.choice(sports)
+        activities.append({
+            'id': 10_000_000 + i,
+            'name': f'Atividade {i}',
+            'type': sport,
+            'sport_type': sport,
+            'distance': round(rng.uniform(1000, 60000), 1),
+            'moving_time': rng.randint(600, 18000),
+            'elapsed_time': rng.randint(600, 20000),
+            'total_elevation_gain': round(rng.uniform(0, 1500), 1),
+            'start_date': f'20{rng.randint(19, 25)}-{rng.randint(1, 12):02d}'
+                          f'-{rng.randint(1, 28):02d}T06:30:00Z',
+            'start_date_local': '2025-01-01T03:30:00Z',
+            'timezone': '(GMT-03:00) America/Sao_Paulo',
+            'location_city': None,
+            'location_state': None,
+            'location_country': 'Brazil',
+            'achievement_count': rng.randint(0, 10),
+            'kudos_count': rng.randint(0, 50),
+            'comment_count': rng.randint(0, 5),
+            'athlete_count': 1,
+            'photo_count': 0,
+            'trainer': False,
+            'commute': False,
+            'manual': False,
+            'private': False,
+            'flagged': False,
+            'workout_type': None,
+            'average_speed': round(rng.uniform(1.5, 12), 3),
+            'max_speed': round(rng.uniform(3, 18), 3),
+            'has_heartrate': True,
+            'average_heartrate': round(rng.uniform(110, 175), 1),
+            'max_heartrate': float(rng.randint(150, 200)),
+            'map': {'id': f'a{i}', 'summary_polyline': 'xyz', 'resource_state': 2},
+        })
+    return json.dumps(activities)
+
+
+def dict_pipeline(activities):
+    formatted = [{name: a.get(key) for name, key in EXPORT_FIELDS} for a in activities]
+    stats = calculate_stats(activities)
+    insights = (
+        analyze_performance(activities),
+        analyze_trends(activities),
+        detect_anomalies(activities),
+    )
+    return formatted, stats, insights
+
+
+def frame_pipeline(activities):
+    frame = ActivityFrame.from_strava(activities)
+    formatted = frame.to_records()
+    stats = calculate_stats(frame)
+    engine = InsightsEngine(frame)
+    insights = (engine.analyze_performance(), engine.analyze_trends(), engine.detect_anomalies())
+    return formatted, stats, insights
+
+
+def _retained_bytes(build, activities):
+    gc.collect()
+    tracemalloc.start()
+    result = build(activities)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def _best_of(fn, activities, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(activities)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    activities = json.loads(strava_payload(args.size))
+    print(f"\n📦 {args.size} atividades ({len(activities[0])} campos cada)\n")
+
+    mib = 1024 * 1024
+    print(f"{'representação':<34} {'retida':>10} {'pico':>10}")
+    for label, build in (
+        ('lista de dicts formatados',
+         lambda a: [{n: x.get(k) for n, k in EXPORT_FIELDS} for x in a]),
+        ('cópia dict(activity) (FastAPI)', lambda a: [dict(x) for x in a]),
+        ('ActivityFrame', ActivityFrame.from_strava),
+    ):
+        current, peak = _retained_bytes(build, activities)
+        print(f"{label:<34} {current / mib:>8.1f}MB {peak / mib:>8.1f}MB")
+
+    print(f"\n{'pipeline':<34} {'tempo':>10}")
+    before = _best_of(dict_pipeline, activities, args.repeat)
+    after = _best_of(frame_pipeline, activities, args.repeat)
+    print(f"{'listas de dicts':<34} {before:>8.1f}ms")
+    print(f"{'ActivityFrame':<34} {after:>8.1f}ms")
+    print(f"{'speedup':<34} {before / after:>9.1f}x\n")
+
+
+if __name__ == '__main__':
+    main()
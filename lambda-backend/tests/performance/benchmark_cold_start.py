@@ -0,0 +1,124 @@
+"""
+⏱️ Benchmark: tempo de import (cold start) de cada handler
+
+Importa cada handler num processo novo com `python -X importtime`, N
+vezes, e reporta a mediana do tempo acumulado do módulo e os imports mais
+pesados. Compara com o baseline gravado em cold_start_baseline.json e
+falha (exit 1) se algum handler passar do baseline além da tolerância ou
+carregar no import um módulo que deveria ser sob demanda (boto3, numpy,
+ddtrace...).
+
+Uso:
+    python tests/performance/benchmark_cold_start.py [--runs 5] [--top 5]
+    python tests/performance/benchmark_cold_start.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'cold_start_baseline.json')
+
+HANDLERS = ['auth_handler', 'athlete_handler', 'activities_handler', 'stats_handler',
+            'insights_handler']
+
+# Módulos que os handlers só devem carregar quando usam (clientes AWS, NumPy, APM)
+DEFERRED = ['boto3', 'botocore', 'numpy', 'ddtrace', 'datadog', 'requests_oauthlib']
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """Linhas do -X importtime como (profundidade, acumulado em µs, módulo)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((depth, int(cumulative), name.strip()))
+    return entries
+
+
+def profile(handler: str) -> List[Tuple[int, int, str]]:
+    """Importa o handler num interpretador novo e devolve o -X importtime"""
+    env = dict(os.environ, PYTHONPATH=SRC)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {handler}'],
+        cwd=SRC, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(handler: str, runs: int) -> Dict[str, object]:
+    def total_of(entries):
+        return next(us for depth, us, name in entries if depth == 0 and name == handler)
+
+    samples = [profile(handler) for _ in range(runs)]
+    median_total = statistics.median(total_of(entries) for entries in samples)
+    entries = min(samples, key=lambda e: abs(total_of(e) - median_total))
+    loaded = {name for _, _, name in entries}
+    return {
+        'ms': round(median_total / 1000, 1),
+        'top': sorted(((us, name) for depth, us, name in entries if depth == 1), reverse=True),
+        'deferred_loaded': [m for m in DEFERRED if m in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5, help='imports mais pesados por handler')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='folga relativa sobre o baseline')
+    parser.add_argument('--slack-ms', type=float, default=10.0,
+                        help='folga absoluta sobre o baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f).get('handlers', {})
+
+    print(f"\nImport a frio por handler "
+          f"(mediana de {args.runs}, Python {platform.python_version()})\n")
+    print(f"{'handler':<20} {'import':>9} {'baseline':>9} {'limite':>9}  status")
+
+    results, failures = {}, []
+    for handler in HANDLERS:
+        result = measure(handler, args.runs)
+        results[handler] = result['ms']
+        base = baseline.get(handler)
+        limit = base * (1 + args.tolerance) + args.slack_ms if base is not None else None
+        status = 'ok'
+        if limit is not None and result['ms'] > limit:
+            status = 'ACIMA DO BASELINE'
+            failures.append(handler)
+        if result['deferred_loaded']:
+            status = f"carrega no import: {', '.join(result['deferred_loaded'])}"
+            failures.append(handler)
+        print(f"{handler:<20} {result['ms']:>7.1f}ms "
+              f"{(f'{base:.1f}ms' if base is not None else '-'):>9} "
+              f"{(f'{limit:.1f}ms' if limit is not None else '-'):>9}  {status}")
+        for us, name in result['top'][:args.top]:
+            print(f"{'':<22}{us / 1000:>7.1f}ms  {name}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'python': platform.python_version(), 'handlers': results}, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline gravado em {BASELINE_PATH}")
+    elif failures:
+        print(f"\n❌ Cold start acima do orçamento: {', '.join(sorted(set(failures)))}")
+        sys.exit(1)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+⚡ Benchmark: latência por chamada com e sem reuso de conexão
+
+Compara requests.get() (uma conexão nova por chamada) com a sessão
+compartilhada de transport.py contra um servidor stub local.
+
+Uso:
+    python tests/performance/benchmark_connection_reuse.py [--calls 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from stub_server import StubServer  # noqa: E402
+from transport import build_session  # noqa: E402
+from strava_client import StravaClient  # noqa: E402
+
+
+def _measure(call, calls: int):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings, connections: int):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(timings):7.3f}ms  "
+          f"p50={statistics.median(timings):7.3f}ms  p95={p95:7.3f}ms  "
+          f"conexões={connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"\n📡 {args.calls} chamadas GET por cenário\n")
+
+    with StubServer() as server:
+        url = f"{server.url}/athlete"
+
+        server.connection_count = 0
+        timings = _measure(lambda: requests.get(url, timeout=10).json(), args.calls)
+        _report("requests.get (sem reuso)", timings, server.connection_count)
+
+        session = build_session()
+        server.connection_count = 0
+        timings = _measure(lambda: session.get(url, timeout=10).json(), args.calls)
+        _report("Session compartilhada", timings, server.connection_count)
+
+        client = StravaClient("bench", "bench", access_token="bench", session=build_session())
+        client.BASE_URL = server.url
+        server.connection_count = 0
+        timings = _measure(lambda: client._request("GET", "/athlete", use_cache=False), args.calls)
+        _report("StravaClient (Session)", timings, server.connection_count)
+
+    print("\nObs.: stub em HTTP puro; contra a Strava (TLS) cada conexão nova também "
+          "paga o handshake TLS, então a diferença real é maior.\n")
+
+
+if __name__ == "__main__":
+    main()
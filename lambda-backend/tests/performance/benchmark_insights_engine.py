@@ -0,0 +1,92 @@
+"""
+⚡ Benchmark: análises de /insights - listas de dicts vs InsightsEngine (NumPy)
+
+Gera atividades sintéticas e mede as quatro análises na implementação
+original (tests/reference_insights.py) e no InsightsEngine (incluindo a
+conversão colunar).
+
+Uso:
+    python tests/performance/benchmark_insights_engine.py [--sizes 10000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from insights_engine import InsightsEngine  # noqa: E402
+from reference_insights import (  # noqa: E402
+    analyze_performance, analyze_trends, detect_anomalies, generate_recommendations
+)
+
+# Cinco anos de histórico, em segundos
+HISTORY = 5 * 365 * 86400
+
+
+def synthetic_activities(count: int, seed: int = 42):
+    # start_date sem 'Z': a versão original de generate_recommendations
+    # compara com datetime.now() sem fuso
+    rng = random.Random(seed)
+    now = datetime.now()
+    sports = ['Run', 'Ride', 'Swim', 'Walk', 'Hike']
+    return [{
+        'id': i,
+        'name': f'Atividade {i}',
+        'start_date': f"{now - timedelta(seconds=rng.randint(0, HISTORY)):%Y-%m-%dT%H:%M:%S}",
+        'sport_type': rng.choice(sports),
+        'distance': rng.uniform(1000, 50000),
+        'moving_time': rng.randint(600, 18000),
+        'total_elevation_gain': rng.uniform(0, 1500),
+        'average_speed': rng.uniform(1.5, 12)
+    } for i in range(count)]
+
+
+def legacy(activities):
+    return (
+        analyze_performance(activities),
+        generate_recommendations(activities),
+        analyze_trends(activities),
+        detect_anomalies(activities),
+    )
+
+
+def engine(activities):
+    e = InsightsEngine(activities)
+    return (
+        e.analyze_performance(),
+        e.generate_recommendations(),
+        e.analyze_trends(),
+        e.detect_anomalies(),
+    )
+
+
+def _best_of(fn, activities, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(activities)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"\n{'atividades':>11} {'original':>12} {'engine':>12} {'speedup':>9}")
+    for size in args.sizes:
+        activities = synthetic_activities(size)
+        before = _best_of(legacy, activities, args.repeat)
+        after = _best_of(engine, activities, args.repeat)
+        print(f"{size:>11} {before:>10.1f}ms {after:>10.1f}ms {before / after:>8.1f}x")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+⚡ Benchmark: paginação sequencial vs prefetch concorrente
+
+Sobe uma Strava falsa local que responde /athlete/activities com latência
+injetada por requisição e compara StravaClient.iter_activities com o
+PrefetchingPageFetcher em diferentes níveis de concorrência.
+
+Uso:
+    python tests/performance/benchmark_page_prefetch.py [--activities 3000] [--latency 0.08]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from stub_server import StubServer  # noqa: E402
+from transport import build_session  # noqa: E402
+from strava_client import StravaClient  # noqa: E402
+from page_fetcher import PrefetchingPageFetcher  # noqa: E402
+
+
+def activities_route(total: int):
+    """Rota que pagina `total` atividades sintéticas"""
+    def route(path, query):
+        if path != "/athlete/activities":
+            return 404, {}, {"message": "Record Not Found"}
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 30))
+        start = (page - 1) * per_page
+        end = min(start + per_page, total)
+        return 200, {}, [
+            {"id": i, "distance": 5000.0, "moving_time": 1500, "sport_type": "Run"}
+            for i in range(start, end)
+        ]
+    return route
+
+
+def new_client(base_url: str) -> StravaClient:
+    client = StravaClient("bench", "bench", access_token="bench", session=build_session())
+    client.BASE_URL = base_url
+    return client
+
+
+def run(label: str, server: StubServer, iterate) -> None:
+    server.request_count = 0
+    start = time.perf_counter()
+    count = sum(1 for _ in iterate())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed * 1000:8.0f}ms  atividades={count}  "
+          f"requisições={server.request_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.08)
+    args = parser.parse_args()
+
+    pages = -(-args.activities // 200)
+    print(f"\n📄 {args.activities} atividades ({pages} páginas), "
+          f"latência {args.latency * 1000:.0f}ms por requisição\n")
+
+    with StubServer(route=activities_route(args.activities), latency=args.latency) as server:
+        run("sequencial", server, lambda: new_client(server.url).iter_activities())
+        for workers in (2, 4, 8):
+            run(f"prefetch k={workers}", server,
+                lambda: PrefetchingPageFetcher(new_client(server.url),
+                                               max_workers=workers).iter_activities())
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+🚦 Simulação: throttler com baldes por usuário e prioridades vs fila única
+
+Reproduz tráfego sintético de vários atletas sobre o ThrottleScheduler com
+relógio virtual (sem threads nem sleeps), então a mesma semente gera sempre
+o mesmo resultado. Tráfego:
+
+- dashboard: cada usuário abre o dashboard de tempos em tempos e pede
+  algumas páginas de uma vez (interactive)
+- sincronização agendada: a cada --sync-interval, 1 a 3 requisições por
+  usuário com início espalhado (background)
+- backfill: --backfill usuários importando o histórico, uma página após a
+  outra, sem parar (backfill)
+
+Compara a fila única (só o balde global e todas as classes juntas; o
+round-robin entre usuários continua) com o scheduler completo e reporta
+vazão, espera por classe, fila máxima e o índice de Jain (1.0 = divisão
+perfeitamente justa) entre os usuários em backfill e entre os demais.
+
+Uso:
+    python tests/performance/simulate_throttle.py [--users 50] [--backfill 3] [--minutes 60] \
+        [--seed 7]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from rate_limit import Priority  # noqa: E402
+from throttle import ThrottleScheduler  # noqa: E402
+
+# (instante, sequência, usuário, classe)
+Arrival = Tuple[float, int, str, str]
+
+
+def synthetic_traffic(users: int, backfill: int, duration: float, sync_interval: float,
+                      dashboard_every: float, seed: int) -> Tuple[List[Arrival], List[str]]:
+    """Chegadas abertas (dashboard e sincronização) e os usuários em backfill"""
+    rng = random.Random(seed)
+    arrivals: List[Arrival] = []
+    seq = 0
+    for u in range(users):
+        user_id = f"athlete-{u:03d}"
+        t = rng.expovariate(1 / dashboard_every)
+        while t < duration:
+            for _ in range(rng.randint(2, 8)):
+                arrivals.append((t, seq, user_id, Priority.INTERACTIVE))
+                seq += 1
+            t += rng.expovariate(1 / dashboard_every)
+        t = rng.uniform(0, sync_interval)
+        while t < duration:
+            for _ in range(rng.randint(1, 3)):
+                arrivals.append((t, seq, user_id, Priority.BACKGROUND))
+                seq += 1
+            t += sync_interval
+    arrivals.sort()
+    return arrivals, [f"athlete-{u:03d}" for u in range(backfill)]
+
+
+def simulate(scheduler: ThrottleScheduler, arrivals: List[Arrival], backfill_users: List[str],
+             duration: float, single_queue: bool = False) -> Dict:
+    """
+    Replay com relógio virtual: avança direto para a próxima chegada ou
+    para o próximo instante em que o scheduler pode liberar algo
+    """
+    pending = list(arrivals)
+    heapq.heapify(pending)
+    seq = len(arrivals)
+    # Cada backfill tem uma página em voo; a próxima sai quando ela é liberada
+    for user_id in backfill_users:
+        heapq.heappush(pending, (0.0, seq, user_id, Priority.BACKFILL))
+        seq += 1
+
+    waits = defaultdict(list)
+    served = defaultdict(int)
+    demand = defaultdict(int)
+    classes = {}
+    now = 0.0
+    while now <= duration:
+        while pending and pending[0][0] <= now:
+            _, _, user_id, priority = heapq.heappop(pending)
+            queue = Priority.INTERACTIVE if single_queue else priority
+            ticket = scheduler.submit(user_id, queue, now)
+            classes[id(ticket)] = priority
+            demand[user_id] += 1
+
+        for ticket in scheduler.dispatch(now):
+            priority = classes.pop(id(ticket))
+            waits[priority].append(ticket.wait)
+            served[ticket.user_id] += 1
+            if priority == Priority.BACKFILL:
+                heapq.heappush(pending, (now, seq, ticket.user_id, Priority.BACKFILL))
+                seq += 1
+
+        next_arrival = pending[0][0] if pending else float('inf')
+        ready_at = scheduler.next_ready_at(now)
+        now = min(next_arrival, ready_at if ready_at is not None else float('inf'))
+        if now == float('inf'):
+            break
+
+    return {'waits': waits, 'served': served, 'demand': demand, 'metrics': scheduler.metrics()}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def jain(values: List[float]) -> float:
+    """Índice de justiça de Jain: (Σx)² / (n·Σx²)"""
+    if not values or not any(values):
+        return 1.0
+    return sum(values) ** 2 / (len(values) * sum(v * v for v in values))
+
+
+def report(label: str, result: Dict, backfill_users: List[str], duration: float,
+           global_rate: float) -> None:
+    served, demand = result['served'], result['demand']
+    total = sum(served.values())
+    print(f"{label}")
+    print(f"  vazão: {total / duration * 60:6.1f} req/min "
+          f"({total / (duration * global_rate) * 100:5.1f}% da taxa global)")
+    for priority in Priority.ORDER:
+        waits = result['waits'][priority]
+        print(f"  {priority:<12} liberadas={len(waits):5d}  "
+              f"p50={percentile(waits, 0.5):7.1f}s  p95={percentile(waits, 0.95):7.1f}s  "
+              f"max={max(waits, default=0.0):7.1f}s")
+    depth = result['metrics']['max_queue_depth']
+    print("  fila máx do scheduler: " + "  ".join(f"{p}={depth[p]}" for p in Priority.ORDER))
+    others = [u for u in demand if u not in backfill_users]
+    print(f"  Jain backfill (vazão):            {jain([served[u] for u in backfill_users]):.3f}")
+    print(f"  Jain demais usuários (atendido/demanda): "
+          f"{jain([served[u] / demand[u] for u in others]):.3f}")
+    backfill_served = sum(served[u] for u in backfill_users)
+    print(f"  usuários em backfill: {backfill_served} de {total} liberadas\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--backfill", type=int, default=3)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--sync-interval", type=float, default=1800, help="segundos")
+    parser.add_argument("--dashboard-every", type=float, default=3600,
+                        help="segundos entre aberturas")
+    parser.add_argument("--global-rate", type=float, default=200 / 900)
+    parser.add_argument("--global-burst", type=int, default=20)
+    parser.add_argument("--user-rate", type=float, default=0.05)
+    parser.add_argument("--user-burst", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    duration = args.minutes * 60
+    arrivals, backfill_users = synthetic_traffic(
+        args.users, args.backfill, duration, args.sync_interval, args.dashboard_every, args.seed
+    )
+    print(f"\n🚦 {args.users} usuários ({args.backfill} em backfill), {args.minutes:.0f} min, "
+          f"{len(arrivals)} requisições abertas, taxa global {args.global_rate * 60:.1f}/min, "
+          f"semente {args.seed}\n")
+
+    single = simulate(
+        ThrottleScheduler(args.global_rate, args.global_burst, user_rate=None),
+        arrivals, backfill_users, duration, single_queue=True
+    )
+    report("fila única (só balde global)", single, backfill_users, duration, args.global_rate)
+
+    full = simulate(
+        ThrottleScheduler(args.global_rate, args.global_burst, args.user_rate, args.user_burst),
+        arrivals, backfill_users, duration
+    )
+    report("global + por usuário + prioridades", full, backfill_users, duration, args.global_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Servidor HTTP local para benchmarks
+
+Sobe um ThreadingHTTPServer em 127.0.0.1 numa porta livre, falando HTTP/1.1
+com keep-alive, para medir o cliente sem depender da rede nem da Strava.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+# (path, query) -> (status, headers, payload)
+Route = Callable[[str, Dict[str, str]], Tuple[int, Dict[str, str], Any]]
+
+
+def _default_route(path: str, query: Dict[str, str]):
+    return 200, {}, {"ok": True, "path": path}
+
+
+class StubServer:
+    """
+    Servidor stub com latência configurável
+
+    Uso:
+        with StubServer(latency=0.01) as server:
+            requests.get(f"{server.url}/athlete")
+    """
+
+    def __init__(self, route: Optional[Route] = None, latency: float = 0.0):
+        self.route = route or _default_route
+        self.latency = latency
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _build_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connection_count += 1
+
+            def _respond(self):
+                parsed = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+                with stub._lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                status, headers, payload = stub.route(parsed.path, query)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,206 @@
+"""
+Implementações originais das análises de /insights, sobre listas de dicts
+
+O InsightsEngine (src/insights_engine.py) substituiu estas funções no
+handler; elas ficam aqui como referência para os testes de equivalência
+(tests/unit/test_insights_engine.py) e para os benchmarks em
+tests/performance.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+
+from insights_engine import calculate_consistency, calculate_improvement
+
+
+def analyze_performance(activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Analisa desempenho e tendências de velocidade"""
+    performance = {
+        'analysis': 'Performance over time',
+        'metrics': {}
+    }
+
+    if not activities:
+        return performance
+
+    # Agrupar por tipo de esporte
+    by_type = {}
+    for activity in activities:
+        sport_type = activity.get('sport_type', activity.get('type', 'Unknown'))
+        if sport_type not in by_type:
+            by_type[sport_type] = []
+        by_type[sport_type].append(activity)
+
+    # Calcular métricas por tipo
+    for sport_type, acts in by_type.items():
+        speeds = [a.get('average_speed', 0) * 3.6 for a in acts if a.get('average_speed')]
+
+        if speeds:
+            performance['metrics'][sport_type] = {
+                'avg_speed_kmh': round(np.mean(speeds), 2),
+                'max_speed_kmh': round(np.max(speeds), 2),
+                'std_dev_speed': round(np.std(speeds), 2) if len(speeds) > 1 else 0,
+                'improvement': calculate_improvement(speeds),
+                'consistency': calculate_consistency(speeds)
+            }
+
+    return performance
+
+
+def generate_recommendations(activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Gera recomendações de treino baseado em padrões"""
+
+    recommendations = {
+        'suggestions': []
+    }
+
+    if not activities:
+        return recommendations
+
+    # Calcular frequência
+    now = datetime.now()
+    week_ago = now - timedelta(days=7)
+    last_7_days = [a for a in activities
+                   if datetime.fromisoformat(a.get('start_date', '').replace('Z', '+00:00'))
+                   > week_ago]
+
+    # Recomendação 1: Frequência de treino
+    activity_freq = len(last_7_days)
+    if activity_freq < 3:
+        recommendations['suggestions'].append({
+            'category': 'frequency',
+            'severity': 'warning',
+            'message': f'Apenas {activity_freq} atividades nos últimos 7 dias. '
+                       'Considere aumentar a frequência de treino.',
+            'recommendation': 'Objetivo: 3-5 atividades por semana para melhores resultados'
+        })
+    elif activity_freq > 7:
+        recommendations['suggestions'].append({
+            'category': 'recovery',
+            'severity': 'info',
+            'message': f'{activity_freq} atividades nos últimos 7 dias.',
+            'recommendation': 'Considere incluir dias de recuperação ativa ou repouso'
+        })
+
+    # Recomendação 2: Varietà
+    sport_types = set(a.get('sport_type', a.get('type', 'Unknown')) for a in activities)
+    if len(sport_types) < 2:
+        recommendations['suggestions'].append({
+            'category': 'variety',
+            'severity': 'info',
+            'message': f'Treino focado em {list(sport_types)[0]}.',
+            'recommendation': 'Adicionar outras modalidades para trabalhar '
+                              'diferentes grupos musculares'
+        })
+
+    # Recomendação 3: Intensidade
+    total_distance = sum(a.get('distance', 0) for a in last_7_days) / 1000  # km
+    avg_distance = total_distance / len(last_7_days) if last_7_days else 0
+
+    if avg_distance > 50:
+        recommendations['suggestions'].append({
+            'category': 'intensity',
+            'severity': 'warning',
+            'message': f'Média de {avg_distance:.1f}km por atividade.',
+            'recommendation': 'Considere balancear com atividades de menor intensidade'
+        })
+    elif avg_distance < 5 and last_7_days:
+        recommendations['suggestions'].append({
+            'category': 'intensity',
+            'severity': 'info',
+            'message': f'Média de {avg_distance:.1f}km por atividade.',
+            'recommendation': 'Considere aumentar distância ou intensidade'
+        })
+
+    return recommendations
+
+
+def analyze_trends(activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Analisa tendências ao longo do tempo"""
+
+    trends = {
+        'trend_analysis': 'Performance trends over time',
+        'data': {}
+    }
+
+    if not activities:
+        return trends
+
+    # Agrupar por data (semanal)
+    weekly_data = {}
+    for activity in sorted(activities, key=lambda x: x.get('start_date', '')):
+        date = datetime.fromisoformat(activity.get('start_date', '').replace('Z', '+00:00'))
+        week_start = date - timedelta(days=date.weekday())
+        week_key = week_start.strftime('%Y-W%U')
+
+        if week_key not in weekly_data:
+            weekly_data[week_key] = {
+                'activities': 0,
+                'distance': 0,
+                'time': 0,
+                'elevation': 0
+            }
+
+        weekly_data[week_key]['activities'] += 1
+        weekly_data[week_key]['distance'] += activity.get('distance', 0) / 1000
+        weekly_data[week_key]['time'] += activity.get('moving_time', 0)
+        weekly_data[week_key]['elevation'] += activity.get('total_elevation_gain', 0)
+
+    trends['data'] = weekly_data
+
+    return trends
+
+
+def detect_anomalies(activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Detecta anomalias nas atividades (valores atípicos)"""
+    anomalies = {
+        'anomalies_detected': [],
+        'analysis': 'Detects unusual activity patterns'
+    }
+
+    if len(activities) < 3:
+        return anomalies
+
+    # Anomalias de velocidade
+    speeds = [a.get('average_speed', 0) * 3.6 for a in activities if a.get('average_speed')]
+    if speeds:
+        mean_speed = np.mean(speeds)
+        std_speed = np.std(speeds)
+
+        for i, activity in enumerate(activities):
+            activity_speed = activity.get('average_speed', 0) * 3.6
+            if abs(activity_speed - mean_speed) > 2 * std_speed and activity_speed > 0:
+                anomalies['anomalies_detected'].append({
+                    'activity_id': activity.get('id'),
+                    'name': activity.get('name'),
+                    'type': 'speed_anomaly',
+                    'value': round(activity_speed, 2),
+                    'mean': round(mean_speed, 2),
+                    'std_dev': round(std_speed, 2),
+                    'z_score': round((activity_speed - mean_speed) / std_speed, 2)
+                })
+
+    # Anomalias de distância
+    distances = [a.get('distance', 0) / 1000 for a in activities if a.get('distance')]
+    if distances:
+        mean_distance = np.mean(distances)
+        std_distance = np.std(distances)
+
+        for activity in activities:
+            activity_distance = activity.get('distance', 0) / 1000
+            if abs(activity_distance - mean_distance) > 2 * std_distance and activity_distance > 0:
+                existing = any(anom.get('activity_id') == activity.get('id')
+                               for anom in anomalies['anomalies_detected'])
+                if not existing:
+                    anomalies['anomalies_detected'].append({
+                        'activity_id': activity.get('id'),
+                        'name': activity.get('name'),
+                        'type': 'distance_anomaly',
+                        'value': round(activity_distance, 2),
+                        'mean': round(mean_distance, 2),
+                        'std_dev': round(std_distance, 2),
+                        'z_score': round((activity_distance - mean_distance) / std_distance, 2)
+                    })
+
+    return anomalies
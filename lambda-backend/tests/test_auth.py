@@ -27,8 +27,8 @@ def test_auth_callback_success():
     
     context = MagicMock()
     
-    # Mock do requests.post
-    with patch('src.auth_handler.requests.post') as mock_post:
+    # Mock da sessão HTTP compartilhada
+    with patch('src.auth_handler.http_session.post') as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -0,0 +1,134 @@
+"""
+Testes unitários para a representação colunar de atividades
+"""
+import json
+import random
+
+import pytest
+
+from activity_frame import EXPORT_FIELDS, ActivityFrame
+from insights_engine import InsightsEngine
+from stats_handler import calculate_stats
+
+
+def _strava_activities(seed, count):
+    rng = random.Random(seed)
+    activities = []
+    for i in range(count):
+        activity = {
+            'id': 10_000 + i,
+            'name': f'Atividade {i}',
+            'type': 'Run',
+            'sport_type': rng.choice(['Run', 'TrailRun', 'Ride']),
+            'distance': round(rng.uniform(1000, 40000), 1),
+            'moving_time': rng.randint(600, 14400),
+            'elapsed_time': rng.randint(600, 16000),
+            'total_elevation_gain': round(rng.uniform(0, 900), 1),
+            'average_speed': round(rng.uniform(2, 10), 3),
+            'max_speed': round(rng.uniform(3, 15), 3),
+            'start_date': f'2025-{rng.randint(1, 11):02d}-{rng.randint(1, 28):02d}'
+                          f'T06:{rng.randint(0, 59):02d}:00Z',
+            'start_date_local': '2025-11-20T03:00:00Z',
+            'timezone': '(GMT-03:00) America/Sao_Paulo',
+            'location_country': 'Brazil',
+            'kudos_count': rng.randint(0, 30),
+            'trainer': False,
+            'commute': rng.random() < 0.1,
+            'private': False,
+            'workout_type': rng.choice([None, 0, 1]),
+            'map': {'summary_polyline': 'abc'}
+        }
+        if rng.random() < 0.6:
+            activity['average_heartrate'] = round(rng.uniform(100, 180), 1)
+            activity['max_heartrate'] = float(rng.randint(150, 200))
+        activities.append(activity)
+    return activities
+
+
+def _legacy_format(activities):
+    """Formatação de /activities antes do ActivityFrame (um dict novo por atividade)"""
+    return [{name: activity.get(key) for name, key in EXPORT_FIELDS} for activity in activities]
+
+
+class TestActivityFrame:
+    """Testes do ActivityFrame"""
+
+    def test_to_records_matches_dict_formatting(self):
+        """Teste: resposta de /activities idêntica (inclusive em JSON)"""
+        activities = _strava_activities(1, 100)
+
+        records = ActivityFrame.from_strava(activities).to_records()
+
+        assert records == _legacy_format(activities)
+        assert json.dumps(records) == json.dumps(_legacy_format(activities))
+
+    def test_where_sport_type(self):
+        """Teste: filtro por sport_type"""
+        activities = _strava_activities(2, 50)
+        frame = ActivityFrame.from_strava(activities)
+
+        runs = frame.where_sport_type('Run')
+
+        assert [r['id'] for r in runs.to_records()] == \
+            [a['id'] for a in activities if a['sport_type'] == 'Run']
+        assert frame.where_sport_type(None) is frame
+
+    def test_row_view_reads_like_dict(self):
+        """Teste: ActivityRow.get/[] com ausentes"""
+        frame = ActivityFrame.from_strava([
+            {'id': 1, 'distance': 5000.0, 'moving_time': 1500}, {'id': 2}
+        ])
+        first, second = frame
+
+        assert first.get('distance', 0) == 5000.0
+        assert first['moving_time'] == 1500
+        assert second.get('distance', 0) == 0
+        assert second.get('average_heartrate') is None
+        assert 'distance' in first and 'distance' not in second
+        with pytest.raises(KeyError):
+            first['map']
+
+    def test_rows_are_slotted_views(self):
+        """Teste: linhas não copiam dados"""
+        row = ActivityFrame.from_strava([{'id': 1}])[0]
+
+        assert not hasattr(row, '__dict__')
+
+    def test_empty(self):
+        frame = ActivityFrame.from_strava([])
+
+        assert len(frame) == 0
+        assert frame.to_records() == []
+
+
+class TestFrameThroughPipeline:
+    """O mesmo frame alimenta estatísticas e insights"""
+
+    @pytest.mark.parametrize('seed', range(3))
+    def test_stats_from_frame(self, seed):
+        activities = _strava_activities(seed, 200)
+
+        assert calculate_stats(ActivityFrame.from_strava(activities)) == calculate_stats(activities)
+        assert calculate_stats(ActivityFrame.from_strava(activities), 'Ride') == \
+            calculate_stats(activities, 'Ride')
+
+    def test_stats_from_frame_with_missing_fields(self):
+        """Teste: campos ausentes tratados como nos dicts"""
+        activities = [
+            {'id': 1, 'sport_type': 'Run', 'distance': 5000.0, 'average_speed': 3.0},
+            {'id': 2, 'type': 'Ride', 'distance': 20000.0, 'moving_time': 3600,
+             'average_speed': 5.5, 'max_speed': 12.0, 'max_heartrate': 171.0},
+            {'id': 3}
+        ]
+
+        assert calculate_stats(ActivityFrame.from_strava(activities)) == calculate_stats(activities)
+
+    @pytest.mark.parametrize('seed', range(3))
+    def test_insights_from_frame(self, seed):
+        activities = _strava_activities(seed, 200)
+        from_frame = InsightsEngine(ActivityFrame.from_strava(activities))
+        from_list = InsightsEngine(activities)
+
+        assert from_frame.analyze_performance() == from_list.analyze_performance()
+        assert from_frame.analyze_trends() == from_list.analyze_trends()
+        assert from_frame.detect_anomalies() == from_list.detect_anomalies()
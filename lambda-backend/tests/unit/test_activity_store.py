@@ -0,0 +1,175 @@
+"""
+Testes unitários para o armazenamento de atividades e a sincronização incremental
+"""
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from activity_store import (
+    START_TS_INDEX,
+    DynamoDBActivityStore,
+    SQLiteActivityStore,
+    start_timestamp,
+    sync_activities,
+)
+
+DAY = 86400
+BASE = 1_700_000_000
+
+
+def _activity(activity_id, start_ts, **extra):
+    from datetime import datetime, timezone
+    start = datetime.fromtimestamp(start_ts, tz=timezone.utc)
+    activity = {
+        'id': activity_id,
+        'name': f'Atividade {activity_id}',
+        'start_date': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'distance': 5000.0,
+        'moving_time': 1500,
+        'sport_type': 'Run'
+    }
+    activity.update(extra)
+    return activity
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteActivityStore(str(tmp_path / 'activities.db'))
+    yield store
+    store.close()
+
+
+class TestSQLiteActivityStore:
+    """Testes do backend SQLite"""
+
+    def test_upsert_and_query_ordered(self, store):
+        """Teste: consulta devolve atividades ordenadas por início"""
+        store.upsert('u1', [
+            _activity(2, BASE + DAY), _activity(1, BASE), _activity(3, BASE + 2 * DAY)
+        ])
+
+        assert [a['id'] for a in store.query('u1')] == [1, 2, 3]
+        assert [a['id'] for a in store.query('u1', newest_first=True)] == [3, 2, 1]
+
+    def test_query_window_is_exclusive(self, store):
+        """Teste: after/before com a mesma semântica da Strava"""
+        store.upsert('u1', [_activity(i, BASE + i * DAY) for i in range(5)])
+
+        result = store.query('u1', after=BASE + DAY, before=BASE + 4 * DAY)
+
+        assert [a['id'] for a in result] == [2, 3]
+
+    def test_upsert_overwrites_and_isolates_users(self, store):
+        """Teste: mesma atividade regravada não duplica; usuários separados"""
+        store.upsert('u1', [_activity(1, BASE)])
+        store.upsert('u1', [_activity(1, BASE, name='Editada')])
+        store.upsert('u2', [_activity(9, BASE)])
+
+        result = store.query('u1')
+        assert len(result) == 1
+        assert result[0]['name'] == 'Editada'
+
+    def test_sync_state_roundtrip(self, store):
+        """Teste: estado de sincronização"""
+        assert store.get_sync_state('u1') is None
+        store.set_sync_state('u1', BASE, BASE + 10)
+
+        assert store.get_sync_state('u1') == {'latest_start_ts': BASE, 'synced_at': BASE + 10}
+
+
+class TestDynamoDBActivityStore:
+    """Testes do formato dos itens no DynamoDB"""
+
+    def test_upsert_item_shape(self):
+        """Teste: uma linha por atividade, dados como JSON"""
+        table = MagicMock()
+        batch = table.batch_writer.return_value.__enter__.return_value
+
+        DynamoDBActivityStore(table).upsert('u1', [_activity(42, BASE, average_speed=3.1)])
+
+        item = batch.put_item.call_args.kwargs['Item']
+        assert item['user_id'] == 'u1'
+        assert item['activity_id'] == '42'
+        assert item['start_ts'] == BASE
+        assert json.loads(item['data'])['average_speed'] == 3.1
+
+    def test_query_paginates_through_index(self):
+        """Teste: consulta o índice por início e percorre LastEvaluatedKey"""
+        table = MagicMock()
+        table.query.side_effect = [
+            {'Items': [{'data': json.dumps({'id': 1})}], 'LastEvaluatedKey': {'k': 1}},
+            {'Items': [{'data': json.dumps({'id': 2})}]},
+        ]
+
+        result = DynamoDBActivityStore(table).query('u1', after=0, newest_first=True)
+
+        kwargs = table.query.call_args.kwargs
+        assert [a['id'] for a in result] == [1, 2]
+        assert kwargs['ExclusiveStartKey'] == {'k': 1}
+        assert kwargs['IndexName'] == START_TS_INDEX
+        assert kwargs['ScanIndexForward'] is False
+        assert kwargs['ConsistentRead'] is True
+        assert 'FilterExpression' not in kwargs
+
+    def test_query_reads_only_the_window(self, activities_table):
+        """Teste: after/before exclusivos na chave; itens de controle ficam fora"""
+        store = DynamoDBActivityStore(activities_table)
+        store.upsert('u1', [_activity(i, BASE + i * DAY) for i in range(5)])
+        store.set_sync_state('u1', BASE + 4 * DAY, BASE + 5 * DAY)
+        scanned = []
+        activities_table.meta.client.meta.events.register(
+            'after-call.dynamodb.Query', lambda parsed, **kw: scanned.append(parsed['ScannedCount'])
+        )
+
+        result = store.query('u1', after=BASE + DAY, before=BASE + 4 * DAY)
+
+        assert [a['id'] for a in result] == [2, 3]
+        assert sum(scanned) == 2
+        assert [a['id'] for a in store.query('u1', newest_first=True)] == [4, 3, 2, 1, 0]
+        assert store.query('u1', after=BASE, before=BASE + 1) == []
+
+
+class TestSyncActivities:
+    """Testes da sincronização incremental"""
+
+    def test_first_sync_fetches_full_history(self, store):
+        """Teste: primeira sincronização baixa tudo"""
+        client = MagicMock()
+        client._rate_limit_exceeded.return_value = False
+        client._rate_limit_remaining = None
+        client.get_activities.return_value = [_activity(1, BASE), _activity(2, BASE + DAY)]
+
+        count = sync_activities(store, client, 'u1')
+
+        assert count == 2
+        assert store.get_sync_state('u1')['latest_start_ts'] == BASE + DAY
+        assert len(store.query('u1')) == 2
+
+    def test_incremental_sync_asks_only_after_latest(self, store):
+        """Teste: sincronização seguinte pede só o que veio depois"""
+        store.upsert('u1', [_activity(1, BASE)])
+        store.set_sync_state('u1', BASE, 0)
+        client = MagicMock()
+        client.iter_activities.return_value = iter([_activity(2, BASE + DAY)])
+
+        count = sync_activities(store, client, 'u1', overlap=3600)
+
+        assert count == 1
+        client.iter_activities.assert_called_once_with(after=BASE - 3600)
+        assert [a['id'] for a in store.query('u1')] == [1, 2]
+        assert store.get_sync_state('u1')['latest_start_ts'] == BASE + DAY
+
+    def test_recent_sync_skips_strava(self, store):
+        """Teste: atleta "quente" não chama a Strava"""
+        store.set_sync_state('u1', BASE, int(time.time()))
+        client = MagicMock()
+
+        assert sync_activities(store, client, 'u1', min_interval=300) == 0
+        client.iter_activities.assert_not_called()
+        client.get_activities.assert_not_called()
+
+    def test_start_timestamp(self):
+        """Teste: conversão de start_date"""
+        assert start_timestamp({'start_date': '2023-11-14T22:13:20Z'}) == BASE
+        assert start_timestamp({}) == 0
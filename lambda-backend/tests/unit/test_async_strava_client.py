@@ -0,0 +1,187 @@
+"""
+Testes unitários para o AsyncStravaClient (httpx)
+"""
+import asyncio
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from async_strava_client import AsyncStravaClient  # noqa: E402
+
+
+class FakeStrava:
+    """Transporte httpx em memória que registra as requisições"""
+
+    def __init__(self, routes, delay: float = 0.0, headers=None):
+        self.routes = routes
+        self.delay = delay
+        self.headers = headers or {}
+        self.requests = []
+
+    async def handler(self, request: "httpx.Request") -> "httpx.Response":
+        self.requests.append(request)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status, payload = self.routes(request)
+        return httpx.Response(status, json=payload, headers=self.headers)
+
+    def client(self) -> "httpx.AsyncClient":
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def _client(fake, credentials, **kwargs):
+    return AsyncStravaClient(
+        client_id=credentials["client_id"],
+        client_secret=credentials["client_secret"],
+        access_token=credentials["access_token"],
+        http=fake.client(),
+        **kwargs
+    )
+
+
+class TestAsyncRequests:
+    """Requisições, cache e coalescência"""
+
+    def test_get_athlete_uses_cache(self, client_credentials, mock_athlete_response):
+        """Teste: segunda chamada vem do cache herdado do StravaClient"""
+        fake = FakeStrava(lambda r: (200, mock_athlete_response))
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            first = await client.get_athlete()
+            second = await client.get_athlete()
+            return client, first, second
+
+        client, first, second = asyncio.run(scenario())
+
+        assert first == second == mock_athlete_response
+        assert len(fake.requests) == 1
+        token = client_credentials['access_token']
+        assert fake.requests[0].headers["Authorization"] == f"Bearer {token}"
+        assert client.get_cache_stats()["cache_hits"] == 1
+
+    def test_concurrent_identical_gets_are_coalesced(self, client_credentials,
+                                                     mock_athlete_response):
+        """Teste: gather de GETs iguais faz uma única requisição"""
+        fake = FakeStrava(lambda r: (200, mock_athlete_response), delay=0.05)
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            results = await asyncio.gather(*(client.get_athlete() for _ in range(5)))
+            return client, results
+
+        client, results = asyncio.run(scenario())
+
+        assert results == [mock_athlete_response] * 5
+        assert len(fake.requests) == 1
+        assert client.get_cache_stats()["coalesced_requests"] == 4
+
+    def test_does_not_block_event_loop(self, client_credentials, mock_athlete_response):
+        """Teste: requisições de atividades diferentes correm em paralelo"""
+        fake = FakeStrava(lambda r: (200, {"id": r.url.path}), delay=0.1)
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            start = time.perf_counter()
+            await asyncio.gather(*(client.get_activity(i) for i in range(5)))
+            return time.perf_counter() - start
+
+        assert asyncio.run(scenario()) < 0.4
+        assert len(fake.requests) == 5
+
+    def test_http_error_is_raised_and_not_cached(self, client_credentials):
+        """Teste: erro HTTP propaga e não entra no cache"""
+        fake = FakeStrava(lambda r: (404, {"message": "Record Not Found"}))
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await client.get_activity(1)
+            return client
+
+        client = asyncio.run(scenario())
+
+        assert len(fake.requests) == 2
+        assert len(client._cache) == 0
+
+    def test_rate_limit_headers_update_shared_state(self, client_credentials,
+                                                    mock_athlete_response):
+        """Teste: headers de rate limit atualizam o mesmo estado do cliente síncrono"""
+        fake = FakeStrava(lambda r: (200, mock_athlete_response),
+                          headers={"X-RateLimit-Limit": "600,30000",
+                                   "X-RateLimit-Usage": "40,1000"})
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            await client.get_athlete()
+            return client
+
+        client = asyncio.run(scenario())
+
+        assert client._rate_limit_remaining == 560
+        assert client._rate_limit_reset is None
+        assert client._rate_limit_delay() is None
+
+
+class TestAsyncPagination:
+    """iter_activities assíncrono"""
+
+    def test_iter_activities_stops_on_partial_page(self, client_credentials):
+        """Teste: páginas sob demanda até a primeira incompleta"""
+        def routes(request):
+            page = int(request.url.params["page"])
+            size = 2 if page < 3 else 1
+            return 200, [{"id": page * 10 + i} for i in range(size)]
+
+        fake = FakeStrava(routes)
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            return [a["id"] async for a in client.iter_activities(per_page=2)], client
+
+        ids, client = asyncio.run(scenario())
+
+        assert ids == [10, 11, 20, 21, 30]
+        assert [t["page"] for t in client.last_page_timings] == [1, 2, 3]
+
+
+class TestAsyncAuth:
+    """OAuth e ciclo de vida do AsyncClient"""
+
+    def test_refresh_access_token(self, client_credentials):
+        """Teste: refresh atualiza o token usado nas próximas chamadas"""
+        def routes(request):
+            if request.url.path == "/oauth/token":
+                return 200, {"access_token": "novo", "refresh_token": "r2", "expires_at": 1}
+            return 200, {"id": 1}
+
+        fake = FakeStrava(routes)
+
+        async def scenario():
+            client = _client(fake, client_credentials)
+            token = await client.refresh_access_token("r1")
+            await client.get_athlete()
+            return token
+
+        token = asyncio.run(scenario())
+
+        assert token["access_token"] == "novo"
+        assert b"grant_type=refresh_token" in fake.requests[0].content
+        assert fake.requests[1].headers["Authorization"] == "Bearer novo"
+
+    def test_shared_http_client_is_not_closed(self, client_credentials):
+        """Teste: aclose() só fecha o AsyncClient que o próprio cliente criou"""
+        async def scenario():
+            shared = httpx.AsyncClient()
+            async with AsyncStravaClient("id", "secret", http=shared):
+                pass
+            owned = AsyncStravaClient("id", "secret")
+            await owned.aclose()
+            closed = shared.is_closed, owned.session.is_closed
+            await shared.aclose()
+            return closed
+
+        assert asyncio.run(scenario()) == (False, True)
@@ -0,0 +1,151 @@
+"""
+Testes unitários para o CacheManager (DynamoDB) com stale-while-revalidate
+"""
+import json
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+from config import CACHE_RETENTION_SECONDS
+from utils import CacheManager
+
+
+def cache_item(data, expires_delta_seconds):
+    """Item do DynamoDB que expira daqui a N segundos (negativo = já expirou)"""
+    return {
+        'Item': {
+            'cache_key': 'key',
+            'data': json.dumps(data),
+            'fresh_until': (datetime.now() + timedelta(seconds=expires_delta_seconds)).isoformat(),
+        }
+    }
+
+
+@pytest.fixture
+def cache_manager():
+    manager = CacheManager()
+    manager.table = MagicMock()
+    return manager
+
+
+class TestCacheManagerStaleness:
+    """Testes de leitura com staleness"""
+
+    def test_fresh_item_is_hit(self, cache_manager):
+        """Teste: item dentro do TTL"""
+        cache_manager.table.get_item.return_value = cache_item({'a': 1}, 60)
+
+        assert cache_manager.get_with_staleness('key', max_staleness=300) == ({'a': 1}, False)
+        assert cache_manager.get('key') == {'a': 1}
+
+    def test_expired_item_within_window_is_stale(self, cache_manager):
+        """Teste: item expirado há pouco é servido como stale"""
+        cache_manager.table.get_item.return_value = cache_item({'a': 1}, -30)
+
+        assert cache_manager.get_with_staleness('key', max_staleness=300) == ({'a': 1}, True)
+        cache_manager.table.delete_item.assert_not_called()
+
+    def test_expired_item_beyond_window_is_kept(self, cache_manager):
+        """Teste: item expirado além da janela é MISS, mas fica para o TTL da tabela"""
+        cache_manager.table.get_item.return_value = cache_item({'a': 1}, -600)
+
+        assert cache_manager.get_with_staleness('key', max_staleness=300) == (None, False)
+        assert cache_manager.get_with_staleness('key', max_staleness=900) == ({'a': 1}, True)
+        cache_manager.table.delete_item.assert_not_called()
+
+    def test_item_without_fresh_until_is_miss(self, cache_manager):
+        """Teste: item no formato antigo (expires_at ISO) é MISS"""
+        cache_manager.table.get_item.return_value = {'Item': {
+            'cache_key': 'key', 'data': '{}', 'expires_at': datetime.now().isoformat()
+        }}
+
+        assert cache_manager.get_with_staleness('key', max_staleness=300) == (None, False)
+
+    def test_set_writes_numeric_ttl_after_retention(self, cache_manager):
+        """Teste: expires_at (TTL da tabela) em epoch, depois da retenção"""
+        before = time.time()
+        cache_manager.set('key', {'a': 1}, 60)
+
+        item = cache_manager.table.put_item.call_args.kwargs['Item']
+        assert item['expires_at'] >= before + 60 + CACHE_RETENTION_SECONDS - 1
+        assert datetime.fromisoformat(item['fresh_until']) > datetime.now()
+
+    def test_get_without_staleness_keeps_old_behavior(self, cache_manager):
+        """Teste: get() não serve itens expirados"""
+        cache_manager.table.get_item.return_value = cache_item({'a': 1}, -1)
+
+        assert cache_manager.get('key') is None
+
+    def test_miss(self, cache_manager):
+        """Teste: chave inexistente"""
+        cache_manager.table.get_item.return_value = {}
+
+        assert cache_manager.get_with_staleness('key', max_staleness=300) == (None, False)
+
+
+class TestRefreshLease:
+    """Testes da reserva de renovação"""
+
+    def test_acquire_refresh(self, cache_manager):
+        """Teste: primeira invocação ganha a reserva"""
+        assert cache_manager.try_acquire_refresh('key') is True
+        kwargs = cache_manager.table.update_item.call_args.kwargs
+        assert 'refresh_lease_until' in kwargs['UpdateExpression']
+        assert 'ConditionExpression' in kwargs
+
+    def test_acquire_refresh_already_taken(self, cache_manager):
+        """Teste: reserva já tomada por outra invocação"""
+        cache_manager.table.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': ''}},
+            'UpdateItem'
+        )
+
+        assert cache_manager.try_acquire_refresh('key') is False
+
+
+class TestStatsHandlerStaleWhileRevalidate:
+    """Testes do /stats servindo cache stale"""
+
+    def test_stale_response_schedules_refresh(self):
+        """Teste: resposta imediata com stale=True e renovação agendada"""
+        import handler_pipeline
+        import stats_handler
+
+        event = {'pathParameters': {'user_id': '42'}, 'queryStringParameters': {'period': 'week'}}
+        with patch.object(handler_pipeline, 'cache_manager') as cm, \
+                patch.object(handler_pipeline, 'token_manager') as tm, \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup, \
+                patch.object(handler_pipeline, 'refresh_in_background') as refresh:
+            lookup.return_value = ({'access_token': 'tok'}, {'total_activities': 3}, True)
+            cm.try_acquire_refresh.return_value = True
+
+            response = stats_handler.lambda_handler(event, None)
+
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert body['data']['stale'] is True
+        assert body['data']['stats'] == {'total_activities': 3}
+        refresh.assert_called_once()
+        assert refresh.call_args.args[0] is stats_handler.load_stats
+        # A renovação em segundo plano usa o token lido junto com o cache
+        assert handler_pipeline.token_cache.get('42') == {'access_token': 'tok'}
+        tm.get_token.assert_not_called()
+
+    def test_stale_response_without_lease_does_not_refresh(self):
+        """Teste: sem a reserva, apenas serve o item stale"""
+        import handler_pipeline
+        import stats_handler
+
+        event = {'pathParameters': {'user_id': '42'}, 'queryStringParameters': {}}
+        with patch.object(handler_pipeline, 'cache_manager') as cm, \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup, \
+                patch.object(handler_pipeline, 'refresh_in_background') as refresh:
+            lookup.return_value = (None, {'total_activities': 3}, True)
+            cm.try_acquire_refresh.return_value = False
+
+            stats_handler.lambda_handler(event, None)
+
+        refresh.assert_not_called()
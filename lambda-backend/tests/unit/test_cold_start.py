@@ -0,0 +1,70 @@
+"""
+Testes do cold start: handlers não carregam clientes AWS, NumPy nem APM no import
+"""
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import utils
+from utils import CacheManager, LazyResource
+
+SRC = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+
+DEFERRED = ['boto3', 'botocore', 'numpy', 'ddtrace', 'datadog', 'requests_oauthlib']
+
+
+def modules_loaded_by(module: str, then: str = 'pass'):
+    """Módulos de DEFERRED em sys.modules após importar module e rodar then, num processo novo"""
+    loaded = f"[m for m in {DEFERRED!r} if m in sys.modules]"
+    code = f"import sys, json, {module}; {then}; print(json.dumps({loaded}))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC,
+                            capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=SRC, AWS_DEFAULT_REGION='us-east-1'),
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('handler', [
+    'auth_handler', 'athlete_handler', 'activities_handler', 'stats_handler', 'insights_handler',
+    'token_refresh_handler', 'monitoring'
+])
+def test_handler_import_defers_heavy_modules(handler):
+    """Teste: importar o handler não carrega boto3/numpy/ddtrace"""
+    assert modules_loaded_by(handler) == []
+
+
+def test_stats_from_dicts_does_not_load_numpy():
+    """Teste: calculate_stats sobre dicts não importa activity_frame/NumPy"""
+    activity = {'distance': 5000.0, 'moving_time': 1500, 'sport_type': 'Run'}
+    then = f"stats_handler.calculate_stats([{activity!r}])"
+    assert modules_loaded_by('stats_handler', then) == []
+
+
+class TestLazyResource:
+    """Testes do resource criado sob demanda"""
+
+    def test_created_on_first_attribute(self):
+        """Teste: boto3.resource só é chamado no primeiro acesso, uma vez"""
+        lazy = LazyResource('dynamodb', region_name='us-east-1')
+        fake_boto3 = MagicMock()
+
+        with patch.dict(sys.modules, {'boto3': fake_boto3}):
+            fake_boto3.resource.assert_not_called()
+            lazy.Table('t')
+            lazy.Table('u')
+
+        fake_boto3.resource.assert_called_once_with('dynamodb', region_name='us-east-1')
+        assert fake_boto3.resource.return_value.Table.call_count == 2
+
+    def test_manager_opens_table_on_first_use(self):
+        """Teste: CacheManager() não toca o resource até usar a tabela"""
+        resource = MagicMock()
+        manager = CacheManager(resource=resource)
+
+        resource.Table.assert_not_called()
+        manager.get('key')
+        resource.Table.assert_called_once_with(utils.DYNAMODB_TABLE_CACHE)
@@ -0,0 +1,213 @@
+"""
+Testes das operações em lote do CacheManager/TokenManager (DynamoDB via moto)
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import utils
+from utils import CacheManager, TokenManager, batch_get_items, get_token_and_cache
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    """Tabelas de cache e usuários num DynamoDB simulado pelo moto"""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for var, value in {
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+    }.items():
+        monkeypatch.setenv(var, value)
+
+    with moto.mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        tables = ((utils.DYNAMODB_TABLE_CACHE, 'cache_key'),
+                  (utils.DYNAMODB_TABLE_USERS, 'user_id'))
+        for name, key in tables:
+            resource.create_table(
+                TableName=name,
+                KeySchema=[{'AttributeName': key, 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': key, 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+        yield resource
+
+
+@pytest.fixture
+def calls(dynamodb):
+    """Operações enviadas ao DynamoDB (uma por ida e volta)"""
+    operations = []
+    dynamodb.meta.client.meta.events.register(
+        'before-call.dynamodb.*',
+        lambda model, **kwargs: operations.append(model.name)
+    )
+    return operations
+
+
+def put_cache_item(manager, key, data, expires_delta_seconds):
+    manager.table.put_item(Item={
+        'cache_key': key,
+        'data': json.dumps(data),
+        'fresh_until': (datetime.now() + timedelta(seconds=expires_delta_seconds)).isoformat(),
+    })
+
+
+class TestCacheManagerBatch:
+    """Testes de batch_get/batch_set/batch_delete do cache"""
+
+    def test_batch_set_and_get(self, dynamodb, calls):
+        """Teste: 250 chaves gravadas e lidas em lotes"""
+        cache = CacheManager(resource=dynamodb)
+        items = {f'k{i}': {'n': i} for i in range(250)}
+
+        assert cache.batch_set(items, ttl=60) is True
+        assert calls.count('BatchWriteItem') == 10  # 25 itens por requisição
+
+        calls.clear()
+        found = cache.batch_get(list(items) + ['ausente'])
+
+        assert calls == ['BatchGetItem'] * 3  # 100 chaves por requisição
+        assert found == {key: (data, False) for key, data in items.items()}
+
+    def test_batch_get_staleness(self, dynamodb):
+        """Teste: stale dentro da janela; expirado além dela fica para o TTL"""
+        cache = CacheManager(resource=dynamodb)
+        put_cache_item(cache, 'fresh', {'a': 1}, 60)
+        put_cache_item(cache, 'stale', {'a': 2}, -30)
+        put_cache_item(cache, 'expired', {'a': 3}, -600)
+
+        found = cache.batch_get(['fresh', 'stale', 'expired'], max_staleness=300)
+
+        assert found == {'fresh': ({'a': 1}, False), 'stale': ({'a': 2}, True)}
+        assert 'Item' in cache.table.get_item(Key={'cache_key': 'expired'})
+
+    def test_batch_get_duplicate_keys(self, dynamodb):
+        """Teste: chaves repetidas não quebram o BatchGetItem"""
+        cache = CacheManager(resource=dynamodb)
+        put_cache_item(cache, 'k', {'a': 1}, 60)
+
+        assert cache.batch_get(['k', 'k']) == {'k': ({'a': 1}, False)}
+
+    def test_batch_delete(self, dynamodb, calls):
+        """Teste: 30 chaves removidas em 2 requisições"""
+        cache = CacheManager(resource=dynamodb)
+        cache.batch_set({f'k{i}': {} for i in range(30)}, ttl=60)
+        calls.clear()
+
+        assert cache.batch_delete([f'k{i}' for i in range(30)]) is True
+
+        assert calls == ['BatchWriteItem'] * 2
+        assert cache.batch_get([f'k{i}' for i in range(30)]) == {}
+
+
+class TestTokenManagerBatch:
+    """Testes de batch_get/batch_set/batch_delete dos tokens"""
+
+    def test_batch_roundtrip(self, dynamodb):
+        """Teste: tokens gravados, lidos e removidos em lote"""
+        tokens = TokenManager(resource=dynamodb)
+        tokens.batch_set({
+            'u1': {'access_token': 'a1', 'refresh_token': 'r1', 'expires_at': 100},
+            'u2': {'access_token': 'a2', 'refresh_token': 'r2', 'expires_at': 200},
+        })
+
+        found = tokens.batch_get(['u1', 'u2', 'u3'])
+
+        assert set(found) == {'u1', 'u2'}
+        assert found['u1']['access_token'] == 'a1'
+        assert found['u2']['token_type'] == 'Bearer'
+        assert tokens.get_token('u2') == found['u2']
+
+        tokens.batch_delete(['u1', 'u2'])
+        assert tokens.batch_get(['u1', 'u2']) == {}
+
+
+class TestTokenAndCacheLookup:
+    """Testes da leitura combinada token + cache"""
+
+    def test_single_round_trip(self, dynamodb, calls):
+        """Teste: token e item do cache numa só requisição"""
+        cache, tokens = CacheManager(resource=dynamodb), TokenManager(resource=dynamodb)
+        tokens.save_token('42', {'access_token': 'tok'})
+        put_cache_item(cache, 'key', {'a': 1}, -30)
+        calls.clear()
+
+        user_tokens, data, stale = get_token_and_cache(
+            tokens, cache, '42', 'key', max_staleness=300
+        )
+
+        assert calls == ['BatchGetItem']
+        assert user_tokens['access_token'] == 'tok'
+        assert (data, stale) == ({'a': 1}, True)
+
+    def test_miss_and_unknown_user(self, dynamodb):
+        """Teste: sem item nem usuário"""
+        cache, tokens = CacheManager(resource=dynamodb), TokenManager(resource=dynamodb)
+
+        assert get_token_and_cache(tokens, cache, 'nobody', 'key') == (None, None, False)
+
+    def test_falls_back_to_single_reads(self):
+        """Teste: falha no lote cai em get_item (token só em MISS)"""
+        cache, tokens = MagicMock(), MagicMock()
+        cache.dynamodb.batch_get_item.side_effect = RuntimeError('boom')
+        cache.get_with_staleness.return_value = ({'a': 1}, False)
+
+        assert get_token_and_cache(tokens, cache, '42', 'key') == (None, {'a': 1}, False)
+        tokens.get_token.assert_not_called()
+
+    def test_stats_handler_round_trips(self, dynamodb, calls):
+        """Teste: /stats faz uma ida ao DynamoDB antes de ir à Strava (antes: duas)"""
+        import handler_pipeline
+        import stats_handler
+
+        cache, tokens = CacheManager(resource=dynamodb), TokenManager(resource=dynamodb)
+        tokens.save_token('42', {'access_token': 'tok'})
+        calls.clear()
+
+        event = {'pathParameters': {'user_id': '42'}, 'queryStringParameters': {'period': 'week'}}
+        stats = {'total_activities': 0}
+        with patch.object(handler_pipeline, 'cache_manager', cache), \
+                patch.object(handler_pipeline, 'token_manager', tokens), \
+                patch.object(stats_handler, 'load_stats', return_value=stats) as load:
+            response = stats_handler.lambda_handler(event, None)
+
+        assert response['statusCode'] == 200
+        assert calls == ['BatchGetItem']
+        assert load.call_args.kwargs['access_token'] == 'tok'
+
+
+class TestBatchGetItems:
+    """Testes do reenvio de UnprocessedKeys"""
+
+    def test_retries_unprocessed_keys(self):
+        """Teste: chaves não processadas são reenviadas"""
+        resource = MagicMock()
+        resource.batch_get_item.side_effect = [
+            {'Responses': {'t': [{'k': '1'}]}, 'UnprocessedKeys': {'t': {'Keys': [{'k': '2'}]}}},
+            {'Responses': {'t': [{'k': '2'}]}, 'UnprocessedKeys': {}},
+        ]
+
+        with patch.object(utils.time, 'sleep') as sleep:
+            items = batch_get_items(resource, {'t': [{'k': '1'}, {'k': '2'}]})
+
+        assert items == {'t': [{'k': '1'}, {'k': '2'}]}
+        request = resource.batch_get_item.call_args.kwargs['RequestItems']
+        assert request == {'t': {'Keys': [{'k': '2'}]}}
+        sleep.assert_called_once()
+
+    def test_gives_up_after_max_attempts(self):
+        """Teste: desiste após BATCH_MAX_ATTEMPTS"""
+        resource = MagicMock()
+        resource.batch_get_item.return_value = {
+            'Responses': {}, 'UnprocessedKeys': {'t': {'Keys': [{'k': '1'}]}}
+        }
+
+        with patch.object(utils.time, 'sleep'), pytest.raises(RuntimeError):
+            batch_get_items(resource, {'t': [{'k': '1'}]})
+
+        assert resource.batch_get_item.call_count == utils.BATCH_MAX_ATTEMPTS
@@ -0,0 +1,195 @@
+"""
+Testes do pipeline compartilhado dos handlers (tokens, erros e timing)
+"""
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+import athlete_handler
+import handler_pipeline
+
+EVENT = {'pathParameters': {'user_id': '42'}, 'queryStringParameters': {}}
+ATHLETE = {'id': 42, 'firstname': 'Rogerio', 'lastname': 'Tavares'}
+
+
+def strava_response(status: int, payload=None) -> MagicMock:
+    response = MagicMock(status_code=status, headers={}, content=b'{}')
+    response.json.return_value = payload or {}
+    if status >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+    return response
+
+
+@pytest.fixture
+def backend():
+    """Managers, sessão HTTP e renovação de token simulados"""
+    cache, tokens, session = MagicMock(), MagicMock(), MagicMock()
+    cache.get_with_staleness.return_value = (None, False)
+    session.request.return_value = strava_response(200, ATHLETE)
+
+    with patch.object(handler_pipeline, 'cache_manager', cache), \
+            patch.object(athlete_handler, 'cache_manager', cache), \
+            patch.object(handler_pipeline, 'token_manager', tokens), \
+            patch.object(handler_pipeline, 'http_session', session), \
+            patch.object(handler_pipeline, 'get_token_and_cache') as lookup, \
+            patch.object(handler_pipeline, 'refresh_access_token') as refresh:
+        yield MagicMock(cache=cache, tokens=tokens, session=session, lookup=lookup, refresh=refresh)
+
+
+def bearer(call) -> str:
+    return call.kwargs['headers']['Authorization']
+
+
+class TestTokens:
+    """Renovação antecipada e cache de tokens em memória"""
+
+    def test_expiring_token_is_refreshed_before_the_call(self, backend):
+        """Teste: token perto de expirar é renovado antes; nenhum 401 desperdiçado"""
+        backend.lookup.return_value = (
+            {'access_token': 'old', 'refresh_token': 'r', 'expires_at': int(time.time()) + 60},
+            None, False
+        )
+        backend.refresh.return_value = {
+            'access_token': 'new', 'expires_at': int(time.time()) + 21600
+        }
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 200
+        backend.refresh.assert_called_once()
+        assert backend.refresh.call_args.args[1]['refresh_token'] == 'r'
+        assert backend.session.request.call_count == 1
+        assert bearer(backend.session.request.call_args) == 'Bearer new'
+
+    def test_token_is_reused_across_invocations(self, backend):
+        """Teste: invocação quente lê só o cache, sem buscar o token de novo"""
+        backend.lookup.return_value = (
+            {'access_token': 'tok', 'expires_at': int(time.time()) + 21600}, None, False
+        )
+
+        athlete_handler.lambda_handler(EVENT, None)
+        athlete_handler.lambda_handler(EVENT, None)
+
+        assert backend.lookup.call_count == 1
+        assert backend.cache.get_with_staleness.call_count == 1
+        backend.tokens.get_token.assert_not_called()
+        assert [bearer(c) for c in backend.session.request.call_args_list] == ['Bearer tok'] * 2
+
+    def test_memory_entry_expires_before_refresh_is_due(self):
+        """Teste: token perto de expirar não fica em memória"""
+        handler_pipeline.remember_tokens(
+            '42', {'access_token': 'tok', 'expires_at': time.time() + 100}
+        )
+
+        assert '42' not in handler_pipeline.token_cache
+
+    def test_unauthorized_response_still_refreshes(self, backend):
+        """Teste: 401 inesperado (ex: token revogado) renova e repete a chamada"""
+        backend.lookup.return_value = ({'access_token': 'revoked'}, None, False)
+        backend.refresh.return_value = {
+            'access_token': 'new', 'expires_at': int(time.time()) + 21600
+        }
+        backend.session.request.side_effect = [strava_response(401), strava_response(200, ATHLETE)]
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 200
+        assert [bearer(c) for c in backend.session.request.call_args_list] == \
+            ['Bearer revoked', 'Bearer new']
+        assert handler_pipeline.token_cache.get('42')['access_token'] == 'new'
+
+    def test_failed_early_refresh_uses_current_token(self, backend):
+        """Teste: se a renovação antecipada falha, o token ainda válido é usado"""
+        backend.lookup.return_value = (
+            {'access_token': 'tok', 'expires_at': int(time.time()) + 60}, None, False
+        )
+        backend.refresh.side_effect = RuntimeError('strava fora do ar')
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 200
+        assert bearer(backend.session.request.call_args) == 'Bearer tok'
+
+    def test_expired_token_without_refresh_fails(self, backend):
+        """Teste: token expirado e renovação falhando -> 401 TOKEN_REFRESH_FAILED"""
+        backend.lookup.return_value = (
+            {'access_token': 'tok', 'expires_at': int(time.time()) - 10}, None, False
+        )
+        backend.refresh.side_effect = RuntimeError('invalid_grant')
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 401
+        assert json.loads(response['body'])['error']['code'] == 'TOKEN_REFRESH_FAILED'
+        backend.session.request.assert_not_called()
+
+
+class TestMiddlewares:
+    """Erros padronizados e instrumentação comuns a todos os endpoints"""
+
+    def test_missing_user_id(self, backend):
+        response = athlete_handler.lambda_handler({'pathParameters': {}}, None)
+
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error']['code'] == 'MISSING_USER_ID'
+
+    def test_unauthenticated(self, backend):
+        backend.lookup.return_value = (None, None, False)
+        backend.tokens.get_token.return_value = None
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 401
+        assert json.loads(response['body'])['error']['code'] == 'UNAUTHENTICATED'
+
+    def test_strava_error_uses_endpoint_code(self, backend):
+        backend.lookup.return_value = ({'access_token': 'tok'}, None, False)
+        backend.session.request.return_value = strava_response(404)
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error']['code'] == 'ATHLETE_FETCH_FAILED'
+
+    def test_unexpected_error_is_internal(self, backend):
+        backend.lookup.side_effect = RuntimeError('boom')
+
+        response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 500
+        assert json.loads(response['body'])['error']['code'] == 'INTERNAL_ERROR'
+
+    def test_server_timing_header(self, backend):
+        """Teste: total e etapas no header Server-Timing, inclusive em erros"""
+        backend.lookup.return_value = ({'access_token': 'tok'}, None, False)
+
+        ok = athlete_handler.lambda_handler(EVENT, None)
+        error = athlete_handler.lambda_handler({'pathParameters': {}}, None)
+
+        stages = [part.split(';')[0] for part in ok['headers']['Server-Timing'].split(', ')]
+        assert stages == ['cache', 'token', 'strava', 'total']
+        assert error['headers']['Server-Timing'].startswith('total;dur=')
+
+    def test_custom_middleware_chain(self):
+        """Teste: middlewares rodam de fora para dentro"""
+        order = []
+
+        def outer(ctx, call_next):
+            order.append('outer')
+            return call_next(ctx)
+
+        def inner(ctx, call_next):
+            order.append('inner')
+            return call_next(ctx)
+
+        def handle(ctx):
+            order.append('handle')
+            return {'statusCode': 204}
+
+        handler = handler_pipeline.build_handler('GET /test', handle, middlewares=(outer, inner))
+
+        assert handler({}, None) == {'statusCode': 204}
+        assert order == ['outer', 'inner', 'handle']
@@ -0,0 +1,164 @@
+"""
+Testes das permissões do serverless.yml
+
+Exercita os gerenciadores de tabela contra o moto, registra cada chamada
+ao DynamoDB (operação, tabela, índice) e confere que a role da Lambda
+declara a ação para aquele recurso. Uma ação faltando não quebra nada
+localmente: em produção vira AccessDenied, e vários desses caminhos só
+logam o erro (ex: BatchGetItem cai para get_item, batch_set devolve False).
+"""
+import os
+import re
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import auth_handler
+import config
+from activity_store import DynamoDBActivityStore
+from rate_limit import DynamoRateLimitStore
+from rollups import update_rollups
+from utils import CacheManager, TokenManager, get_token_and_cache
+
+SERVERLESS_YML = os.path.join(os.path.dirname(__file__), '..', '..', 'serverless.yml')
+
+# Propriedades do AWS::DynamoDB::Table com o mesmo formato no create_table
+SCHEMA_PROPERTIES = ('KeySchema', 'AttributeDefinitions', 'BillingMode',
+                     'GlobalSecondaryIndexes', 'LocalSecondaryIndexes')
+
+
+def load_serverless():
+    """serverless.yml com as tags do CloudFormation (!GetAtt, !Sub...) como (tag, valor)"""
+    yaml = pytest.importorskip("yaml")
+
+    class Loader(yaml.SafeLoader):
+        pass
+
+    def tagged(loader, tag, node):
+        if isinstance(node, yaml.ScalarNode):
+            return tag, loader.construct_scalar(node)
+        if isinstance(node, yaml.SequenceNode):
+            return tag, loader.construct_sequence(node)
+        return tag, loader.construct_mapping(node)
+
+    Loader.add_multi_constructor('!', tagged)
+    with open(SERVERLESS_YML) as f:
+        return yaml.load(f, Loader=Loader)
+
+
+def table_resources(spec):
+    """{nome real da tabela (config): recurso lógico}, via as variáveis de ambiente"""
+    by_name = {props['Properties']['TableName']: logical
+               for logical, props in spec['resources']['Resources'].items()
+               if props['Type'] == 'AWS::DynamoDB::Table'}
+    return {getattr(config, var): by_name[value]
+            for var, value in spec['provider']['environment'].items() if value in by_name}
+
+
+def granted_actions(spec):
+    """{(recurso lógico, 'table' | 'index'): ações permitidas}"""
+    granted = {}
+    for statement in spec['provider']['iam']['role']['statements']:
+        resources = statement['Resource']
+        for tag, value in resources if isinstance(resources, list) else [resources]:
+            if tag == 'GetAtt':
+                target = (value.split('.')[0], 'table')
+            else:
+                target = (re.fullmatch(r'\$\{(\w+)\.Arn\}/index/\*', value).group(1), 'index')
+            granted.setdefault(target, set()).update(statement['Action'])
+    return granted
+
+
+@pytest.fixture
+def dynamo(monkeypatch):
+    """Tabelas criadas a partir do serverless.yml e as chamadas feitas a elas"""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for var, value in {
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+    }.items():
+        monkeypatch.setenv(var, value)
+
+    spec = load_serverless()
+    resources = spec['resources']['Resources']
+    with moto.mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        for table_name, logical in table_resources(spec).items():
+            properties = resources[logical]['Properties']
+            resource.create_table(TableName=table_name, **{
+                key: properties[key] for key in SCHEMA_PROPERTIES if key in properties
+            })
+
+        calls = []
+
+        def record(model, params, **kwargs):
+            if 'RequestItems' in params:
+                calls.extend((model.name, table, None) for table in params['RequestItems'])
+            else:
+                calls.append((model.name, params['TableName'], params.get('IndexName')))
+
+        resource.meta.client.meta.events.register('before-parameter-build.dynamodb', record)
+        yield spec, resource, calls
+
+
+def test_role_covers_every_dynamodb_call(dynamo):
+    """Teste: toda operação feita pelo código tem a ação na role da Lambda"""
+    spec, resource, calls = dynamo
+
+    cache = CacheManager(resource=resource)
+    cache.set('k1', {'a': 1}, 60)
+    cache.get_with_staleness('k1', 60)
+    cache.try_acquire_refresh('k1')
+    cache.batch_set({'k2': {'b': 2}, 'k3': {'c': 3}}, 60)
+    cache.batch_get(['k1', 'k2'])
+    cache.batch_delete(['k2', 'k3'])
+    cache.delete('k1')
+
+    tokens = TokenManager(resource=resource)
+    tokens.batch_set({'u1': {'access_token': 'a', 'expires_at': 0}, 'u2': {'access_token': 'b'}})
+    owner = tokens.try_acquire_refresh_lock('u1')
+    tokens.save_token('u1', {'access_token': 'c', 'expires_at': 0}, lock_owner=owner)
+    tokens.release_refresh_lock('u1', 'outro')
+    tokens.get_token('u1')
+    tokens.batch_get(['u1', 'u2'])
+    list(tokens.scan_expiring(1))
+    tokens.batch_delete(['u2'])
+    get_token_and_cache(tokens, cache, 'u1', 'k1')
+
+    limits = DynamoRateLimitStore(resource=resource)
+    limits.admit('2025-11-24', 1, 10, 100)
+    limits.raise_to('2025-11-24', 1, 5, 50)
+    limits.usage('2025-11-24', 1)
+
+    activities = [{'id': 1, 'start_date': '2025-11-24T06:00:00Z', 'distance': 5000.0}]
+    store = DynamoDBActivityStore(resource.Table(config.DYNAMODB_TABLE_ACTIVITIES))
+    store.upsert('u1', activities)
+    store.set_sync_state('u1', 1763964000, 1763964000)
+    store.get_sync_state('u1')
+    update_rollups(store, 'u1', activities)
+
+    session = MagicMock()
+    session.post.return_value = MagicMock(status_code=200, json=lambda: {
+        'access_token': 'a', 'refresh_token': 'r', 'expires_at': 0, 'athlete': {'id': 7}
+    })
+    with patch.object(auth_handler, 'http_session', session), \
+            patch.object(auth_handler, 'dynamodb', resource):
+        auth_handler.lambda_handler({'body': '{"code": "abc"}'}, None)
+
+    tables = table_resources(spec)
+    granted = granted_actions(spec)
+    missing = {
+        (operation, tables[table], index)
+        for operation, table, index in calls
+        if f'dynamodb:{operation}' not in granted.get(
+            (tables[table], 'index' if index else 'table'), set()
+        )
+    }
+
+    assert {operation for operation, _, _ in calls} >= {
+        'BatchGetItem', 'BatchWriteItem', 'Query', 'Scan', 'UpdateItem', 'DeleteItem'
+    }
+    assert missing == set()
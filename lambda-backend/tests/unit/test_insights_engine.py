@@ -0,0 +1,119 @@
+"""
+Testes unitários para o motor vetorizado de insights
+
+Cada análise do InsightsEngine é comparada com a implementação original
+(tests/reference_insights.py) sobre os mesmos dados.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import reference_insights
+from insights_engine import ActivityColumns, InsightsEngine
+
+SPORTS = ['Run', 'Ride', 'Swim']
+
+
+def _activities(seed, count, naive=False, sports=SPORTS):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    activities = []
+    for i in range(count):
+        start = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+        start_date = start.strftime('%Y-%m-%dT%H:%M:%S') + ('' if naive else 'Z')
+        activities.append({
+            'id': 1000 + i,
+            'name': f'Atividade {i}',
+            'start_date': start_date,
+            'sport_type': rng.choice(sports),
+            'distance': rng.choice([0, rng.uniform(1000, 30000), rng.uniform(60000, 200000)]),
+            'moving_time': rng.randint(600, 18000),
+            'total_elevation_gain': rng.uniform(0, 1500),
+            'average_speed': rng.choice([0, rng.uniform(1.5, 4), rng.uniform(5, 12)])
+        })
+    return activities
+
+
+class TestActivityColumns:
+    """Testes da conversão colunar"""
+
+    def test_parses_start_dates_once(self):
+        """Teste: start_date com e sem 'Z' e ausente"""
+        cols = ActivityColumns([
+            {'start_date': '2023-11-14T22:13:20Z'},
+            {'start_date': '2023-11-14T22:13:20'},
+            {'start_date': '2023-11-14T19:13:20-03:00'},
+            {}
+        ])
+
+        assert cols.start[:3].tolist() == [1_700_000_000] * 3
+        assert cols.start[3] != cols.start[3]  # NaN
+
+    def test_sport_codes_in_first_seen_order(self):
+        """Teste: códigos de esporte"""
+        cols = ActivityColumns([
+            {'sport_type': 'Ride'}, {'type': 'Run'}, {'sport_type': 'Ride'}, {}
+        ])
+
+        assert cols.sport_names == ['Ride', 'Run', 'Unknown']
+        assert cols.sport.tolist() == [0, 1, 0, 2]
+
+
+class TestEquivalence:
+    """InsightsEngine == implementação original"""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_performance(self, seed):
+        activities = _activities(seed, 300)
+
+        assert InsightsEngine(activities).analyze_performance() == \
+            reference_insights.analyze_performance(activities)
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_anomalies(self, seed):
+        activities = _activities(seed, 300)
+
+        assert InsightsEngine(activities).detect_anomalies() == \
+            reference_insights.detect_anomalies(activities)
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_trends(self, seed):
+        activities = _activities(seed, 300)
+
+        result = InsightsEngine(activities).analyze_trends()['data']
+        expected = reference_insights.analyze_trends(activities)['data']
+        assert list(result) == list(expected)
+        for week, values in expected.items():
+            assert result[week]['activities'] == values['activities']
+            assert result[week]['time'] == values['time']
+            assert result[week]['distance'] == pytest.approx(values['distance'])
+            assert result[week]['elevation'] == pytest.approx(values['elevation'])
+
+    @pytest.mark.parametrize('count,sports', [
+        (2, SPORTS), (20, SPORTS), (300, SPORTS), (50, ['Run'])
+    ])
+    def test_recommendations(self, count, sports):
+        # A versão original compara com datetime.now() sem fuso, então só
+        # funciona com start_date sem 'Z'
+        activities = _activities(count, count, naive=True, sports=sports)
+        now = datetime.now().replace(tzinfo=timezone.utc).timestamp()
+
+        result = InsightsEngine(activities).generate_recommendations(now=now)
+        assert result == reference_insights.generate_recommendations(activities)
+
+    def test_recommendations_with_utc_dates(self):
+        """Teste: start_date da Strava ('Z') não quebra a comparação de datas"""
+        activities = _activities(1, 10)
+
+        result = InsightsEngine(activities).generate_recommendations()
+
+        assert isinstance(result['suggestions'], list)
+
+    def test_empty(self):
+        engine = InsightsEngine([])
+
+        assert engine.analyze_performance() == reference_insights.analyze_performance([])
+        assert engine.generate_recommendations() == reference_insights.generate_recommendations([])
+        assert engine.analyze_trends() == reference_insights.analyze_trends([])
+        assert engine.detect_anomalies() == reference_insights.detect_anomalies([])
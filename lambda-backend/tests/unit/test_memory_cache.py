@@ -0,0 +1,92 @@
+"""
+Testes unitários para o LRUCache em memória
+"""
+from memory_cache import LRUCache
+
+
+class FakeClock:
+    """Relógio controlável"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUCache:
+    """Testes de LRU, TTL e limite de bytes"""
+
+    def test_get_set_and_counters(self):
+        """Teste: hit/miss contabilizados"""
+        cache = LRUCache()
+        cache.set("a", {"x": 1})
+
+        assert cache.get("a") == {"x": 1}
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_ttl_expiration_purges_entry(self):
+        """Teste: entrada expirada é removida ao ser lida"""
+        clock = FakeClock()
+        cache = LRUCache(clock=clock)
+        cache.set("a", 1, ttl=10)
+
+        clock.now += 11
+
+        assert "a" not in cache
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.stats()["expirations"] == 1
+
+    def test_purge_expired(self):
+        """Teste: purge_expired remove só as expiradas"""
+        clock = FakeClock()
+        cache = LRUCache(clock=clock)
+        cache.set("short", 1, ttl=5)
+        cache.set("long", 2, ttl=50)
+
+        clock.now += 10
+
+        assert cache.purge_expired() == 1
+        assert len(cache) == 1
+        assert cache.get("long") == 2
+
+    def test_lru_eviction_by_entries(self):
+        """Teste: despeja a menos usada recentemente"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        """Teste: limite de bytes respeitado"""
+        cache = LRUCache(max_bytes=100)
+        cache.set("a", "x", size=60)
+        cache.set("b", "y", size=60)
+
+        assert "a" not in cache
+        assert cache.size_bytes == 60
+
+    def test_oversized_value_not_stored(self):
+        """Teste: valor maior que o limite não entra"""
+        cache = LRUCache(max_bytes=10)
+
+        assert cache.set("a", "x" * 100) is False
+        assert len(cache) == 0
+
+    def test_overwrite_updates_size(self):
+        """Teste: sobrescrever não duplica contabilidade de bytes"""
+        cache = LRUCache()
+        cache.set("a", "x", size=10)
+        cache.set("a", "y", size=25)
+
+        assert len(cache) == 1
+        assert cache.size_bytes == 25
@@ -0,0 +1,83 @@
+"""
+Testes unitários para o PrefetchingPageFetcher
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from page_fetcher import PrefetchingPageFetcher
+
+
+def make_client(total: int, per_page: int, delay: float = 0.0):
+    """StravaClient falso com `total` atividades paginadas"""
+    client = MagicMock()
+    client._rate_limit_remaining = None
+    client._rate_limit_exceeded.return_value = False
+    client.requested_pages = []
+    lock = threading.Lock()
+
+    def get_activities(before=None, after=None, page=1, per_page=30):
+        with lock:
+            client.requested_pages.append(page)
+        if delay:
+            time.sleep(delay)
+        start = (page - 1) * per_page
+        return [{"id": i} for i in range(start, min(start + per_page, total))]
+
+    client.get_activities.side_effect = get_activities
+    return client
+
+
+class TestPrefetchingPageFetcher:
+    """Testes do fetcher concorrente"""
+
+    def test_yields_all_activities_in_order(self):
+        """Teste: ordem preservada mesmo com páginas em paralelo"""
+        client = make_client(total=23, per_page=5, delay=0.005)
+        fetcher = PrefetchingPageFetcher(client, max_workers=4, per_page=5)
+
+        result = list(fetcher.iter_activities(after=100))
+
+        assert [a["id"] for a in result] == list(range(23))
+        assert [t["page"] for t in client.last_page_timings] == [1, 2, 3, 4, 5]
+
+    def test_bounded_speculation_after_short_page(self):
+        """Teste: no máximo k páginas buscadas além da última"""
+        client = make_client(total=7, per_page=5)
+        fetcher = PrefetchingPageFetcher(client, max_workers=3, per_page=5)
+
+        list(fetcher.iter_activities())
+
+        # Página 2 é curta; no pior caso 3 e 4 já estavam em voo
+        assert max(client.requested_pages) <= 4
+
+    def test_sequential_when_rate_limited(self):
+        """Teste: sem orçamento de rate limit, não faz prefetch"""
+        client = make_client(total=12, per_page=5)
+        client._rate_limit_exceeded.return_value = True
+        fetcher = PrefetchingPageFetcher(client, max_workers=4, per_page=5)
+
+        result = list(fetcher.iter_activities())
+
+        assert len(result) == 12
+        assert client.requested_pages == [1, 2, 3]
+
+    def test_window_capped_by_remaining_budget(self):
+        """Teste: janela limitada pelo rate limit restante"""
+        client = make_client(total=0, per_page=5)
+        client._rate_limit_remaining = 2
+        fetcher = PrefetchingPageFetcher(client, max_workers=8, per_page=5)
+
+        assert fetcher._window() == 2
+
+    def test_http_error_propagates(self):
+        """Teste: erro da API propaga para o consumidor"""
+        client = make_client(total=0, per_page=5)
+        client.get_activities.side_effect = requests.exceptions.HTTPError("401")
+        fetcher = PrefetchingPageFetcher(client, max_workers=2, per_page=5)
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            list(fetcher.iter_activities())
@@ -0,0 +1,312 @@
+"""
+Testes do governador de rate limit (headers, janelas, prioridades,
+contadores compartilhados no DynamoDB via moto e degradação dos handlers)
+"""
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import athlete_handler
+import handler_pipeline
+import stats_handler
+import utils
+from rate_limit import (
+    DynamoRateLimitStore, Priority, RateLimitExceeded, RateLimitGovernor, RateLimitState,
+    WindowUsage, parse_rate_limit_headers, seconds_to_reset
+)
+from strava_client import StravaClient
+
+EVENT = {'pathParameters': {'user_id': '42'}, 'queryStringParameters': {}}
+
+# 2025-11-24 10:07:00 UTC: 8 minutos para a janela curta zerar
+NOW = 1763978820.0
+
+
+class FakeClock:
+    def __init__(self, now: float = NOW):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def exhausted_state(short_usage: int = 200, long_usage: int = 500) -> RateLimitState:
+    return RateLimitState(WindowUsage(200, short_usage), WindowUsage(2000, long_usage), time.time())
+
+
+class TestHeaders:
+    """Testes da leitura dos headers X-RateLimit-* e X-ReadRateLimit-*"""
+
+    def test_parses_short_and_daily_windows(self):
+        state = parse_rate_limit_headers(
+            {'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '34,310'}, NOW
+        )
+
+        assert (state.short.remaining, state.long.remaining) == (166, 1690)
+        assert state.remaining == 166
+        assert state.exhausted_window() is None
+
+    def test_read_limit_wins_when_tighter(self):
+        state = parse_rate_limit_headers({
+            'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '10,100',
+            'X-ReadRateLimit-Limit': '100,1000', 'X-ReadRateLimit-Usage': '100,100',
+        }, NOW)
+
+        assert state.short == WindowUsage(100, 100)
+        assert state.long == WindowUsage(1000, 100)
+        assert state.exhausted_window() == 'short'
+
+    def test_daily_window_prevails(self):
+        state = parse_rate_limit_headers(
+            {'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '200,2000'}, NOW
+        )
+
+        assert state.exhausted_window() == 'long'
+
+    def test_missing_or_malformed_headers(self):
+        assert parse_rate_limit_headers({}, NOW) is None
+        assert parse_rate_limit_headers({'X-RateLimit-Limit': 'abc'}, NOW) is None
+
+    def test_seconds_to_reset(self):
+        assert seconds_to_reset(NOW, 'short') == 8 * 60
+        assert seconds_to_reset(NOW, 'long') == (24 * 60 - 10 * 60 - 7) * 60
+
+
+class TestGovernor:
+    """Testes da admissão por prioridade (contadores em memória)"""
+
+    def test_background_stops_before_interactive(self):
+        """Teste: background usa até 80% da janela; interativas seguem até 98%"""
+        governor = RateLimitGovernor(short_limit=10, long_limit=1000, clock=FakeClock())
+
+        for _ in range(8):
+            governor.acquire(Priority.BACKGROUND)
+        with pytest.raises(RateLimitExceeded) as exc:
+            governor.acquire(Priority.BACKGROUND)
+        assert governor.budget_low(Priority.BACKGROUND) is True
+        assert governor.budget_low(Priority.INTERACTIVE) is False
+        governor.acquire(Priority.INTERACTIVE)
+
+        assert exc.value.window == 'short'
+        assert exc.value.retry_after == 8 * 60
+        assert governor.stats()['rejected'][Priority.BACKGROUND] == 1
+
+    def test_next_short_window_frees_budget(self):
+        clock = FakeClock()
+        governor = RateLimitGovernor(short_limit=2, long_limit=1000, clock=clock)
+        governor.acquire()
+        with pytest.raises(RateLimitExceeded):
+            governor.acquire()
+
+        clock.now += seconds_to_reset(clock.now, 'short')
+        governor.acquire()
+
+        assert governor.stats()['daily_usage'] == 2
+
+    def test_daily_limit_blocks_until_midnight(self):
+        governor = RateLimitGovernor(short_limit=100, long_limit=1, clock=FakeClock())
+        governor.acquire()
+
+        with pytest.raises(RateLimitExceeded) as exc:
+            governor.acquire()
+
+        assert exc.value.window == 'long'
+        assert exc.value.retry_after == seconds_to_reset(NOW, 'long')
+
+    def test_headers_raise_usage_and_limits(self):
+        """Teste: uso informado pela Strava (ex: outro cliente) conta no orçamento"""
+        governor = RateLimitGovernor(short_limit=600, long_limit=30000, clock=FakeClock())
+
+        governor.observe(RateLimitState(WindowUsage(200, 196), WindowUsage(2000, 400), NOW))
+
+        assert governor.stats()['short_limit'] == 200
+        assert governor.budget_low(Priority.BACKGROUND) is True
+        with pytest.raises(RateLimitExceeded):
+            governor.acquire(Priority.INTERACTIVE)
+        assert governor.store.usage('2025-11-24', int(NOW // 900)) == (196, 400)
+
+    def test_budget_low_sees_other_containers(self):
+        """Teste: uso de outro container conta, relido no máximo a cada usage_refresh"""
+        clock = FakeClock()
+        governor = RateLimitGovernor(short_limit=10, long_limit=1000, usage_refresh=5,
+                                     clock=clock)
+        other = RateLimitGovernor(store=governor.store, short_limit=10, long_limit=1000,
+                                  clock=clock)
+
+        assert governor.budget_low(Priority.BACKGROUND) is False
+        for _ in range(8):
+            other.acquire(Priority.BACKGROUND)
+        assert governor.budget_low(Priority.BACKGROUND) is False
+
+        clock.now += 5
+        assert governor.budget_low(Priority.BACKGROUND) is True
+
+    def test_store_failure_uses_last_known_usage(self):
+        store = MagicMock()
+        store.admit.side_effect = RuntimeError('DynamoDB indisponível')
+        governor = RateLimitGovernor(store=store, short_limit=2, long_limit=1000, clock=FakeClock())
+
+        governor.acquire()
+        with pytest.raises(RateLimitExceeded):
+            governor.acquire()
+
+        assert governor.stats()['store_errors'] == 2
+
+
+class TestDynamoStore:
+    """Testes dos contadores compartilhados entre containers (moto)"""
+
+    @pytest.fixture
+    def store(self, monkeypatch):
+        moto = pytest.importorskip("moto")
+        import boto3
+
+        for var, value in {
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing',
+            'AWS_DEFAULT_REGION': 'us-east-1',
+        }.items():
+            monkeypatch.setenv(var, value)
+
+        with moto.mock_aws():
+            resource = boto3.resource('dynamodb', region_name='us-east-1')
+            resource.create_table(
+                TableName=utils.DYNAMODB_TABLE_CACHE,
+                KeySchema=[{'AttributeName': 'cache_key', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'cache_key', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            yield DynamoRateLimitStore(resource=resource)
+
+    def test_containers_share_the_ceiling(self, store):
+        """Teste: dois containers juntos não passam do teto da janela"""
+        containers = [
+            RateLimitGovernor(store=store, short_limit=5, long_limit=1000, clock=FakeClock())
+            for _ in range(2)
+        ]
+        admitted = 0
+        for _ in range(5):
+            for governor in containers:
+                try:
+                    governor.acquire(Priority.BACKGROUND)
+                    admitted += 1
+                except RateLimitExceeded:
+                    pass
+
+        assert admitted == 4
+        assert store.usage('2025-11-24', int(NOW // 900)) == (4, 4)
+        item = store.table.get_item(Key={'cache_key': 'ratelimit:2025-11-24'})['Item']
+        assert int(item['expires_at']) > NOW
+
+    def test_raise_to_never_lowers(self, store):
+        short_id = int(NOW // 900)
+        store.raise_to('2025-11-24', short_id, 50, 300)
+        store.raise_to('2025-11-24', short_id, 10, 400)
+
+        assert store.usage('2025-11-24', short_id) == (50, 400)
+
+
+class TestClient:
+    """Testes do StravaClient com governador"""
+
+    def make_client(self, response) -> StravaClient:
+        session = MagicMock()
+        session.request.return_value = response
+        return StravaClient('id', 'secret', access_token='tok', session=session,
+                            governor=RateLimitGovernor())
+
+    def test_strava_429_raises_without_sleeping(self):
+        response = MagicMock(status_code=429, headers={
+            'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '201,900'
+        })
+        client = self.make_client(response)
+
+        with patch('strava_client.time.sleep') as sleep, pytest.raises(RateLimitExceeded) as exc:
+            client.get_athlete()
+
+        sleep.assert_not_called()
+        assert exc.value.window == 'short'
+        assert client.governor.budget_low(Priority.INTERACTIVE) is True
+
+    def test_rejected_request_is_not_sent(self):
+        client = self.make_client(MagicMock(status_code=200, headers={}))
+        client.governor.observe(exhausted_state())
+
+        with pytest.raises(RateLimitExceeded):
+            client.get_athlete()
+
+        client.session.request.assert_not_called()
+
+
+class TestHandlerDegradation:
+    """Testes dos handlers com o orçamento esgotado"""
+
+    def test_serves_old_cache_and_skips_background_refresh(self, memory_governor):
+        memory_governor.observe(exhausted_state(short_usage=170))
+        with patch.object(handler_pipeline, 'cache_manager') as cm, \
+                patch.object(handler_pipeline, 'token_manager'), \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup, \
+                patch.object(handler_pipeline, 'refresh_in_background') as refresh:
+            lookup.return_value = ({'access_token': 'tok'}, {'total_activities': 3}, True)
+
+            response = stats_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['data']['stale'] is True
+        assert lookup.call_args.args[-1] == handler_pipeline.RATE_LIMIT_DEGRADED_STALENESS
+        cm.try_acquire_refresh.assert_not_called()
+        refresh.assert_not_called()
+
+    def test_background_refresh_runs_with_background_priority(self):
+        with patch.object(handler_pipeline, 'cache_manager') as cm, \
+                patch.object(handler_pipeline, 'token_manager'), \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup, \
+                patch.object(handler_pipeline, 'refresh_in_background') as refresh:
+            lookup.return_value = ({'access_token': 'tok'}, {'total_activities': 3}, True)
+            cm.try_acquire_refresh.return_value = True
+
+            stats_handler.lambda_handler(EVENT, None)
+
+        assert refresh.call_args.kwargs == {'priority': Priority.BACKGROUND}
+
+    def test_rate_limit_after_miss_serves_degraded_cache(self, memory_governor):
+        """Teste: MISS com o orçamento ainda ok, 429 da Strava, item antigo servido"""
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=429, headers={
+            'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '201,900'
+        })
+        with patch.object(handler_pipeline, 'cache_manager') as cm, \
+                patch.object(handler_pipeline, 'token_manager'), \
+                patch.object(handler_pipeline, 'http_session', session), \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup:
+            lookup.return_value = ({'access_token': 'tok'}, None, False)
+            cm.get_with_staleness.return_value = ({'id': 42}, True)
+
+            response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['data']['athlete'] == {'id': 42}
+        assert lookup.call_args.args[-1] == 0
+        cm.get_with_staleness.assert_called_once_with(
+            lookup.call_args.args[-2], handler_pipeline.RATE_LIMIT_DEGRADED_STALENESS
+        )
+        session.request.assert_called_once()
+
+    def test_cache_miss_returns_429(self, memory_governor):
+        memory_governor.observe(exhausted_state())
+        session = MagicMock()
+        with patch.object(handler_pipeline, 'cache_manager'), \
+                patch.object(athlete_handler, 'cache_manager'), \
+                patch.object(handler_pipeline, 'token_manager'), \
+                patch.object(handler_pipeline, 'http_session', session), \
+                patch.object(handler_pipeline, 'get_token_and_cache') as lookup:
+            lookup.return_value = ({'access_token': 'tok'}, None, False)
+
+            response = athlete_handler.lambda_handler(EVENT, None)
+
+        assert response['statusCode'] == 429
+        assert json.loads(response['body'])['error']['code'] == 'RATE_LIMITED'
+        assert 0 < int(response['headers']['Retry-After']) <= 15 * 60 + 1
+        session.request.assert_not_called()
@@ -0,0 +1,146 @@
+"""
+Testes unitários para os rollups de estatísticas
+
+Propriedade: para qualquer conjunto de atividades e janela, a fusão dos
+rollups é igual a calculate_stats sobre as mesmas atividades do store.
+"""
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from activity_store import DynamoDBActivityStore, SQLiteActivityStore
+from rollups import DAY, day_key, month_key, start_timestamp, stats_from_rollups, update_rollups
+from stats_handler import calculate_stats
+
+NOW = 1_730_000_000
+SPORTS = ['Run', 'Ride', 'Swim', 'Walk']
+
+
+def _random_activity(rng, activity_id, start_ts):
+    start = datetime.fromtimestamp(start_ts, tz=timezone.utc)
+    activity = {
+        'id': activity_id,
+        'name': f'Atividade {activity_id}',
+        'start_date': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'sport_type': rng.choice(SPORTS),
+        'distance': round(rng.uniform(0, 40000), 1),
+        'moving_time': rng.randint(0, 14400),
+        'total_elevation_gain': round(rng.uniform(0, 800), 1),
+        'average_speed': rng.choice([0, round(rng.uniform(0.5, 12), 3)]),
+        'max_speed': round(rng.choice([rng.uniform(0, 5), rng.uniform(0, 40)]), 3),
+    }
+    if rng.random() < 0.7:
+        activity['average_heartrate'] = round(rng.uniform(90, 180), 1)
+        activity['max_heartrate'] = rng.randint(120, 200)
+    return activity
+
+
+def _populate(store, rng, user_id, count, span_days):
+    """Grava atividades em lotes (como várias sincronizações incrementais)"""
+    starts = sorted(rng.sample(range(NOW - span_days * DAY, NOW), count))
+    activities = [_random_activity(rng, i + 1, ts) for i, ts in enumerate(starts)]
+    batches = sorted(rng.sample(range(1, count), min(4, count - 1))) if count > 1 else []
+    previous = 0
+    for cut in batches + [count]:
+        batch = activities[previous:cut]
+        store.upsert(user_id, batch)
+        update_rollups(store, user_id, batch)
+        previous = cut
+    return activities
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteActivityStore(str(tmp_path / 'activities.db'))
+    yield store
+    store.close()
+
+
+class TestStatsRollupProperty:
+    """Rollups reproduzem calculate_stats"""
+
+    @pytest.mark.parametrize('seed', range(25))
+    def test_rollups_match_calculate_stats(self, store, seed):
+        """Teste: mesmo dicionário para week/month/year/all e por esporte"""
+        rng = random.Random(seed)
+        _populate(store, rng, 'u1', rng.randint(1, 150), span_days=rng.choice([20, 90, 500]))
+
+        windows = [7, 30, 365, rng.randint(1, 600)]
+        for sport_type in [None] + SPORTS:
+            for days in windows:
+                after = NOW - days * DAY + rng.randint(0, DAY)
+                expected = calculate_stats(store.query('u1', after=after), sport_type)
+                stats = stats_from_rollups(store, 'u1', after=after, sport_type=sport_type)
+                assert stats == expected
+
+            expected = calculate_stats(store.query('u1', newest_first=True), sport_type)
+            assert stats_from_rollups(store, 'u1', sport_type=sport_type) == expected
+
+    def test_empty_store(self, store):
+        """Teste: sem atividades"""
+        assert stats_from_rollups(store, 'u1', after=NOW - 7 * DAY) == calculate_stats([])
+        assert stats_from_rollups(store, 'u1') == calculate_stats([])
+
+
+class TestRollupUpdates:
+    """Testes da atualização incremental dos buckets"""
+
+    def test_late_upload_recomputes_day(self, store):
+        """Teste: atividade gravada depois no meio de um dia já agregado"""
+        rng = random.Random(11)
+        first = [_random_activity(rng, 1, NOW - DAY), _random_activity(rng, 3, NOW - DAY + 600)]
+        store.upsert('u1', first)
+        update_rollups(store, 'u1', first)
+
+        late = [_random_activity(rng, 2, NOW - DAY + 300)]
+        store.upsert('u1', late)
+        update_rollups(store, 'u1', late)
+
+        expected = calculate_stats(store.query('u1', after=NOW - 3 * DAY))
+        assert stats_from_rollups(store, 'u1', after=NOW - 3 * DAY) == expected
+
+
+class TestRollupReads:
+    """Itens lidos no DynamoDB (moto): só a janela, não a partição inteira"""
+
+    @pytest.fixture
+    def scanned(self, activities_table):
+        """ScannedCount de cada Query feita na tabela"""
+        counts = []
+        activities_table.meta.client.meta.events.register(
+            'after-call.dynamodb.Query', lambda parsed, **kw: counts.append(parsed['ScannedCount'])
+        )
+        return counts
+
+    def test_reads_are_bounded_by_the_window(self, activities_table, scanned):
+        """Teste: atualização e /stats leem poucos itens de um histórico longo"""
+        rng = random.Random(5)
+        store = DynamoDBActivityStore(activities_table)
+        activities = _populate(store, rng, 'u1', 300, span_days=600)
+        store.set_sync_state('u1', NOW, NOW)
+
+        # Upload atrasado no meio do histórico: só o dia dele e os dias do mês
+        late_start = NOW - 300 * DAY + 3600
+        same_day = [a for a in activities if day_key(start_timestamp(a)) == day_key(late_start)]
+        month_days = {day_key(start_timestamp(a)) for a in activities
+                      if month_key(start_timestamp(a)) == month_key(late_start)}
+        late = [_random_activity(rng, 1000, late_start)]
+        store.upsert('u1', late)
+        scanned.clear()
+        update_rollups(store, 'u1', late)
+
+        activity_reads, day_bucket_reads = scanned
+        assert activity_reads == len(same_day) + 1
+        assert day_bucket_reads == len(month_days | {day_key(late_start)})
+
+        # Semana: dia parcial pelas atividades, o resto por buckets de dia e mês
+        after = NOW - 7 * DAY + 1234
+        scanned.clear()
+        result = stats_from_rollups(store, 'u1', after=after)
+
+        partial_day = [a for a in activities
+                       if after < start_timestamp(a) < after - after % DAY + DAY]
+        assert scanned[0] == len(partial_day)
+        assert sum(scanned) <= len(partial_day) + 31 + 1
+        assert result == calculate_stats(store.query('u1', after=after))
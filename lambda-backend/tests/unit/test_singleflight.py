@@ -0,0 +1,118 @@
+"""
+Testes unitários para a coalescência de requisições (single-flight)
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from singleflight import SingleFlight
+
+
+def _run_concurrently(target, n):
+    """Dispara n threads chamando target e devolve (resultados, erros)"""
+    barrier = threading.Barrier(n)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    return results, errors
+
+
+class TestSingleFlight:
+    """Testes do grupo de chamadas em voo"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Teste: mesma chave executa a função uma única vez"""
+        group = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"ok": True}
+
+        results, errors = _run_concurrently(lambda: group.do("k", slow), 5)
+
+        assert errors == []
+        assert len(calls) == 1
+        assert results == [{"ok": True}] * 5
+        assert group.coalesced == 4
+        assert group.in_flight() == 0
+
+    def test_errors_are_shared(self):
+        """Teste: exceção do líder é repassada a quem esperava"""
+        group = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        results, errors = _run_concurrently(lambda: group.do("k", failing), 3)
+
+        assert results == []
+        assert len(errors) == 3
+        assert all(isinstance(e, ValueError) for e in errors)
+        assert group.in_flight() == 0
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Teste: chamada após a anterior terminar executa de novo"""
+        group = SingleFlight()
+        fn = MagicMock(return_value=1)
+
+        group.do("k", fn)
+        group.do("k", fn)
+
+        assert fn.call_count == 2
+        assert group.coalesced == 0
+
+
+class TestClientCoalescing:
+    """Testes de coalescência no StravaClient._request"""
+
+    @patch('requests.Session.request')
+    def test_concurrent_identical_gets_hit_network_once(self, mock_request,
+                                                        strava_client,
+                                                        mock_activities_response):
+        """Teste: páginas disparando o mesmo fetch geram uma requisição"""
+        def slow_response(*args, **kwargs):
+            time.sleep(0.1)
+            response = MagicMock()
+            response.headers = {}
+            response.content = b"[]"
+            response.json.return_value = mock_activities_response
+            return response
+
+        mock_request.side_effect = slow_response
+
+        results, errors = _run_concurrently(
+            lambda: strava_client.get_activities(page=1, per_page=30), 4
+        )
+
+        assert errors == []
+        assert mock_request.call_count == 1
+        assert all(r == mock_activities_response for r in results)
+        assert strava_client.get_cache_stats()["coalesced_requests"] == 3
+
+    @patch('requests.Session.request')
+    def test_uncached_requests_are_not_coalesced(self, mock_request, strava_client):
+        """Teste: use_cache=False sempre vai à rede"""
+        response = MagicMock()
+        response.headers = {}
+        response.json.return_value = {}
+        mock_request.return_value = response
+
+        strava_client._request("GET", "/athlete", use_cache=False)
+        strava_client._request("GET", "/athlete", use_cache=False)
+
+        assert mock_request.call_count == 2
+        assert strava_client.get_cache_stats()["coalesced_requests"] == 0
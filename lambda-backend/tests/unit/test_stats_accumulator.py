@@ -0,0 +1,121 @@
+"""
+Testes unitários para o acumulador de estatísticas em uma passada
+"""
+import random
+
+import pytest
+
+from stats_accumulator import ExactSum, StatsAccumulator
+from stats_handler import calculate_stats
+
+
+def _activity(activity_id, distance, **extra):
+    activity = {
+        'id': activity_id,
+        'name': f'Atividade {activity_id}',
+        'start_date': f'2025-11-{1 + activity_id % 28:02d}T06:00:00Z',
+        'sport_type': 'Run',
+        'distance': distance,
+        'moving_time': 1800,
+        'total_elevation_gain': 10.5
+    }
+    activity.update(extra)
+    return activity
+
+
+def _random_activities(seed, count):
+    rng = random.Random(seed)
+    return [_activity(i, round(rng.uniform(0, 40000), 1),
+                      sport_type=rng.choice(['Run', 'Ride', 'Swim']),
+                      moving_time=rng.randint(0, 14400),
+                      total_elevation_gain=round(rng.uniform(0, 800), 1),
+                      average_speed=round(rng.uniform(0, 12), 3),
+                      max_speed=round(rng.uniform(0, 40), 3),
+                      average_heartrate=rng.choice([None, round(rng.uniform(90, 180), 1)]),
+                      max_heartrate=rng.randint(120, 200))
+            for i in range(count)]
+
+
+class TestStatsAccumulator:
+    """Testes do acumulador"""
+
+    def test_top_activities_are_largest_by_distance(self):
+        """Teste: top 5 por distância, da maior para a menor"""
+        distances = [5000, 42195, 1000, 21097, 10000, 15000, 800]
+        activities = [_activity(i, d) for i, d in enumerate(distances)]
+
+        top = calculate_stats(activities)['top_activities']
+
+        assert [a['distance'] for a in top] == [42.2, 21.1, 15.0, 10.0, 5.0]
+
+    def test_max_speed_is_true_maximum(self):
+        """Teste: max_speed é o maior valor em km/h, independente da ordem"""
+        activities = [_activity(1, 1000, max_speed=3.0), _activity(2, 1000, max_speed=5.0),
+                      _activity(3, 1000, max_speed=4.0)]
+
+        assert calculate_stats(activities)['max_speed'] == 18.0
+        assert calculate_stats(activities[::-1])['max_speed'] == 18.0
+
+    def test_consumes_iterator_in_one_pass(self):
+        """Teste: aceita gerador sem materializar a lista"""
+        consumed = []
+
+        def generate():
+            for i in range(1000):
+                consumed.append(i)
+                yield _activity(i, 1000 + i, average_heartrate=150)
+
+        stats = calculate_stats(generate())
+
+        assert len(consumed) == 1000
+        assert stats['total_activities'] == 1000
+        assert stats['average_heartrate'] == 150
+        assert len(stats['top_activities']) == 5
+
+    @pytest.mark.parametrize('seed', range(10))
+    def test_merge_across_shards_equals_single_pass(self, seed):
+        """Teste: fundir shards em qualquer ordem == uma passada sobre tudo"""
+        activities = _random_activities(seed, 200)
+        whole = StatsAccumulator().add_all(activities).to_stats()
+
+        rng = random.Random(seed)
+        shuffled = activities[:]
+        rng.shuffle(shuffled)
+        cuts = sorted(rng.sample(range(1, len(shuffled)), 4))
+        shards = [shuffled[a:b] for a, b in zip([0] + cuts, cuts + [len(shuffled)])]
+        merged = StatsAccumulator()
+        for shard in reversed(shards):
+            merged = merged.merge(StatsAccumulator().add_all(shard))
+
+        assert merged.to_stats() == whole
+
+    def test_roundtrip_dict(self):
+        """Teste: estado serializado preserva o resultado"""
+        import json
+        accumulator = StatsAccumulator().add_all(_random_activities(3, 50))
+
+        restored = StatsAccumulator.from_dict(json.loads(json.dumps(accumulator.to_dict())))
+
+        assert restored.to_stats() == accumulator.to_stats()
+
+    def test_empty(self):
+        """Teste: sem atividades"""
+        stats = calculate_stats([])
+
+        assert stats['total_activities'] == 0
+        assert stats['top_activities'] == []
+        assert 'average_distance' not in stats
+
+
+class TestExactSum:
+    """Testes da soma exata"""
+
+    def test_order_independent(self):
+        values = [0.1] * 10 + [1e16, -1e16, 0.3]
+        forward, backward = ExactSum(), ExactSum()
+        for v in values:
+            forward.add(v)
+        for v in reversed(values):
+            backward.add(v)
+
+        assert forward.value == backward.value == pytest.approx(1.3)
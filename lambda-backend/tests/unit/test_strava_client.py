@@ -23,7 +23,7 @@ class TestStravaClientInit:
         assert client.client_id == client_credentials["client_id"]
         assert client.client_secret == client_credentials["client_secret"]
         assert client.access_token == client_credentials["access_token"]
-        assert client._cache == {}
+        assert len(client._cache) == 0
         assert client._cache_ttl == 300
     
     def test_init_without_access_token(self, client_credentials):
@@ -71,7 +71,7 @@ class TestCacheValidation:
         """Teste: cache válido"""
         key = "test_key"
         data = {"test": "data"}
-        strava_client._cache[key] = (data, time.time())
+        strava_client._cache.set(key, data, ttl=strava_client._cache_ttl)
         
         assert strava_client._is_cache_valid(key) is True
     
@@ -79,8 +79,7 @@ class TestCacheValidation:
         """Teste: cache expirado"""
         key = "test_key"
         data = {"test": "data"}
-        old_time = time.time() - strava_client._cache_ttl - 10
-        strava_client._cache[key] = (data, old_time)
+        strava_client._cache.set(key, data, ttl=-10)
         
         assert strava_client._is_cache_valid(key) is False
     
@@ -90,12 +89,12 @@ class TestCacheValidation:
     
     def test_clear_cache(self, strava_client):
         """Teste: limpar cache"""
-        strava_client._cache["key1"] = ("data1", time.time())
-        strava_client._cache["key2"] = ("data2", time.time())
+        strava_client._cache.set("key1", "data1")
+        strava_client._cache.set("key2", "data2")
         
         strava_client.clear_cache()
         
-        assert strava_client._cache == {}
+        assert len(strava_client._cache) == 0
 
 
 class TestRateLimit:
@@ -148,7 +147,7 @@ class TestAuthorizationURL:
 class TestGetAccessToken:
     """Testes de obtenção de token de acesso"""
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_get_access_token_success(self, mock_post, strava_client, client_credentials):
         """Teste: obter token com sucesso"""
         mock_response = MagicMock()
@@ -170,7 +169,7 @@ class TestGetAccessToken:
         assert result["refresh_token"] == "refresh_token_xyz"
         assert strava_client.access_token == "new_token_12345"
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_get_access_token_failure(self, mock_post, strava_client):
         """Teste: falha ao obter token"""
         mock_post.side_effect = requests.exceptions.RequestException("API Error")
@@ -185,7 +184,7 @@ class TestGetAccessToken:
 class TestRefreshAccessToken:
     """Testes de renovação de token"""
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_refresh_access_token_success(self, mock_post, strava_client):
         """Teste: renovar token com sucesso"""
         mock_response = MagicMock()
@@ -207,7 +206,7 @@ class TestRefreshAccessToken:
 class TestGetAthlete:
     """Testes para obter dados do atleta"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_athlete_authenticated(self, mock_request, strava_client, mock_athlete_response):
         """Teste: obter atleta autenticado"""
         mock_response = MagicMock()
@@ -226,7 +225,7 @@ class TestGetAthlete:
         assert result["firstname"] == "Test"
         assert result["lastname"] == "Athlete"
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_athlete_specific(self, mock_request, strava_client, mock_athlete_response):
         """Teste: obter atleta específico"""
         mock_response = MagicMock()
@@ -247,7 +246,7 @@ class TestGetAthlete:
 class TestGetActivities:
     """Testes para obter atividades"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_activities_default_params(self, mock_request, strava_client, mock_activities_response):
         """Teste: obter atividades com parâmetros padrão"""
         mock_response = MagicMock()
@@ -266,7 +265,7 @@ class TestGetActivities:
         assert result[0]["name"] == "Morning Run"
         assert result[1]["name"] == "Evening Ride"
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_activities_with_pagination(self, mock_request, strava_client, mock_activities_response):
         """Teste: obter atividades com paginação"""
         mock_response = MagicMock()
@@ -283,7 +282,7 @@ class TestGetActivities:
         
         assert len(result) == 2
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_activities_with_date_filters(self, mock_request, strava_client, mock_activities_response):
         """Teste: obter atividades com filtro de data"""
         mock_response = MagicMock()
@@ -310,7 +309,7 @@ class TestGetActivities:
 class TestGetActivity:
     """Testes para obter detalhes de uma atividade"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get_activity_default(self, mock_request, strava_client):
         """Teste: obter detalhes da atividade"""
         activity_data = {
@@ -350,8 +349,8 @@ class TestCacheStatistics:
     
     def test_get_cache_stats_with_data(self, strava_client):
         """Teste: estatísticas com dados em cache"""
-        strava_client._cache["key1"] = ({"data": "test"}, time.time())
-        strava_client._cache["key2"] = ({"data": "test2"}, time.time())
+        strava_client._cache.set("key1", {"data": "test"})
+        strava_client._cache.set("key2", {"data": "test2"})
         strava_client._request_count = 5
         strava_client._total_requests = 10
         
@@ -364,7 +363,7 @@ class TestCacheStatistics:
 class TestErrorHandling:
     """Testes de tratamento de erros"""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_http_error_handling(self, mock_request, strava_client):
         """Teste: tratamento de erro HTTP"""
         mock_response = MagicMock()
@@ -374,7 +373,7 @@ class TestErrorHandling:
         with pytest.raises(requests.exceptions.HTTPError):
             strava_client.get_athlete()
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_timeout_error_handling(self, mock_request, strava_client):
         """Teste: tratamento de timeout"""
         mock_request.side_effect = requests.exceptions.Timeout("Connection timeout")
@@ -382,10 +381,126 @@ class TestErrorHandling:
         with pytest.raises(requests.exceptions.Timeout):
             strava_client.get_athlete()
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_connection_error_handling(self, mock_request, strava_client):
         """Teste: tratamento de erro de conexão"""
         mock_request.side_effect = requests.exceptions.ConnectionError("Connection refused")
         
         with pytest.raises(requests.exceptions.ConnectionError):
             strava_client.get_athlete()
+
+
+class TestIterActivities:
+    """Testes para a paginação automática de atividades"""
+    
+    @staticmethod
+    def _page_response(activities):
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.json.return_value = activities
+        response.raise_for_status.return_value = None
+        return response
+    
+    @patch('requests.Session.request')
+    def test_iter_activities_walks_until_short_page(self, mock_request, strava_client):
+        """Teste: percorre páginas até a primeira incompleta"""
+        pages = [
+            [{"id": i} for i in range(3)],
+            [{"id": i} for i in range(3, 6)],
+            [{"id": 6}],
+        ]
+        mock_request.side_effect = [self._page_response(p) for p in pages]
+        
+        result = list(strava_client.iter_activities(after=1000, per_page=3))
+        
+        assert [a["id"] for a in result] == list(range(7))
+        assert mock_request.call_count == 3
+        requested_pages = [c.kwargs["params"]["page"] for c in mock_request.call_args_list]
+        assert requested_pages == [1, 2, 3]
+        assert mock_request.call_args_list[0].kwargs["params"]["after"] == 1000
+    
+    @patch('requests.Session.request')
+    def test_iter_activities_is_lazy(self, mock_request, strava_client):
+        """Teste: próxima página só é buscada quando necessária"""
+        mock_request.side_effect = [
+            self._page_response([{"id": 1}, {"id": 2}]),
+            self._page_response([]),
+        ]
+        
+        iterator = strava_client.iter_activities(per_page=2)
+        assert mock_request.call_count == 0
+        
+        next(iterator)
+        next(iterator)
+        assert mock_request.call_count == 1
+        
+        assert list(iterator) == []
+        assert mock_request.call_count == 2
+    
+    @patch('requests.Session.request')
+    def test_iter_activities_page_timings(self, mock_request, strava_client):
+        """Teste: timing por página exposto via callback e last_page_timings"""
+        mock_request.side_effect = [
+            self._page_response([{"id": 1}, {"id": 2}]),
+            self._page_response([{"id": 3}]),
+        ]
+        seen = []
+        
+        list(strava_client.iter_activities(per_page=2, on_page=seen.append))
+        
+        assert [t["page"] for t in seen] == [1, 2]
+        assert [t["count"] for t in seen] == [2, 1]
+        assert all(t["duration_ms"] >= 0 for t in seen)
+        assert strava_client.last_page_timings == seen
+    
+    @patch('requests.Session.request')
+    def test_iter_activities_caps_per_page(self, mock_request, strava_client):
+        """Teste: per_page limitado a 200"""
+        mock_request.return_value = self._page_response([])
+        
+        list(strava_client.iter_activities(per_page=500))
+        
+        assert mock_request.call_args.kwargs["params"]["per_page"] == 200
+
+
+class TestEndpointCache:
+    """Testes do cache LRU por endpoint do cliente"""
+    
+    def test_ttl_per_endpoint(self, strava_client):
+        """Teste: TTLs de atleta, atividades e stats seguem o config"""
+        from config import CACHE_TTL_ATHLETE, CACHE_TTL_ACTIVITIES, CACHE_TTL_STATS
+        
+        assert strava_client._ttl_for("/athlete") == CACHE_TTL_ATHLETE
+        assert strava_client._ttl_for("/athletes/123") == CACHE_TTL_ATHLETE
+        assert strava_client._ttl_for("/segments/42") == strava_client._cache_ttl
+        assert strava_client._ttl_for("/athlete/activities") == CACHE_TTL_ACTIVITIES
+        assert strava_client._ttl_for("/activities/987") == CACHE_TTL_ACTIVITIES
+        assert strava_client._ttl_for("/athletes/123/stats") == CACHE_TTL_STATS
+    
+    @patch('requests.Session.request')
+    def test_hit_miss_counters(self, mock_request, strava_client, mock_athlete_response):
+        """Teste: hits e misses aparecem em get_cache_stats"""
+        mock_response = MagicMock()
+        mock_response.headers = {}
+        mock_response.content = b'{"id": 123456}'
+        mock_response.json.return_value = mock_athlete_response
+        mock_request.return_value = mock_response
+        
+        strava_client.get_athlete()
+        strava_client.get_athlete()
+        stats = strava_client.get_cache_stats()
+        
+        assert stats["cache_misses"] == 1
+        assert stats["cache_hits"] == 1
+        assert stats["cache_bytes"] == len(mock_response.content)
+    
+    def test_bounded_entries(self, strava_client):
+        """Teste: cache não cresce além do limite de entradas"""
+        strava_client._cache.max_entries = 3
+        for i in range(10):
+            strava_client._cache.set(f"key{i}", {"i": i})
+        
+        stats = strava_client.get_cache_stats()
+        assert stats["cache_size"] == 3
+        assert stats["cache_evictions"] == 7
@@ -0,0 +1,163 @@
+"""
+Testes do throttler local (token buckets, filas por prioridade e métricas)
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from rate_limit import Priority, RateLimitExceeded
+from strava_client import StravaClient
+from throttle import ThrottleScheduler, Throttler, TokenBucket
+
+
+def granted(scheduler: ThrottleScheduler, now: float):
+    return [(t.user_id, t.priority) for t in scheduler.dispatch(now)]
+
+
+class TestTokenBucket:
+    """Testes do balde de fichas"""
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=2, capacity=3, now=0)
+        for _ in range(3):
+            bucket.take(0)
+
+        assert bucket.available(0) is False
+        assert bucket.ready_at(0) == 0.5
+        assert bucket.available(0.5) is True
+        assert bucket.full(10) is True
+        assert bucket.tokens == 3
+
+
+class TestScheduler:
+    """Testes do ThrottleScheduler com tempo explícito"""
+
+    def test_higher_priority_goes_first(self):
+        scheduler = ThrottleScheduler(global_rate=1, global_burst=1, user_rate=None)
+        scheduler.dispatch(0)  # nada na fila, o balde continua cheio
+        scheduler.submit('a', Priority.BACKFILL, 0)
+        scheduler.submit('b', Priority.BACKGROUND, 0)
+        scheduler.submit('c', Priority.INTERACTIVE, 0)
+
+        assert granted(scheduler, 0) == [('c', Priority.INTERACTIVE)]
+        assert granted(scheduler, 1) == [('b', Priority.BACKGROUND)]
+        assert granted(scheduler, 2) == [('a', Priority.BACKFILL)]
+
+    def test_users_take_turns_within_a_class(self):
+        """Teste: quem enfileirou muito não passa na frente dos outros"""
+        scheduler = ThrottleScheduler(global_rate=1, global_burst=4, user_rate=None)
+        for _ in range(3):
+            scheduler.submit('hog', Priority.BACKFILL, 0)
+        scheduler.submit('other', Priority.BACKFILL, 0)
+
+        assert [user for user, _ in granted(scheduler, 0)] == ['hog', 'other', 'hog', 'hog']
+
+    def test_empty_user_bucket_does_not_block_others(self):
+        scheduler = ThrottleScheduler(global_rate=10, global_burst=10, user_rate=0.5, user_burst=1)
+        scheduler.submit('a', Priority.INTERACTIVE, 0)
+        scheduler.submit('a', Priority.INTERACTIVE, 0)
+        scheduler.submit('b', Priority.BACKFILL, 0)
+
+        assert granted(scheduler, 0) == [('a', Priority.INTERACTIVE), ('b', Priority.BACKFILL)]
+        assert scheduler.next_ready_at(0) == 2.0
+        assert granted(scheduler, 1.9) == []
+        assert granted(scheduler, 2.0) == [('a', Priority.INTERACTIVE)]
+        assert scheduler.next_ready_at(2.0) is None
+
+    def test_global_bucket_paces_everyone(self):
+        scheduler = ThrottleScheduler(global_rate=0.25, global_burst=1, user_rate=None)
+        for user in ('a', 'b', 'c'):
+            scheduler.submit(user, Priority.INTERACTIVE, 0)
+
+        times = []
+        now = 0.0
+        while scheduler.waiting:
+            times += [now] * len(scheduler.dispatch(now))
+            now = scheduler.next_ready_at(now) or now
+
+        assert times == [0.0, 4.0, 8.0]
+
+    def test_metrics(self):
+        scheduler = ThrottleScheduler(global_rate=1, global_burst=1, user_rate=None)
+        first = scheduler.submit('a', Priority.INTERACTIVE, 0)
+        scheduler.submit('b', Priority.INTERACTIVE, 0)
+        dropped = scheduler.submit('c', Priority.BACKFILL, 0)
+        scheduler.dispatch(0)
+
+        assert scheduler.metrics()['queue_depth'] == {
+            'interactive': 1, 'background': 0, 'backfill': 1
+        }
+        assert scheduler.cancel(dropped) is True
+        assert scheduler.cancel(first) is False
+        scheduler.dispatch(3)
+
+        metrics = scheduler.metrics()
+        assert metrics['queue_depth'] == {'interactive': 0, 'background': 0, 'backfill': 0}
+        assert metrics['max_queue_depth'][Priority.INTERACTIVE] == 2
+        assert metrics['granted'][Priority.INTERACTIVE] == 2
+        assert metrics['cancelled'][Priority.BACKFILL] == 1
+        assert metrics['wait'][Priority.INTERACTIVE] == {
+            'avg_ms': 1500.0, 'p95_ms': 3000.0, 'max_ms': 3000.0
+        }
+
+    def test_idle_user_buckets_are_pruned(self):
+        scheduler = ThrottleScheduler(global_rate=100, global_burst=100, user_rate=1, user_burst=1,
+                                      max_users=2)
+        for user in ('a', 'b', 'c'):
+            scheduler.submit(user, Priority.INTERACTIVE, 0)
+        scheduler.dispatch(0)
+        scheduler.submit('d', Priority.INTERACTIVE, 5)
+        scheduler.dispatch(5)
+
+        # a, b e c já reabasteceram; d acabou de gastar a ficha
+        assert scheduler.metrics()['users'] == 1
+
+
+class TestThrottler:
+    """Testes do Throttler entre threads"""
+
+    def test_concurrent_requests_are_spaced(self):
+        throttler = Throttler(ThrottleScheduler(global_rate=50, global_burst=1, user_rate=None,
+                                                now=time.monotonic()))
+        waits = []
+
+        def request(user):
+            waits.append(throttler.acquire(user))
+
+        threads = [threading.Thread(target=request, args=(f'u{i}',)) for i in range(5)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert len(waits) == 5
+        assert time.monotonic() - start >= 4 / 50 - 0.01
+        assert throttler.metrics()['granted'][Priority.INTERACTIVE] == 5
+
+    def test_gives_up_after_max_wait(self):
+        throttler = Throttler(ThrottleScheduler(global_rate=0.01, global_burst=1, user_rate=None,
+                                                now=time.monotonic()))
+        throttler.acquire('a')
+
+        with pytest.raises(RateLimitExceeded) as exc:
+            throttler.acquire('b', Priority.BACKFILL, max_wait=0.05)
+
+        assert exc.value.window == 'throttle'
+        assert exc.value.retry_after > 90
+        assert throttler.metrics()['queue_depth'][Priority.BACKFILL] == 0
+
+    def test_client_waits_its_turn_before_sending(self):
+        throttler = MagicMock()
+        throttler.acquire.return_value = 0.0
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200, headers={})
+        client = StravaClient('id', 'secret', access_token='tok', session=session,
+                              priority=Priority.BACKFILL, throttler=throttler, user_id='42')
+
+        client.get_athlete()
+
+        throttler.acquire.assert_called_once_with('42', Priority.BACKFILL)
+        session.request.assert_called_once()
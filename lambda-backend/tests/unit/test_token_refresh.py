@@ -0,0 +1,261 @@
+"""
+Testes da renovação de tokens com lock e do agendador (DynamoDB via moto,
+endpoint de token da Strava simulado por um servidor HTTP local)
+"""
+import json
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import pytest
+
+import auth_handler
+import token_refresh_handler
+import utils
+from auth_handler import TokenRefreshInProgress, refresh_access_token
+from utils import TokenManager
+
+
+class FakeTokenEndpoint:
+    """POST /oauth/token: troca refresh_token por tokens novos e registra as chamadas"""
+
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.refresh_tokens = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/oauth/token"
+
+    def __enter__(self) -> "FakeTokenEndpoint":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+                refresh_token = form['refresh_token'][0]
+                fake.refresh_tokens.append(refresh_token)
+                payload = {
+                    'access_token': f'access-{refresh_token}-{len(fake.refresh_tokens)}',
+                    'refresh_token': refresh_token,
+                    'expires_at': int(time.time()) + 21600,
+                } if fake.status == 200 else {'message': 'Bad Request'}
+                body = json.dumps(payload).encode()
+                self.send_response(fake.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    """TokenManager sobre uma tabela de usuários no moto"""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for var, value in {
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+    }.items():
+        monkeypatch.setenv(var, value)
+
+    with moto.mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        resource.create_table(
+            TableName=utils.DYNAMODB_TABLE_USERS,
+            KeySchema=[{'AttributeName': 'user_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'user_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        manager = TokenManager(resource=resource)
+        with patch.object(auth_handler, 'token_manager', manager), \
+                patch.object(token_refresh_handler, 'token_manager', manager):
+            yield manager
+
+
+@pytest.fixture
+def endpoint():
+    with FakeTokenEndpoint() as fake, patch.object(auth_handler, 'STRAVA_TOKEN_URL', fake.url):
+        yield fake
+
+
+def save_user(tokens: TokenManager, user_id: str, expires_in: int) -> None:
+    tokens.save_token(user_id, {
+        'access_token': f'old-{user_id}',
+        'refresh_token': f'refresh-{user_id}',
+        'expires_at': int(time.time()) + expires_in,
+    })
+
+
+class TestRefreshLock:
+    """Testes do lock de renovação (escrita condicional)"""
+
+    def test_only_one_owner_at_a_time(self, tokens):
+        save_user(tokens, '1', 60)
+
+        owner = tokens.try_acquire_refresh_lock('1')
+
+        assert owner is not None
+        assert tokens.try_acquire_refresh_lock('1') is None
+        assert tokens.release_refresh_lock('1', owner) is True
+        assert tokens.try_acquire_refresh_lock('1') is not None
+
+    def test_expired_lock_can_be_taken_over(self, tokens):
+        save_user(tokens, '1', 60)
+        stale_owner = tokens.try_acquire_refresh_lock('1', lease_seconds=-1)
+
+        owner = tokens.try_acquire_refresh_lock('1')
+
+        assert owner is not None
+        # O dono antigo não grava por cima nem libera o lock novo
+        assert tokens.save_token('1', {'access_token': 'late'}, lock_owner=stale_owner) is False
+        assert tokens.release_refresh_lock('1', stale_owner) is False
+        assert tokens.get_token('1')['access_token'] == 'old-1'
+
+    def test_unknown_user_has_no_lock(self, tokens):
+        assert tokens.try_acquire_refresh_lock('missing') is None
+
+    def test_refresh_saves_token_and_releases_lock(self, tokens, endpoint):
+        save_user(tokens, '1', 60)
+
+        new_tokens = refresh_access_token('1')
+
+        assert endpoint.refresh_tokens == ['refresh-1']
+        assert tokens.get_token('1')['access_token'] == new_tokens['access_token']
+        item = tokens.table.get_item(Key={'user_id': '1'})['Item']
+        assert 'refresh_lock_owner' not in item
+
+    def test_failed_refresh_releases_lock(self, tokens):
+        save_user(tokens, '1', 60)
+
+        with FakeTokenEndpoint(status=400) as fake, \
+                patch.object(auth_handler, 'STRAVA_TOKEN_URL', fake.url):
+            with pytest.raises(Exception):
+                refresh_access_token('1')
+
+        assert tokens.try_acquire_refresh_lock('1') is not None
+
+    def test_lost_lock_does_not_return_unsaved_tokens(self, tokens, endpoint):
+        """Teste: lock tomado durante a chamada à Strava -> nada salvo, nada retornado"""
+        save_user(tokens, '1', 60)
+        acquire = tokens.try_acquire_refresh_lock
+
+        def acquire_then_lose(user_id):
+            owner = acquire(user_id, lease_seconds=-1)
+            acquire(user_id)  # outra invocação toma o lock expirado
+            return owner
+
+        with patch.object(tokens, 'try_acquire_refresh_lock', acquire_then_lose), \
+                pytest.raises(TokenRefreshInProgress):
+            refresh_access_token('1')
+
+        assert endpoint.refresh_tokens == ['refresh-1']
+        assert tokens.get_token('1')['access_token'] == 'old-1'
+
+    def test_lost_lock_returns_token_saved_by_new_owner(self, tokens, endpoint):
+        save_user(tokens, '1', 60)
+        acquire = tokens.try_acquire_refresh_lock
+
+        def acquire_then_lose(user_id):
+            owner = acquire(user_id, lease_seconds=-1)
+            other = acquire(user_id)
+            tokens.save_token(user_id, {'access_token': 'other', 'refresh_token': 'refresh-1'},
+                              lock_owner=other)
+            return owner
+
+        with patch.object(tokens, 'try_acquire_refresh_lock', acquire_then_lose):
+            result = refresh_access_token('1')
+
+        assert result['access_token'] == 'other'
+        assert tokens.get_token('1')['access_token'] == 'other'
+
+    def test_waits_for_concurrent_refresh(self, tokens, endpoint):
+        """Teste: sem o lock, espera o token salvo por quem renovou (sem chamar a Strava)"""
+        save_user(tokens, '1', 60)
+        owner = tokens.try_acquire_refresh_lock('1')
+
+        def finish_refresh():
+            time.sleep(0.3)
+            tokens.save_token('1', {'access_token': 'fresh', 'refresh_token': 'refresh-1'},
+                              lock_owner=owner)
+
+        threading.Thread(target=finish_refresh).start()
+        result = refresh_access_token('1', wait=5)
+
+        assert result['access_token'] == 'fresh'
+        assert endpoint.refresh_tokens == []
+
+    def test_gives_up_waiting(self, tokens, endpoint):
+        save_user(tokens, '1', 60)
+        tokens.try_acquire_refresh_lock('1')
+
+        with patch.object(auth_handler, 'LOCK_POLL_INTERVAL', 0.01), \
+                pytest.raises(TokenRefreshInProgress):
+            refresh_access_token('1', wait=0.05)
+
+        assert endpoint.refresh_tokens == []
+
+
+class TestScheduler:
+    """Testes do handler agendado"""
+
+    def test_refreshes_only_tokens_inside_window(self, tokens, endpoint):
+        save_user(tokens, 'expired', -60)
+        save_user(tokens, 'soon', 600)
+        save_user(tokens, 'fresh', 20000)
+
+        summary = token_refresh_handler.lambda_handler({}, None)
+
+        assert summary == {'expiring': 2, 'refreshed': 2, 'skipped': 0, 'failed': 0, 'deferred': 0}
+        assert sorted(endpoint.refresh_tokens) == ['refresh-expired', 'refresh-soon']
+        assert tokens.get_token('fresh')['access_token'] == 'old-fresh'
+        assert tokens.get_token('soon')['access_token'].startswith('access-refresh-soon')
+
+    def test_refreshes_across_pages_and_batches(self, tokens, endpoint):
+        for i in range(7):
+            save_user(tokens, str(i), 60)
+
+        with patch.object(tokens, 'scan_expiring', partial(tokens.scan_expiring, page_size=3)):
+            summary = token_refresh_handler.refresh_expiring_tokens(batch_size=2, workers=2)
+
+        assert summary['refreshed'] == 7
+        assert len(endpoint.refresh_tokens) == 7
+
+    def test_skips_users_being_refreshed(self, tokens, endpoint):
+        save_user(tokens, 'busy', 60)
+        save_user(tokens, 'idle', 60)
+        tokens.try_acquire_refresh_lock('busy')
+
+        summary = token_refresh_handler.refresh_expiring_tokens()
+
+        assert summary['refreshed'] == 1
+        assert summary['skipped'] == 1
+        assert endpoint.refresh_tokens == ['refresh-idle']
+
+    def test_stops_near_lambda_timeout(self, tokens, endpoint):
+        save_user(tokens, '1', 60)
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 1000
+
+        summary = token_refresh_handler.lambda_handler({}, context)
+
+        assert summary['deferred'] == 1
+        assert endpoint.refresh_tokens == []
@@ -0,0 +1,75 @@
+"""
+Testes unitários para a camada de transporte HTTP compartilhada
+"""
+import pytest
+from unittest.mock import MagicMock
+import requests
+
+import transport
+from strava_client import StravaClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    """Garante uma sessão nova por teste"""
+    transport.reset_session()
+    yield
+    transport.reset_session()
+
+
+class TestSharedSession:
+    """Testes da sessão em escopo de módulo"""
+
+    def test_get_session_is_reused(self):
+        """Teste: mesma sessão entre chamadas (invocações quentes)"""
+        assert transport.get_session() is transport.get_session()
+
+    def test_reset_session_creates_new_one(self):
+        """Teste: reset descarta a sessão anterior"""
+        first = transport.get_session()
+        transport.reset_session()
+
+        assert transport.get_session() is not first
+
+    def test_adapter_pool_and_retries(self):
+        """Teste: adapter com pool e retries configurados"""
+        session = transport.build_session(pool_connections=2, pool_maxsize=7, max_retries=3)
+        adapter = session.get_adapter("https://www.strava.com/api/v3/athlete")
+
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
+        assert 429 not in adapter.max_retries.status_forcelist
+        assert "POST" not in adapter.max_retries.allowed_methods
+
+
+class TestClientSessionInjection:
+    """Testes de injeção da sessão no StravaClient"""
+
+    def test_client_uses_shared_session_by_default(self, client_credentials):
+        """Teste: cliente usa a sessão compartilhada"""
+        client = StravaClient(
+            client_id=client_credentials["client_id"],
+            client_secret=client_credentials["client_secret"]
+        )
+
+        assert client.session is transport.get_session()
+
+    def test_client_uses_injected_session(self, client_credentials, mock_athlete_response):
+        """Teste: requisições passam pela sessão injetada"""
+        session = MagicMock(spec=requests.Session)
+        response = MagicMock()
+        response.headers = {}
+        response.json.return_value = mock_athlete_response
+        session.request.return_value = response
+
+        client = StravaClient(
+            client_id=client_credentials["client_id"],
+            client_secret=client_credentials["client_secret"],
+            access_token=client_credentials["access_token"],
+            session=session
+        )
+        result = client.get_athlete()
+
+        assert result["id"] == 123456
+        session.request.assert_called_once()
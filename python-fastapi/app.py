@@ -1,264 +1,404 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
-from datetime import datetime
-from statistics import mean, median, stdev
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
 import logging
 
+from pydantic import BaseModel
+
+from insights import COLUMN_SLICE, StravaInsights, append_columns, empty_columns, report_from_columns
+from singleflight import AsyncSingleFlight
+from ttl_cache import TTLCache
+from weather import EnrichmentStats, enrich_with_weather, iter_enriched_with_weather
+from weather_cache import WeatherCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Strava Insights API", version="1.0.0")
-
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8080")
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_API_KEY")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+EXPORT_CACHE_TTL = float(os.getenv("EXPORT_CACHE_TTL", "60"))
+ENRICH_CACHE_TTL = float(os.getenv("ENRICH_CACHE_TTL", "900"))
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "10"))
+WEATHER_MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", "3"))
+WEATHER_BACKOFF = float(os.getenv("WEATHER_BACKOFF", "0.5"))
+# Longest wait before retrying a 429; a longer Retry-After fails the activity
+WEATHER_MAX_RETRY_DELAY = float(os.getenv("WEATHER_MAX_RETRY_DELAY", "30"))
+# Persistent weather cache; an empty path disables it
+WEATHER_CACHE_PATH = os.getenv("WEATHER_CACHE_PATH", "weather_cache.db")
+WEATHER_CACHE_CELL_DEG = float(os.getenv("WEATHER_CACHE_CELL_DEG", "0.05"))
+# Enriched activities remembered by id for POST delta requests
+ACTIVITY_CACHE_MAX = int(os.getenv("ACTIVITY_CACHE_MAX", "50000"))
+# Worker processes for /insights analysis (0 runs it on the event loop) and
+# the history size from which the pool is used
+INSIGHTS_WORKERS = int(os.getenv("INSIGHTS_WORKERS", "2"))
+INSIGHTS_POOL_MIN = int(os.getenv("INSIGHTS_POOL_MIN", "2000"))
 
 
-class StravaInsights:
-    """Generate intelligent insights from Strava activities and weather data"""
-    
-    def __init__(self, activities):
-        self.activities = activities
-        self.enriched_activities = []
-    
-    def extract_weather(self, activity):
-        """Extract weather data from activity if available"""
-        weather = activity.get('weather', {})
-        if isinstance(weather, dict) and 'current' in weather:
-            return {
-                'temperature': weather['current'].get('temp'),
-                'humidity': weather['current'].get('humidity'),
-                'wind_speed': weather['current'].get('wind_speed'),
-                'clouds': weather['current'].get('clouds'),
-                'weather_main': weather['current'].get('weather', [{}])[0].get('main'),
-                'feels_like': weather['current'].get('feels_like'),
-                'pressure': weather['current'].get('pressure'),
-            }
-        return None
-    
-    def calculate_pace(self, activity):
-        """Calculate pace in min/km or min/mile"""
-        distance = activity.get('distance', 0)  # meters
-        moving_time = activity.get('moving_time', 1)  # seconds
-        
-        if distance <= 0 or moving_time <= 0:
-            return None
-        
-        km = distance / 1000
-        minutes = moving_time / 60
-        pace_min_per_km = minutes / km if km > 0 else None
-        return pace_min_per_km
-    
-    def calculate_heart_rate_avg(self, activity):
-        """Extract average heart rate if available"""
-        return activity.get('average_heartrate')
-    
-    def get_activity_conditions(self, activity):
-        """Classify activity weather conditions"""
-        weather = self.extract_weather(activity)
-        if not weather:
-            return "unknown"
-        
-        temp = weather.get('temperature', 0)
-        humidity = weather.get('humidity', 50)
-        wind = weather.get('wind_speed', 0)
-        
-        if temp < 5:
-            return "cold"
-        elif temp < 15:
-            return "cool"
-        elif temp < 22:
-            return "ideal"
-        elif temp < 28:
-            return "warm"
-        else:
-            return "hot"
-    
-    def analyze_performance_by_condition(self):
-        """Analyze performance metrics grouped by weather conditions"""
-        conditions_stats = defaultdict(list)
-        
-        for activity in self.enriched_activities:
-            pace = self.calculate_pace(activity)
-            condition = activity.get('weather_condition', 'unknown')
-            
-            if pace and condition != 'unknown':
-                conditions_stats[condition].append(pace)
-        
-        result = {}
-        for condition, paces in conditions_stats.items():
-            if paces:
-                result[condition] = {
-                    'avg_pace': round(mean(paces), 2),
-                    'median_pace': round(median(paces), 2),
-                    'count': len(paces),
-                    'best_pace': round(min(paces), 2),
-                    'worst_pace': round(max(paces), 2),
-                }
-        
-        return result
-    
-    def analyze_performance_by_temperature_range(self):
-        """Analyze performance by temperature ranges"""
-        temp_ranges = {
-            'cold_below_5': [],
-            'cool_5_to_15': [],
-            'ideal_15_to_22': [],
-            'warm_22_to_28': [],
-            'hot_above_28': []
-        }
-        
-        for activity in self.enriched_activities:
-            pace = self.calculate_pace(activity)
-            weather = self.extract_weather(activity)
-            
-            if pace and weather and 'temperature' in weather:
-                temp = weather['temperature']
-                
-                if temp < 5:
-                    temp_ranges['cold_below_5'].append(pace)
-                elif temp < 15:
-                    temp_ranges['cool_5_to_15'].append(pace)
-                elif temp < 22:
-                    temp_ranges['ideal_15_to_22'].append(pace)
-                elif temp < 28:
-                    temp_ranges['warm_22_to_28'].append(pace)
-                else:
-                    temp_ranges['hot_above_28'].append(pace)
-        
-        result = {}
-        for range_name, paces in temp_ranges.items():
-            if paces:
-                result[range_name] = {
-                    'avg_pace': round(mean(paces), 2),
-                    'count': len(paces),
-                    'best_pace': round(min(paces), 2),
-                }
-        
-        return result
-    
-    def find_best_conditions(self):
-        """Find the weather conditions where you perform best"""
-        performance_by_condition = self.analyze_performance_by_condition()
-        
-        if not performance_by_condition:
-            return None
-        
-        best_condition = min(
-            performance_by_condition.items(),
-            key=lambda x: x[1]['avg_pace']
-        )
-        
-        return {
-            'condition': best_condition[0],
-            'avg_pace': best_condition[1]['avg_pace'],
-            'count': best_condition[1]['count'],
-            'insight': f"🏃 Você corre melhor em dias {best_condition[0]}! "
-                      f"Pace médio: {best_condition[1]['avg_pace']:.2f} min/km"
-        }
-    
-    def find_wind_impact(self):
-        """Analyze impact of wind on performance"""
-        low_wind = []
-        high_wind = []
-        
-        for activity in self.enriched_activities:
-            pace = self.calculate_pace(activity)
-            weather = self.extract_weather(activity)
-            
-            if pace and weather and 'wind_speed' in weather:
-                wind = weather['wind_speed']
-                if wind < 5:
-                    low_wind.append(pace)
-                elif wind > 10:
-                    high_wind.append(pace)
-        
-        if low_wind and high_wind:
-            avg_low = mean(low_wind)
-            avg_high = mean(high_wind)
-            difference = ((avg_high - avg_low) / avg_low) * 100
-            
-            return {
-                'avg_pace_low_wind': round(avg_low, 2),
-                'avg_pace_high_wind': round(avg_high, 2),
-                'impact_percent': round(difference, 1),
-                'insight': f"💨 Vento reduz seu pace em ~{difference:.1f}% (comparado a dias com pouco vento)"
-            }
-        
-        return None
-    
-    def generate_summary_insights(self):
-        """Generate a summary of all insights"""
-        insights = []
-        
-        # Best condition
-        best_cond = self.find_best_conditions()
-        if best_cond:
-            insights.append(best_cond['insight'])
-        
-        # Wind impact
-        wind_impact = self.find_wind_impact()
-        if wind_impact:
-            insights.append(wind_impact['insight'])
-        
-        # Activity count
-        if self.enriched_activities:
-            insights.append(f"📊 Total de atividades analisadas: {len(self.enriched_activities)}")
-        
-        return insights
-    
-    def process(self):
-        """Process all activities and enrich with weather and insights"""
-        for activity in self.activities:
-            enriched = dict(activity)
-            
-            # Add weather info
-            weather = self.extract_weather(activity)
-            if weather:
-                enriched['weather_data'] = weather
-                enriched['weather_condition'] = self.get_activity_conditions(activity)
-            
-            # Add pace calculation
-            pace = self.calculate_pace(activity)
-            if pace:
-                enriched['pace_min_per_km'] = round(pace, 2)
-            
-            self.enriched_activities.append(enriched)
-        
-        return self.enriched_activities
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the pooled HTTP client, the weather cache and the insights process pool"""
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        ),
+        timeout=10.0,
+    )
+    app.state.weather_cache = (
+        WeatherCache(WEATHER_CACHE_PATH, cell_deg=WEATHER_CACHE_CELL_DEG)
+        if WEATHER_CACHE_PATH else None
+    )
+    # spawn: workers only import insights.py and never inherit the event
+    # loop, sockets or the SQLite connection
+    app.state.insights_pool = (
+        ProcessPoolExecutor(max_workers=INSIGHTS_WORKERS,
+                            mp_context=multiprocessing.get_context("spawn"))
+        if INSIGHTS_WORKERS > 0 else None
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        if app.state.weather_cache is not None:
+            app.state.weather_cache.close()
+        if app.state.insights_pool is not None:
+            app.state.insights_pool.shutdown(cancel_futures=True)
+
 
+app = FastAPI(title="Strava Insights API", version="1.0.0", lifespan=lifespan)
 
-async def fetch_weather_for_activity(client, activity):
-    """Async helper to fetch weather for a single activity"""
-    item = dict(activity)
-    latlng = activity.get("start_latlng")
+# Concurrent /enrich and /insights requests share one backend fetch
+backend_fetches = AsyncSingleFlight()
+enrichments = AsyncSingleFlight()
 
-    if latlng and len(latlng) >= 2 and OPENWEATHER_KEY:
-        lat, lon = latlng[0], latlng[1]
-        ts = activity.get("start_date")
-        try:
-            dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-            unix = int(dt.timestamp())
-            ow_url = f"https://api.openweathermap.org/data/2.5/onecall/timemachine?lat={lat}&lon={lon}&dt={unix}&appid={OPENWEATHER_KEY}&units=metric"
+# The export payload, plus enrichment and insights derived from it keyed by
+# the payload's content hash, so a dashboard hitting both endpoints does
+# one backend fetch and one enrichment pass
+export_cache = TTLCache(ttl=EXPORT_CACHE_TTL, maxsize=1)
+enrichment_cache = TTLCache(ttl=ENRICH_CACHE_TTL, maxsize=16)
+insights_cache = TTLCache(ttl=ENRICH_CACHE_TTL, maxsize=16)
 
-            resp = await client.get(ow_url, timeout=5.0)
-            if resp.status_code == 200:
-                item['weather'] = resp.json()
-        except Exception as e:
-            logger.warning(f"Failed to fetch weather: {e}")
-            item['weather_error'] = str(e)
+# activity id -> (fingerprint of the raw activity, enriched activity)
+activity_cache = TTLCache(ttl=ENRICH_CACHE_TTL, maxsize=ACTIVITY_CACHE_MAX)
+
+# Cumulative weather counters and progress of the running enrichment
+weather_stats = EnrichmentStats()
+enrichment_progress = {"done": 0, "total": 0}
+
+
+class EnrichmentPass:
+    """
+    Activities of one in-flight enrichment pass, in completion order.
+
+    The pass itself runs once per export (the enrichments single-flight);
+    every streaming request follows it, replaying what is already done and
+    then waiting for the rest.
+    """
+
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def publish(self, item):
+        self.items.append(item)
+        self._wake()
+
+    def finish(self):
+        self.finished = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[Dict[str, Any]]:
+        """Every item of the pass, from the first, until it finishes"""
+        seen = 0
+        while True:
+            while seen < len(self.items):
+                yield self.items[seen]
+                seen += 1
+            if self.finished:
+                return
+            await self._changed.wait()
+
+
+# export digest -> the pass enriching it
+enrichment_passes: Dict[str, EnrichmentPass] = {}
+
+
+class ActivitiesPayload(BaseModel):
+    """
+    Body of POST /enrich and POST /insights.
+
+    activities are full Strava activities; ids reference activities the
+    server enriched before (delta requests), so unchanged ones need not be
+    uploaded again.
+    """
+    activities: List[Dict[str, Any]] = []
+    ids: List[int] = []
+
+
+def http_client() -> httpx.AsyncClient:
+    """The pooled client opened in lifespan (reused by backend and weather calls)"""
+    return app.state.http
+
+
+async def _fetch_backend_export_once():
+    r = await http_client().get(f"{BACKEND_URL}/activities/export", timeout=10.0)
+
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail="Failed to fetch activities from backend")
+
+    export = (hashlib.sha256(r.content).hexdigest(), r.json())
+    export_cache.set("activities/export", export)
+    return export
+
+
+async def fetch_backend_export():
+    """
+    Fetch exported activities from the Java backend.
+
+    Returns (content hash, activities). The payload is cached for
+    EXPORT_CACHE_TTL seconds and concurrent misses share one fetch.
+    """
+    export = export_cache.get("activities/export")
+    if export is not None:
+        return export
+    return await backend_fetches.do("activities/export", _fetch_backend_export_once)
+
+
+async def fetch_backend_activities():
+    """Fetch exported activities from the Java backend (cached, coalesced)"""
+    _, activities = await fetch_backend_export()
+    return activities
+
+
+def _update_progress(done, total):
+    enrichment_progress["done"], enrichment_progress["total"] = done, total
+
+
+def _weather_options():
+    """Keyword arguments shared by batch and streaming enrichment"""
+    return dict(
+        concurrency=WEATHER_CONCURRENCY,
+        max_retries=WEATHER_MAX_RETRIES,
+        backoff=WEATHER_BACKOFF,
+        max_retry_delay=WEATHER_MAX_RETRY_DELAY,
+        on_progress=_update_progress,
+        stats=weather_stats,
+        cache=app.state.weather_cache,
+    )
 
-    return item
 
 async def enrich_activities_data(activities):
-    """Enrich a list of activities with weather data concurrently"""
-    async with httpx.AsyncClient() as client:
-        tasks = [fetch_weather_for_activity(client, a) for a in activities]
-        return await asyncio.gather(*tasks)
+    """Enrich a list of activities with weather data (at most WEATHER_CONCURRENCY requests at a time)"""
+    return await enrich_with_weather(http_client(), activities, OPENWEATHER_KEY, **_weather_options())
+
+
+def fingerprint(activity):
+    """Content hash of a raw activity, to tell whether a cached enrichment still applies"""
+    return hashlib.sha1(json.dumps(activity, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def remember_enriched(activity, enriched):
+    """
+    Keep an enriched activity for later POST requests that reference its id.
+
+    Failed lookups (weather_error) are not kept, so the next request
+    retries them.
+    """
+    if activity.get('id') is None:
+        return
+    if is_enriched(enriched) or not has_location(enriched):
+        activity_cache.set(activity['id'], (fingerprint(activity), enriched))
+
+
+def is_enriched(activity):
+    return 'weather' in activity
+
+
+def all_enriched(activities):
+    """
+    No weather lookup failed, so the result may be cached per export.
+
+    A pass with failures (429, 5xx, timeouts) is served once and redone by
+    the next request.
+    """
+    return not any('weather_error' in activity for activity in activities)
+
+
+def has_location(activity):
+    """Whether there is a start position to look weather up for"""
+    latlng = activity.get('start_latlng')
+    return bool(latlng and len(latlng) >= 2)
+
+
+def resolve_payload(payload: ActivitiesPayload):
+    """
+    Split a POSTed payload into what is already enriched and what is not.
+
+    Returns (resolved, pending, missing): resolved holds the enriched
+    activity or None per slot (full activities first, then ids), pending
+    lists (slot, raw activity) that still need weather, and missing the ids
+    the server does not know. A weather_error from an earlier pass is
+    dropped and the activity looked up again.
+    """
+    resolved, pending, missing = [], [], []
+    for activity in payload.activities:
+        if 'weather_error' in activity:
+            activity = {k: v for k, v in activity.items() if k != 'weather_error'}
+        cached = activity_cache.get(activity.get('id')) if activity.get('id') is not None else None
+        if is_enriched(activity):
+            resolved.append(activity)
+        elif cached is not None and cached[0] == fingerprint(activity):
+            resolved.append(cached[1])
+        else:
+            pending.append((len(resolved), activity))
+            resolved.append(None)
+    for activity_id in payload.ids:
+        cached = activity_cache.get(activity_id)
+        if cached is None:
+            missing.append(activity_id)
+        else:
+            resolved.append(cached[1])
+    return resolved, pending, missing
+
+
+async def enrich_payload(payload: ActivitiesPayload):
+    """Enrich only the POSTed activities that are not cached; returns (activities, missing ids)"""
+    resolved, pending, missing = resolve_payload(payload)
+    if pending:
+        enriched = await enrich_activities_data([activity for _, activity in pending])
+        for (slot, activity), item in zip(pending, enriched):
+            remember_enriched(activity, item)
+            resolved[slot] = item
+    return [item for item in resolved if item is not None], missing
+
+
+async def stream_payload_ndjson(resolved, pending):
+    """NDJSON: cached activities at once, then the rest as their weather arrives"""
+    for item in resolved:
+        if item is not None:
+            yield json.dumps(item) + "\n"
+    async for index, item in iter_enriched_with_weather(
+            http_client(), [activity for _, activity in pending], OPENWEATHER_KEY, **_weather_options()):
+        remember_enriched(pending[index][1], item)
+        yield json.dumps(item) + "\n"
+
+
+async def build_columns(activities):
+    """Flatten activities for the process pool, yielding to the loop between slices"""
+    columns = empty_columns()
+    for start in range(0, len(activities), COLUMN_SLICE):
+        append_columns(columns, activities[start:start + COLUMN_SLICE])
+        await asyncio.sleep(0)
+    return columns
+
+
+async def compute_insights(activities):
+    """
+    The /insights report for enriched activities.
+
+    Large histories are analysed in the process pool so the event loop keeps
+    serving other requests meanwhile; small ones (or INSIGHTS_WORKERS=0)
+    inline, where the hand-off would cost more than the analysis.
+    """
+    pool = getattr(app.state, "insights_pool", None)
+    if pool is None or len(activities) < INSIGHTS_POOL_MIN:
+        return StravaInsights(activities).report()
+    columns = await build_columns(activities)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, report_from_columns, columns)
+    except BrokenProcessPool:
+        logger.error("Insights process pool is broken; analysing on the event loop")
+        return report_from_columns(columns)
+
+
+def _end_pass(digest, run):
+    run.finish()
+    if enrichment_passes.get(digest) is run:
+        del enrichment_passes[digest]
+
+
+async def _enrich_export_once(digest, activities, run):
+    try:
+        results = [None] * len(activities)
+        async for index, item in iter_enriched_with_weather(
+                http_client(), activities, OPENWEATHER_KEY, **_weather_options()):
+            results[index] = item
+            remember_enriched(activities[index], item)
+            run.publish(item)
+        if all_enriched(results):
+            enrichment_cache.set(digest, results)
+        return results
+    finally:
+        _end_pass(digest, run)
+
+
+def join_enrichment(digest, activities) -> Tuple[EnrichmentPass, "asyncio.Future"]:
+    """
+    Start the enrichment pass of an export, or join the one in flight.
+
+    Returns the pass (for streaming) and a future of the enriched
+    activities in input order. A pass that has just ended hands over only
+    the future: its follow() finishes without items.
+    """
+    run = enrichment_passes.get(digest)
+    if run is None:
+        run = enrichment_passes[digest] = EnrichmentPass()
+    future = asyncio.ensure_future(
+        enrichments.do(digest, lambda: _enrich_export_once(digest, activities, run))
+    )
+    # Ends a pass created after the shared call had already finished
+    future.add_done_callback(lambda f: f.cancelled() or _end_pass(digest, run))
+    return run, future
+
+
+async def enrich_export(digest, activities):
+    """Enrichment of one export payload, cached by its content hash"""
+    enriched = enrichment_cache.get(digest)
+    if enriched is not None:
+        return enriched
+    _, future = join_enrichment(digest, activities)
+    return await future
+
+
+async def stream_enriched_ndjson(digest, activities):
+    """
+    One enriched activity per NDJSON line, written as soon as its weather arrives.
+
+    Lines come in completion order, not input order. A cached enrichment is
+    replayed at once; otherwise the stream follows the same pass as
+    concurrent /enrich and /insights requests, which caches it when done.
+    """
+    enriched = enrichment_cache.get(digest)
+    if enriched is not None:
+        for item in enriched:
+            yield json.dumps(item) + "\n"
+        return
+
+    run, future = join_enrichment(digest, activities)
+    streamed = 0
+    async for item in run.follow():
+        streamed += 1
+        yield json.dumps(item) + "\n"
+    enriched = await future
+    if not streamed:
+        for item in enriched:
+            yield json.dumps(item) + "\n"
 
 
 @app.get("/")
@@ -268,8 +408,10 @@ def root():
         "name": "Strava Insights API",
         "version": "1.0.0",
         "endpoints": {
-            "/enrich": "Get enriched activities with weather and insights",
+            "/enrich": "Get enriched activities with weather and insights (?stream=true for NDJSON)",
             "/insights": "Get AI-generated insights about your performance",
+            "POST /enrich": "Enrich the posted activities (ids for already-enriched ones)",
+            "POST /insights": "Insights for the posted activities",
             "/health": "Health check"
         }
     }
@@ -278,30 +420,60 @@ def root():
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    weather_cache = getattr(app.state, "weather_cache", None)
+    return {
+        "status": "healthy",
+        "backend_fetches": {
+            "in_flight": backend_fetches.in_flight(),
+            "coalesced": backend_fetches.coalesced,
+        },
+        "caches": {
+            "export": export_cache.stats(),
+            "enrichment": enrichment_cache.stats(),
+            "insights": insights_cache.stats(),
+            "activities": activity_cache.stats(),
+        },
+        "weather": {
+            "progress": enrichment_progress,
+            "requested": weather_stats.requested,
+            "succeeded": weather_stats.succeeded,
+            "failed": weather_stats.failed,
+            "rate_limited": weather_stats.rate_limited,
+            "retries": weather_stats.retries,
+            "served_from_cache": weather_stats.cached,
+            "cache": weather_cache.stats() if weather_cache else None,
+        },
+        "insights_pool": {
+            "workers": INSIGHTS_WORKERS if getattr(app.state, "insights_pool", None) else 0,
+            "min_activities": INSIGHTS_POOL_MIN,
+        },
+    }
 
 
 @app.get("/enrich")
-async def enrich_activities():
+async def enrich_activities(stream: bool = False):
     """
     Enrich activities with weather data and calculate performance metrics.
     Returns activities with weather info and pace calculations.
+
+    With ?stream=true the response is NDJSON (application/x-ndjson), one
+    activity per line as soon as its weather lookup finishes; the
+    X-Total-Count header carries the number of lines to expect.
     """
     try:
         # Fetch activities from Java backend
-        async with httpx.AsyncClient() as client:
-            r = await client.get(f"{BACKEND_URL}/activities/export", timeout=10.0)
-
-        if r.status_code != 200:
-            raise HTTPException(status_code=502, detail="Failed to fetch activities from backend")
-        
-        activities = r.json()
+        digest, activities = await fetch_backend_export()
         logger.info(f"Fetched {len(activities)} activities from backend")
         
-        # Enrich with weather concurrently
-        enriched = await enrich_activities_data(activities)
+        if stream:
+            return StreamingResponse(
+                stream_enriched_ndjson(digest, activities),
+                media_type="application/x-ndjson",
+                headers={"X-Total-Count": str(len(activities))},
+            )
         
-        return enriched
+        # Enrich with weather concurrently (reused across endpoints)
+        return await enrich_export(digest, activities)
     
     except Exception as e:
         logger.error(f"Error in /enrich: {e}")
@@ -316,33 +488,76 @@ async def get_insights():
     """
     try:
         # Fetch activities
-        async with httpx.AsyncClient() as client:
-            r = await client.get(f"{BACKEND_URL}/activities/export", timeout=10.0)
-
-        if r.status_code != 200:
-            raise HTTPException(status_code=502, detail="Failed to fetch activities from backend")
-        
-        activities = r.json()
+        digest, activities = await fetch_backend_export()
         logger.info(f"Analyzing {len(activities)} activities for insights")
 
-        # Enrich activities with weather concurrently
-        enriched = await enrich_activities_data(activities)
-        
-        # Create insights processor
-        processor = StravaInsights(activities) # Pass original activities, but we will overwrite
-        processor.activities = enriched
-        processor.process()
+        cached = insights_cache.get(digest)
+        if cached is not None:
+            return JSONResponse(content=cached)
+
+        # Enrich activities with weather concurrently (shared with /enrich)
+        enriched = await enrich_export(digest, activities)
         
-        # Generate insights
-        return JSONResponse(content={
-            "summary": processor.generate_summary_insights(),
-            "performance_by_condition": processor.analyze_performance_by_condition(),
-            "performance_by_temperature": processor.analyze_performance_by_temperature_range(),
-            "best_conditions": processor.find_best_conditions(),
-            "wind_impact": processor.find_wind_impact(),
-            "total_activities_analyzed": len(processor.enriched_activities),
-        })
+        # One pass over the enriched activities, off the event loop for large histories
+        insights = await compute_insights(enriched)
+        if all_enriched(enriched):
+            insights_cache.set(digest, insights)
+        return JSONResponse(content=insights)
     
     except Exception as e:
         logger.error(f"Error in /insights: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/enrich")
+async def enrich_posted_activities(payload: ActivitiesPayload, stream: bool = False):
+    """
+    Enrich the posted activities instead of re-downloading them from the backend.
+
+    Activities enriched before are served from cache: full activities whose
+    content did not change, and anything referenced in `ids`. Returns
+    {"activities": [...], "missing": [ids the server does not have]}; the
+    client resends those in full. With ?stream=true the activities come as
+    NDJSON (cached ones first) and the unknown ids in X-Missing-Ids.
+    """
+    try:
+        if stream:
+            resolved, pending, missing = resolve_payload(payload)
+            return StreamingResponse(
+                stream_payload_ndjson(resolved, pending),
+                media_type="application/x-ndjson",
+                headers={
+                    "X-Total-Count": str(len(resolved)),
+                    "X-Missing-Ids": ",".join(str(i) for i in missing),
+                },
+            )
+
+        activities, missing = await enrich_payload(payload)
+        logger.info(f"POST /enrich: {len(activities)} activities, {len(missing)} unknown ids")
+        return {"activities": activities, "missing": missing}
+
+    except Exception as e:
+        logger.error(f"Error in POST /enrich: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/insights")
+async def get_posted_insights(payload: ActivitiesPayload):
+    """
+    Insights for the posted activities (no backend round trip).
+
+    Already-enriched activities are analysed as sent; raw ones are enriched
+    first (cached by id). Unknown `ids` answer 409 with {"missing": [...]}
+    so the client can resend those activities in full.
+    """
+    try:
+        activities, missing = await enrich_payload(payload)
+    except Exception as e:
+        logger.error(f"Error in POST /insights: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if missing:
+        raise HTTPException(status_code=409, detail={"missing": missing})
+
+    logger.info(f"Analyzing {len(activities)} posted activities for insights")
+    return JSONResponse(content=await compute_insights(activities))
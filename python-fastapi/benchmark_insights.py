@@ -0,0 +1,310 @@
+"""
+Benchmark: /insights reports, previous multi-pass StravaInsights vs single pass.
+
+LegacyStravaInsights below is the implementation before the single-pass
+analyzer (each report re-walked every activity, recomputing pace and
+weather). Both produce the same /insights payload; this script checks that
+and times them on synthetic enriched activities.
+
+Usage:
+    python benchmark_insights.py [--sizes 10000 100000]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from statistics import mean, median
+
+from app import StravaInsights
+
+
+class LegacyStravaInsights:
+    """Generate intelligent insights from Strava activities and weather data"""
+    
+    def __init__(self, activities):
+        self.activities = activities
+        self.enriched_activities = []
+    
+    def extract_weather(self, activity):
+        """Extract weather data from activity if available"""
+        weather = activity.get('weather', {})
+        if isinstance(weather, dict) and 'current' in weather:
+            return {
+                'temperature': weather['current'].get('temp'),
+                'humidity': weather['current'].get('humidity'),
+                'wind_speed': weather['current'].get('wind_speed'),
+                'clouds': weather['current'].get('clouds'),
+                'weather_main': weather['current'].get('weather', [{}])[0].get('main'),
+                'feels_like': weather['current'].get('feels_like'),
+                'pressure': weather['current'].get('pressure'),
+            }
+        return None
+    
+    def calculate_pace(self, activity):
+        """Calculate pace in min/km or min/mile"""
+        distance = activity.get('distance', 0)  # meters
+        moving_time = activity.get('moving_time', 1)  # seconds
+        
+        if distance <= 0 or moving_time <= 0:
+            return None
+        
+        km = distance / 1000
+        minutes = moving_time / 60
+        pace_min_per_km = minutes / km if km > 0 else None
+        return pace_min_per_km
+    
+    def calculate_heart_rate_avg(self, activity):
+        """Extract average heart rate if available"""
+        return activity.get('average_heartrate')
+    
+    def get_activity_conditions(self, activity):
+        """Classify activity weather conditions"""
+        weather = self.extract_weather(activity)
+        if not weather:
+            return "unknown"
+        
+        temp = weather.get('temperature', 0)
+        humidity = weather.get('humidity', 50)
+        wind = weather.get('wind_speed', 0)
+        
+        if temp < 5:
+            return "cold"
+        elif temp < 15:
+            return "cool"
+        elif temp < 22:
+            return "ideal"
+        elif temp < 28:
+            return "warm"
+        else:
+            return "hot"
+    
+    def analyze_performance_by_condition(self):
+        """Analyze performance metrics grouped by weather conditions"""
+        conditions_stats = defaultdict(list)
+        
+        for activity in self.enriched_activities:
+            pace = self.calculate_pace(activity)
+            condition = activity.get('weather_condition', 'unknown')
+            
+            if pace and condition != 'unknown':
+                conditions_stats[condition].append(pace)
+        
+        result = {}
+        for condition, paces in conditions_stats.items():
+            if paces:
+                result[condition] = {
+                    'avg_pace': round(mean(paces), 2),
+                    'median_pace': round(median(paces), 2),
+                    'count': len(paces),
+                    'best_pace': round(min(paces), 2),
+                    'worst_pace': round(max(paces), 2),
+                }
+        
+        return result
+    
+    def analyze_performance_by_temperature_range(self):
+        """Analyze performance by temperature ranges"""
+        temp_ranges = {
+            'cold_below_5': [],
+            'cool_5_to_15': [],
+            'ideal_15_to_22': [],
+            'warm_22_to_28': [],
+            'hot_above_28': []
+        }
+        
+        for activity in self.enriched_activities:
+            pace = self.calculate_pace(activity)
+            weather = self.extract_weather(activity)
+            
+            if pace and weather and 'temperature' in weather:
+                temp = weather['temperature']
+                
+                if temp < 5:
+                    temp_ranges['cold_below_5'].append(pace)
+                elif temp < 15:
+                    temp_ranges['cool_5_to_15'].append(pace)
+                elif temp < 22:
+                    temp_ranges['ideal_15_to_22'].append(pace)
+                elif temp < 28:
+                    temp_ranges['warm_22_to_28'].append(pace)
+                else:
+                    temp_ranges['hot_above_28'].append(pace)
+        
+        result = {}
+        for range_name, paces in temp_ranges.items():
+            if paces:
+                result[range_name] = {
+                    'avg_pace': round(mean(paces), 2),
+                    'count': len(paces),
+                    'best_pace': round(min(paces), 2),
+                }
+        
+        return result
+    
+    def find_best_conditions(self):
+        """Find the weather conditions where you perform best"""
+        performance_by_condition = self.analyze_performance_by_condition()
+        
+        if not performance_by_condition:
+            return None
+        
+        best_condition = min(
+            performance_by_condition.items(),
+            key=lambda x: x[1]['avg_pace']
+        )
+        
+        return {
+            'condition': best_condition[0],
+            'avg_pace': best_condition[1]['avg_pace'],
+            'count': best_condition[1]['count'],
+            'insight': f"🏃 Você corre melhor em dias {best_condition[0]}! "
+                      f"Pace médio: {best_condition[1]['avg_pace']:.2f} min/km"
+        }
+    
+    def find_wind_impact(self):
+        """Analyze impact of wind on performance"""
+        low_wind = []
+        high_wind = []
+        
+        for activity in self.enriched_activities:
+            pace = self.calculate_pace(activity)
+            weather = self.extract_weather(activity)
+            
+            if pace and weather and 'wind_speed' in weather:
+                wind = weather['wind_speed']
+                if wind < 5:
+                    low_wind.append(pace)
+                elif wind > 10:
+                    high_wind.append(pace)
+        
+        if low_wind and high_wind:
+            avg_low = mean(low_wind)
+            avg_high = mean(high_wind)
+            difference = ((avg_high - avg_low) / avg_low) * 100
+            
+            return {
+                'avg_pace_low_wind': round(avg_low, 2),
+                'avg_pace_high_wind': round(avg_high, 2),
+                'impact_percent': round(difference, 1),
+                'insight': f"💨 Vento reduz seu pace em ~{difference:.1f}% (comparado a dias com pouco vento)"
+            }
+        
+        return None
+    
+    def generate_summary_insights(self):
+        """Generate a summary of all insights"""
+        insights = []
+        
+        # Best condition
+        best_cond = self.find_best_conditions()
+        if best_cond:
+            insights.append(best_cond['insight'])
+        
+        # Wind impact
+        wind_impact = self.find_wind_impact()
+        if wind_impact:
+            insights.append(wind_impact['insight'])
+        
+        # Activity count
+        if self.enriched_activities:
+            insights.append(f"📊 Total de atividades analisadas: {len(self.enriched_activities)}")
+        
+        return insights
+    
+    def process(self, copy=True):
+        """
+        Process all activities and enrich with weather and insights.
+
+        With copy=False the activities are annotated in place; only use it
+        when the caller owns them (not for cached enrichment results).
+        """
+        for activity in self.activities:
+            enriched = dict(activity) if copy else activity
+            
+            # Add weather info
+            weather = self.extract_weather(activity)
+            if weather:
+                enriched['weather_data'] = weather
+                enriched['weather_condition'] = self.get_activity_conditions(activity)
+            
+            # Add pace calculation
+            pace = self.calculate_pace(activity)
+            if pace:
+                enriched['pace_min_per_km'] = round(pace, 2)
+            
+            self.enriched_activities.append(enriched)
+        
+        return self.enriched_activities
+
+
+def legacy_report(activities):
+    processor = LegacyStravaInsights(activities)
+    processor.process()
+    return {
+        "summary": processor.generate_summary_insights(),
+        "performance_by_condition": processor.analyze_performance_by_condition(),
+        "performance_by_temperature": processor.analyze_performance_by_temperature_range(),
+        "best_conditions": processor.find_best_conditions(),
+        "wind_impact": processor.find_wind_impact(),
+        "total_activities_analyzed": len(processor.enriched_activities),
+    }
+
+
+def single_pass_report(activities):
+    return StravaInsights(activities).report()
+
+
+def synthetic_enriched(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    activities = []
+    for i in range(count):
+        activity = {
+            "id": i,
+            "name": f"Atividade {i}",
+            "type": "Run",
+            "distance": rng.choice([0, rng.uniform(1000, 42000)]) if rng.random() < 0.02 else rng.uniform(1000, 42000),
+            "moving_time": rng.randint(300, 14400),
+            "start_date": "2025-06-01T06:30:00Z",
+            "start_latlng": [-23.55, -46.63],
+        }
+        if rng.random() < 0.9:
+            activity["weather"] = {"current": {
+                "temp": rng.uniform(-5, 38),
+                "humidity": rng.randint(20, 100),
+                "wind_speed": rng.uniform(0, 18),
+                "clouds": rng.randint(0, 100),
+                "weather": [{"main": rng.choice(["Clear", "Clouds", "Rain"])}],
+                "feels_like": rng.uniform(-8, 42),
+                "pressure": rng.randint(990, 1030),
+            }}
+        activities.append(activity)
+    return activities
+
+
+def _best_of(fn, activities, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(activities)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"\n{'activities':>11} {'multi-pass':>12} {'single pass':>12} {'speedup':>9}")
+    for size in args.sizes:
+        activities = synthetic_enriched(size)
+        assert legacy_report(activities) == single_pass_report(activities)
+        before = _best_of(legacy_report, activities, args.repeat)
+        after = _best_of(single_pass_report, activities, args.repeat)
+        print(f"{size:>11} {before:>10.1f}ms {after:>10.1f}ms {before / after:>8.1f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: /health latency while /insights computations run.
+
+Serves the app in-process (httpx ASGI transport, one event loop, like a
+single uvicorn worker) and polls /health every --interval seconds while
+--concurrent /insights reports over --activities enriched activities are
+computed, first inline on the event loop (INSIGHTS_WORKERS=0), then in the
+process pool. Latency is measured from each poll's scheduled time, so a
+blocked loop shows up as late requests instead of fewer samples. Also
+checks the pool returns the same payload as the inline analysis.
+
+Usage:
+    python benchmark_insights_pool.py [--activities 100000] [--concurrent 4] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import median
+
+os.environ.setdefault("WEATHER_CACHE_PATH", "")
+
+import logging
+import multiprocessing
+
+import httpx
+
+import app as insights_app
+from benchmark_insights import synthetic_enriched
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run(activities, concurrent: int, interval: float):
+    latencies = []
+    transport = httpx.ASGITransport(app=insights_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+
+        async def poll_health():
+            scheduled = time.perf_counter()
+            while not stop.is_set():
+                (await client.get("/health")).raise_for_status()
+                latencies.append(time.perf_counter() - scheduled)
+                scheduled += interval
+                await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+
+        poller = asyncio.ensure_future(poll_health())
+        await asyncio.sleep(0.2)  # baseline samples before the load starts
+        start = time.perf_counter()
+        reports = await asyncio.gather(*(insights_app.compute_insights(activities)
+                                         for _ in range(concurrent)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+    return elapsed, latencies, reports[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=100000)
+    parser.add_argument("--concurrent", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    activities = synthetic_enriched(args.activities)
+    print(f"\n{args.concurrent} concurrent /insights over {args.activities} activities, "
+          f"/health polled every {args.interval * 1000:.0f}ms ({os.cpu_count()} CPUs)\n")
+    print(f"{'mode':>10} {'insights':>9} {'health p50':>11} {'p95':>8} {'max':>8} {'samples':>8}")
+
+    expected = insights_app.StravaInsights(activities).report()
+    for label, workers in (("inline", 0), (f"pool x{args.workers}", args.workers)):
+        pool = (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                if workers else None)
+        insights_app.app.state.insights_pool = pool
+        try:
+            if pool is not None:
+                # Start the workers outside the measurement
+                list(pool.map(abs, range(workers)))
+            elapsed, latencies, report = asyncio.run(run(activities, args.concurrent, args.interval))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        assert report == expected, f"{label}: report differs from the inline analysis"
+        print(f"{label:>10} {elapsed:>8.2f}s {median(latencies) * 1000:>9.1f}ms "
+              f"{_percentile(latencies, 0.95) * 1000:>6.1f}ms {max(latencies) * 1000:>6.1f}ms "
+              f"{len(latencies):>8}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
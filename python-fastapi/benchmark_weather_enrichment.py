@@ -0,0 +1,158 @@
+"""
+Benchmark: weather enrichment throughput and error rate by concurrency.
+
+Runs weather.iter_enriched_with_weather against a local fake OpenWeather server
+that adds latency and answers 429 once more than --server-concurrency
+requests are in flight or more than --server-rps arrive in one second.
+The "unbounded" row reproduces the old one-task-per-activity gather
+(no limit, no retries). "1st row" is the time until the first enriched
+activity is available, i.e. the time-to-first-line of /enrich?stream=true.
+
+Usage:
+    python benchmark_weather_enrichment.py [--activities 3000] [--levels 5 10 20 50]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from weather import EnrichmentStats, iter_enriched_with_weather
+
+
+class FakeWeatherServer:
+    """Threaded HTTP server with latency, a concurrency cap and a per-second quota"""
+
+    def __init__(self, latency: float, max_concurrent: int, rps: int):
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.rps = rps
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._window = 0
+        self._window_count = 0
+        self.requests = 0
+        self.rejected = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/timemachine"
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._window_count = window, 0
+            if self._in_flight >= self.max_concurrent or self._window_count >= self.rps:
+                self.rejected += 1
+                return False
+            self._in_flight += 1
+            self._window_count += 1
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def __enter__(self) -> "FakeWeatherServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if fake._admit():
+                    try:
+                        time.sleep(fake.latency)
+                        status, payload = 200, {"current": {"temp": 21.5, "humidity": 60,
+                                                            "wind_speed": 3.2,
+                                                            "weather": [{"main": "Clear"}]}}
+                    finally:
+                        fake._release()
+                else:
+                    status, payload = 429, {"cod": 429, "message": "Too many requests"}
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 1024
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def synthetic_activities(count: int):
+    return [{
+        "id": i,
+        "start_latlng": [-23.55 + i * 1e-4, -46.63],
+        "start_date": "2025-06-01T06:30:00Z",
+    } for i in range(count)]
+
+
+async def run(url: str, activities, concurrency: int, max_retries: int, backoff: float):
+    stats = EnrichmentStats()
+    limits = httpx.Limits(max_connections=max(concurrency, 1), max_keepalive_connections=max(concurrency, 1))
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        start = time.perf_counter()
+        first_row = None
+        enriched = 0
+        async for _, item in iter_enriched_with_weather(client, activities, "bench",
+                                                        concurrency=concurrency, url=url,
+                                                        max_retries=max_retries, backoff=backoff,
+                                                        stats=stats):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            enriched += "weather" in item
+        elapsed = time.perf_counter() - start
+    return elapsed, first_row, enriched, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=3000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[5, 10, 20, 50, 100])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--server-concurrency", type=int, default=50)
+    parser.add_argument("--server-rps", type=int, default=1000)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.2)
+    args = parser.parse_args()
+
+    activities = synthetic_activities(args.activities)
+    print(f"\n{args.activities} activities, fake server: {args.latency * 1000:.0f}ms latency, "
+          f"max {args.server_concurrency} concurrent, {args.server_rps} req/s\n")
+    print(f"{'concurrency':>12} {'time':>8} {'1st row':>8} {'act/s':>8} {'enriched':>9} {'errors':>7} "
+          f"{'err %':>6} {'429s':>6} {'retries':>8}")
+
+    scenarios = [("unbounded", args.activities, 0)] + [(str(n), n, args.retries) for n in args.levels]
+    for label, concurrency, retries in scenarios:
+        with FakeWeatherServer(args.latency, args.server_concurrency, args.server_rps) as server:
+            elapsed, first_row, enriched, stats = asyncio.run(
+                run(server.url, activities, concurrency, retries, args.backoff))
+        errors = args.activities - enriched
+        print(f"{label:>12} {elapsed:>7.2f}s {first_row * 1000:>6.0f}ms {args.activities / elapsed:>8.0f} {enriched:>9} "
+              f"{errors:>7} {100 * errors / args.activities:>5.1f}% {stats.rate_limited:>6} "
+              f"{stats.retries:>8}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
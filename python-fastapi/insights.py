@@ -0,0 +1,353 @@
+"""
+Weather/performance insights over enriched Strava activities.
+
+StravaInsights derives every /insights report from one pass over the
+activities. For large histories the app runs that pass in a process pool:
+to_columns() flattens the activities into a few float arrays (cheap to
+pickle, unlike nested dicts) and report_from_columns() is the function the
+worker processes execute.
+"""
+from array import array
+from statistics import mean, median
+
+NAN = float('nan')
+
+# Activities flattened per slice before yielding to the event loop
+COLUMN_SLICE = 1000
+
+
+def pace_min_per_km(distance, moving_time):
+    """Pace in min/km from meters and seconds (None when not computable)"""
+    if not (distance > 0 and moving_time > 0):
+        return None
+    return (moving_time / 60) / (distance / 1000)
+
+
+def _number(value):
+    return NAN if value is None else float(value)
+
+
+def empty_columns():
+    return {
+        'distance': array('d'),
+        'moving_time': array('d'),
+        'temperature': array('d'),
+        'wind_speed': array('d'),
+        # None when the activity has weather (condition is derived from the
+        # temperature), else its stored weather_condition
+        'condition': [],
+    }
+
+
+def append_columns(columns, activities):
+    """Flatten activities into columns (only the fields the analysis reads)"""
+    distance, moving_time = columns['distance'], columns['moving_time']
+    temperature, wind_speed = columns['temperature'], columns['wind_speed']
+    condition = columns['condition']
+    for activity in activities:
+        distance.append(_number(activity.get('distance', 0)))
+        moving_time.append(_number(activity.get('moving_time', 1)))
+        weather = activity.get('weather')
+        current = weather.get('current') if isinstance(weather, dict) else None
+        if isinstance(current, dict):
+            temperature.append(_number(current.get('temp')))
+            wind_speed.append(_number(current.get('wind_speed')))
+            condition.append(None)
+        else:
+            temperature.append(NAN)
+            wind_speed.append(NAN)
+            condition.append(activity.get('weather_condition', 'unknown'))
+    return columns
+
+
+def to_columns(activities):
+    return append_columns(empty_columns(), activities)
+
+
+def report_from_columns(columns):
+    """Process-pool entry point: the /insights payload for flattened activities"""
+    return StravaInsights.from_columns(columns).report()
+
+
+# (report key, exclusive upper bound in °C); the last range is open-ended
+TEMPERATURE_RANGES = (
+    ('cold_below_5', 5),
+    ('cool_5_to_15', 15),
+    ('ideal_15_to_22', 22),
+    ('warm_22_to_28', 28),
+    ('hot_above_28', None),
+)
+
+
+class StravaInsights:
+    """
+    Generate intelligent insights from Strava activities and weather data.
+
+    Pace, weather and condition are computed once per activity in a single
+    pass (analyze() or process()), which fills per-condition, temperature
+    and wind accumulators; every report is then derived from those.
+    """
+    
+    def __init__(self, activities):
+        self.activities = activities
+        self.enriched_activities = []
+        self._reset()
+    
+    def _reset(self):
+        self._analyzed = False
+        self._count = 0
+        self._condition_paces = {}
+        self._temperature_paces = {name: [] for name, _ in TEMPERATURE_RANGES}
+        self._low_wind = []
+        self._high_wind = []
+        self._by_condition = None
+    
+    def extract_weather(self, activity):
+        """Extract weather data from activity if available"""
+        weather = activity.get('weather', {})
+        if isinstance(weather, dict) and 'current' in weather:
+            return {
+                'temperature': weather['current'].get('temp'),
+                'humidity': weather['current'].get('humidity'),
+                'wind_speed': weather['current'].get('wind_speed'),
+                'clouds': weather['current'].get('clouds'),
+                'weather_main': weather['current'].get('weather', [{}])[0].get('main'),
+                'feels_like': weather['current'].get('feels_like'),
+                'pressure': weather['current'].get('pressure'),
+            }
+        return None
+    
+    def calculate_pace(self, activity):
+        """Calculate pace in min/km or min/mile"""
+        distance = activity.get('distance', 0)  # meters
+        moving_time = activity.get('moving_time', 1)  # seconds
+        return pace_min_per_km(distance, moving_time)
+    
+    def calculate_heart_rate_avg(self, activity):
+        """Extract average heart rate if available"""
+        return activity.get('average_heartrate')
+    
+    def classify_weather(self, weather):
+        """Condition label for extracted weather"""
+        temp = weather.get('temperature', 0)
+        
+        if temp < 5:
+            return "cold"
+        elif temp < 15:
+            return "cool"
+        elif temp < 22:
+            return "ideal"
+        elif temp < 28:
+            return "warm"
+        else:
+            return "hot"
+    
+    def get_activity_conditions(self, activity):
+        """Classify activity weather conditions"""
+        weather = self.extract_weather(activity)
+        if not weather:
+            return "unknown"
+        return self.classify_weather(weather)
+    
+    def _observe(self, pace, weather, condition):
+        """Add one activity's pace to the condition, temperature and wind accumulators"""
+        if not pace:
+            return
+        
+        if condition != 'unknown':
+            self._condition_paces.setdefault(condition, []).append(pace)
+        
+        if weather and 'temperature' in weather:
+            temp = weather['temperature']
+            for name, upper in TEMPERATURE_RANGES:
+                if upper is None or temp < upper:
+                    self._temperature_paces[name].append(pace)
+                    break
+        
+        if weather and 'wind_speed' in weather:
+            wind = weather['wind_speed']
+            if wind < 5:
+                self._low_wind.append(pace)
+            elif wind > 10:
+                self._high_wind.append(pace)
+    
+    def analyze(self):
+        """
+        Single pass over the activities without building annotated copies.
+
+        Enough for every report; use process() when the annotated activities
+        themselves are needed.
+        """
+        if self._analyzed:
+            return self
+        self._reset()
+        for activity in self.activities:
+            weather = self.extract_weather(activity)
+            if weather:
+                condition = self.classify_weather(weather)
+            else:
+                condition = activity.get('weather_condition', 'unknown')
+            self._observe(self.calculate_pace(activity), weather, condition)
+        self._count = len(self.activities)
+        self._analyzed = True
+        return self
+    
+    def analyze_performance_by_condition(self):
+        """Analyze performance metrics grouped by weather conditions"""
+        self.analyze()
+        if self._by_condition is None:
+            self._by_condition = {
+                condition: {
+                    'avg_pace': round(mean(paces), 2),
+                    'median_pace': round(median(paces), 2),
+                    'count': len(paces),
+                    'best_pace': round(min(paces), 2),
+                    'worst_pace': round(max(paces), 2),
+                }
+                for condition, paces in self._condition_paces.items()
+            }
+        return self._by_condition
+    
+    def analyze_performance_by_temperature_range(self):
+        """Analyze performance by temperature ranges"""
+        self.analyze()
+        return {
+            range_name: {
+                'avg_pace': round(mean(paces), 2),
+                'count': len(paces),
+                'best_pace': round(min(paces), 2),
+            }
+            for range_name, paces in self._temperature_paces.items()
+            if paces
+        }
+    
+    def find_best_conditions(self):
+        """Find the weather conditions where you perform best"""
+        performance_by_condition = self.analyze_performance_by_condition()
+        
+        if not performance_by_condition:
+            return None
+        
+        best_condition = min(
+            performance_by_condition.items(),
+            key=lambda x: x[1]['avg_pace']
+        )
+        
+        return {
+            'condition': best_condition[0],
+            'avg_pace': best_condition[1]['avg_pace'],
+            'count': best_condition[1]['count'],
+            'insight': f"🏃 Você corre melhor em dias {best_condition[0]}! "
+                      f"Pace médio: {best_condition[1]['avg_pace']:.2f} min/km"
+        }
+    
+    def find_wind_impact(self):
+        """Analyze impact of wind on performance"""
+        self.analyze()
+        low_wind, high_wind = self._low_wind, self._high_wind
+        
+        if low_wind and high_wind:
+            avg_low = mean(low_wind)
+            avg_high = mean(high_wind)
+            difference = ((avg_high - avg_low) / avg_low) * 100
+            
+            return {
+                'avg_pace_low_wind': round(avg_low, 2),
+                'avg_pace_high_wind': round(avg_high, 2),
+                'impact_percent': round(difference, 1),
+                'insight': f"💨 Vento reduz seu pace em ~{difference:.1f}% (comparado a dias com pouco vento)"
+            }
+        
+        return None
+    
+    def generate_summary_insights(self, best_conditions=None, wind_impact=None):
+        """Generate a summary of all insights (reuses reports already computed by the caller)"""
+        insights = []
+        
+        # Best condition
+        best_cond = best_conditions if best_conditions is not None else self.find_best_conditions()
+        if best_cond:
+            insights.append(best_cond['insight'])
+        
+        # Wind impact
+        wind_impact = wind_impact if wind_impact is not None else self.find_wind_impact()
+        if wind_impact:
+            insights.append(wind_impact['insight'])
+        
+        # Activity count
+        if self._count:
+            insights.append(f"📊 Total de atividades analisadas: {self._count}")
+        
+        return insights
+    
+    def report(self):
+        """Every /insights report, derived from one pass over the activities"""
+        self.analyze()
+        best_conditions = self.find_best_conditions()
+        wind_impact = self.find_wind_impact()
+        return {
+            "summary": self.generate_summary_insights(best_conditions, wind_impact),
+            "performance_by_condition": self.analyze_performance_by_condition(),
+            "performance_by_temperature": self.analyze_performance_by_temperature_range(),
+            "best_conditions": best_conditions,
+            "wind_impact": wind_impact,
+            "total_activities_analyzed": self._count,
+        }
+    
+    def process(self, copy=True):
+        """
+        Process all activities and enrich with weather and insights.
+
+        Same single pass as analyze(), also building the annotated
+        activities. With copy=False they are annotated in place; only use
+        it when the caller owns them (not for cached enrichment results).
+        """
+        self._reset()
+        self.enriched_activities = []
+        for activity in self.activities:
+            enriched = dict(activity) if copy else activity
+            condition = activity.get('weather_condition', 'unknown')
+            
+            # Add weather info
+            weather = self.extract_weather(activity)
+            if weather:
+                condition = self.classify_weather(weather)
+                enriched['weather_data'] = weather
+                enriched['weather_condition'] = condition
+            
+            # Add pace calculation
+            pace = self.calculate_pace(activity)
+            if pace:
+                enriched['pace_min_per_km'] = round(pace, 2)
+            
+            self._observe(pace, weather, condition)
+            self.enriched_activities.append(enriched)
+        
+        self._count = len(self.activities)
+        self._analyzed = True
+        return self.enriched_activities
+    
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Analyzer fed from to_columns() output instead of activity dicts.
+
+        Runs the same single pass as analyze(); report() then gives the same
+        payload as StravaInsights(activities).report().
+        """
+        insights = cls([])
+        for distance, moving_time, temp, wind, condition in zip(
+                columns['distance'], columns['moving_time'], columns['temperature'],
+                columns['wind_speed'], columns['condition']):
+            weather = None
+            if condition is None:
+                weather = {}
+                if temp == temp:  # NaN marks a missing value
+                    weather['temperature'] = temp
+                if wind == wind:
+                    weather['wind_speed'] = wind
+                condition = insights.classify_weather(weather)
+            insights._observe(pace_min_per_km(distance, moving_time), weather, condition)
+        insights._count = len(columns['distance'])
+        insights._analyzed = True
+        return insights
@@ -0,0 +1,32 @@
+"""
+Async single-flight: coalesce concurrent identical awaits into one call.
+
+While a call for a key is in flight, later callers await the same task
+instead of starting their own, and all of them get its result (or error).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class AsyncSingleFlight:
+    """Group of in-flight coroutine calls, keyed by request identity"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key across concurrent callers"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Number of keys with a call in progress"""
+        return len(self._tasks)
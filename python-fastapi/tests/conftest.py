@@ -0,0 +1,7 @@
+"""
+Shared test setup: the app modules live one level up, not in a package
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
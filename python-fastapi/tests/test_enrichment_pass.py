@@ -0,0 +1,139 @@
+"""
+Tests for the shared enrichment pass behind GET /enrich (stream and batch)
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app
+from ttl_cache import TTLCache
+
+DIGEST = "export-digest"
+ACTIVITIES = [
+    {"id": i, "start_latlng": [-23.5 - i, -46.6], "start_date": "2025-11-24T06:00:00Z"}
+    for i in range(6)
+]
+
+
+@pytest.fixture
+def weather_api(monkeypatch):
+    """Slow mock OpenWeather; the requests it got, by latitude"""
+    requests = []
+
+    async def handler(request):
+        requests.append(float(request.url.params["lat"]))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"current": {"temp": 20.0}})
+
+    monkeypatch.setattr(app, "OPENWEATHER_KEY", "key")
+    monkeypatch.setattr(app, "enrichment_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(app, "activity_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(app, "enrichment_passes", {})
+    monkeypatch.setattr(app, "enrichments", app.AsyncSingleFlight())
+    monkeypatch.setattr(app.app.state, "weather_cache", None, raising=False)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(app.app.state, "http", client, raising=False)
+    return requests
+
+
+async def read_stream(timeout=5.0):
+    async def lines():
+        return [json.loads(line) async for line in app.stream_enriched_ndjson(DIGEST, ACTIVITIES)]
+
+    # A follower that is never woken would hang the suite
+    return await asyncio.wait_for(lines(), timeout)
+
+
+def follow_stream(received):
+    """A streaming client, as a task appending each line it reads to received"""
+    async def client():
+        async for line in app.stream_enriched_ndjson(DIGEST, ACTIVITIES):
+            received.append(json.loads(line))
+
+    return asyncio.ensure_future(client())
+
+
+def ids(items):
+    return sorted(item["id"] for item in items)
+
+
+def test_concurrent_streams_share_one_pass(weather_api):
+    async def scenario():
+        batch = app.enrich_export(DIGEST, ACTIVITIES)
+        return await asyncio.gather(read_stream(), read_stream(), batch)
+
+    first, second, batch = asyncio.run(scenario())
+
+    assert len(weather_api) == len(ACTIVITIES)
+    assert ids(first) == ids(second) == ids(batch) == list(range(len(ACTIVITIES)))
+    assert all("weather" in item for item in first + second)
+    assert app.enrichment_passes == {}
+
+
+def test_stream_after_the_pass_gets_the_full_result(weather_api):
+    async def scenario():
+        await app.enrich_export(DIGEST, ACTIVITIES)
+        return await read_stream()
+
+    items = asyncio.run(scenario())
+
+    assert ids(items) == list(range(len(ACTIVITIES)))
+    assert len(weather_api) == len(ACTIVITIES)
+
+
+def test_stream_joining_a_finished_call_replays_its_result(weather_api):
+    """Joins after the pass ended but before the single-flight let go of it"""
+    async def scenario():
+        enriched = [dict(activity, weather={"current": {}}) for activity in ACTIVITIES]
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(enriched)
+        app.enrichments._tasks[DIGEST] = done
+        return await read_stream()
+
+    items = asyncio.run(scenario())
+
+    assert ids(items) == list(range(len(ACTIVITIES)))
+    assert weather_api == []
+    assert app.enrichment_passes == {}
+
+
+def test_client_disconnect_does_not_cancel_the_pass(weather_api, monkeypatch):
+    # One lookup at a time, so the client leaves with the pass half done
+    monkeypatch.setattr(app, "WEATHER_CONCURRENCY", 1)
+
+    async def scenario():
+        received = []
+        reader = follow_stream(received)
+        while not received:
+            await asyncio.sleep(0.001)
+        reader.cancel()
+        batch = await app.enrich_export(DIGEST, ACTIVITIES)
+        return received, batch
+
+    received, batch = asyncio.run(scenario())
+
+    assert len(received) < len(ACTIVITIES)
+    assert ids(batch) == list(range(len(ACTIVITIES)))
+    assert len(weather_api) == len(ACTIVITIES)
+    assert app.enrichment_cache.get(DIGEST) == batch
+
+
+def test_cancelled_batch_request_does_not_end_the_stream(weather_api, monkeypatch):
+    monkeypatch.setattr(app, "WEATHER_CONCURRENCY", 1)
+
+    async def scenario():
+        received = []
+        stream = follow_stream(received)
+        batch = asyncio.ensure_future(app.enrich_export(DIGEST, ACTIVITIES))
+        while not received:
+            await asyncio.sleep(0.001)
+        batch.cancel()
+        await asyncio.wait_for(stream, 5.0)
+        return received
+
+    items = asyncio.run(scenario())
+
+    assert ids(items) == list(range(len(ACTIVITIES)))
+    assert len(weather_api) == len(ACTIVITIES)
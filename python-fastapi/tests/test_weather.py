@@ -0,0 +1,91 @@
+"""
+Tests for weather lookups: 429 retries, the Retry-After cap and the counters
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import weather
+from weather import EnrichmentStats, _retry_delay, fetch_weather_for_activity
+
+ACTIVITY = {"id": 1, "start_latlng": [-23.55, -46.63], "start_date": "2025-11-24T06:00:00Z"}
+WEATHER = {"current": {"temp": 21.5}}
+
+
+def responses(*replies):
+    """Mock transport answering with replies in order, and the requests it got"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        status, headers = replies[min(len(requests), len(replies)) - 1]
+        return httpx.Response(status, headers=headers, json=WEATHER if status == 200 else {})
+
+    return httpx.MockTransport(handler), requests
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays the retries waited, without waiting"""
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(weather.asyncio, "sleep", sleep)
+    return delays
+
+
+def lookup(transport, **kwargs):
+    stats = EnrichmentStats()
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await fetch_weather_for_activity(client, ACTIVITY, "key", stats=stats, **kwargs)
+
+    return asyncio.run(scenario()), stats
+
+
+def test_retry_after_is_honoured(sleeps):
+    transport, requests = responses((429, {"Retry-After": "7"}), (200, {}))
+
+    item, stats = lookup(transport, max_retry_delay=30.0)
+
+    assert item["weather"] == WEATHER
+    assert "weather_error" not in item
+    assert len(requests) == 2
+    assert sleeps == [7.0]
+    assert (stats.requested, stats.retries, stats.rate_limited, stats.succeeded) == (1, 1, 1, 1)
+
+
+def test_retry_after_above_the_cap_fails_the_activity(sleeps):
+    transport, requests = responses((429, {"Retry-After": "3600"}), (200, {}))
+
+    item, stats = lookup(transport, max_retry_delay=30.0)
+
+    assert "weather" not in item
+    assert "3600" in item["weather_error"]
+    assert len(requests) == 1
+    assert sleeps == []
+    assert stats.failed == 1
+    assert stats.errors == {"RetryAfterTooLong": 1}
+
+
+def test_exhausted_retries_leave_weather_error(sleeps):
+    transport, requests = responses((429, {}))
+
+    item, stats = lookup(transport, max_retries=2, backoff=0.5, max_retry_delay=30.0)
+
+    assert item["weather_error"] == "HTTP 429"
+    assert len(requests) == 3
+    assert len(sleeps) == 2
+    assert 0.25 <= sleeps[0] <= 0.5 and 0.5 <= sleeps[1] <= 1.0
+    assert (stats.retries, stats.rate_limited, stats.failed) == (2, 3, 1)
+    assert stats.errors == {"HTTP 429": 1}
+
+
+def test_backoff_is_capped_without_retry_after():
+    response = httpx.Response(429, headers={"Retry-After": "soon"})
+
+    assert _retry_delay(response, attempt=10, backoff=1.0, max_delay=5.0) == 5.0
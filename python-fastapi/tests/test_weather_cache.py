@@ -0,0 +1,79 @@
+"""
+Tests for the SQLite weather cache: keys, keep-first writes, flush and counters
+"""
+import sqlite3
+
+import pytest
+
+from weather_cache import WeatherCache
+
+
+@pytest.fixture
+def cache():
+    cache = WeatherCache(":memory:", cell_deg=0.05)
+    yield cache
+    cache.close()
+
+
+def test_key_quantises_to_the_cell_and_utc_hour(cache):
+    key = cache.key(-23.5505, -46.6333, 1763964000)
+
+    # A few hundred metres and minutes away: same cell, same hour
+    assert cache.key(-23.5521, -46.6349, 1763964000 + 1800) == key
+    assert key == (-472, -933, 1763964000 // 3600)
+    # Next hour, or the neighbouring cell
+    assert cache.key(-23.5505, -46.6333, 1763964000 + 3600) != key
+    assert cache.key(-23.5505, -46.5833, 1763964000) != key
+
+
+def test_cell_size_must_be_positive():
+    with pytest.raises(ValueError):
+        WeatherCache(":memory:", cell_deg=0)
+
+
+def test_first_lookup_is_kept(cache):
+    key = cache.key(-23.55, -46.63, 1763964000)
+
+    cache.set(key, {"temp": 21.5})
+    cache.set(key, {"temp": 30.0})
+
+    assert cache.get(key) == {"temp": 21.5}
+    assert len(cache) == 1
+
+
+def test_hits_and_misses_are_counted(cache):
+    key = cache.key(-23.55, -46.63, 1763964000)
+
+    assert cache.get(key) is None
+    cache.set(key, {"temp": 21.5})
+    cache.get(key)
+    cache.get(key)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_writes_are_committed_by_flush(cache):
+    cache.set(cache.key(-23.55, -46.63, 1763964000), {"temp": 21.5})
+    cache.set(cache.key(-22.90, -43.20, 1763964000), {"temp": 27.0})
+
+    assert cache._conn.in_transaction
+    cache.flush()
+    assert not cache._conn.in_transaction
+
+
+def test_flushed_lookups_survive_a_restart(tmp_path):
+    path = str(tmp_path / "weather_cache.db")
+    cache = WeatherCache(path)
+    key = cache.key(-23.55, -46.63, 1763964000)
+    cache.set(key, {"temp": 21.5})
+
+    with sqlite3.connect(path) as other:
+        assert other.execute("SELECT COUNT(*) FROM weather").fetchone()[0] == 0
+    cache.close()
+
+    reopened = WeatherCache(path)
+    assert len(reopened) == 1
+    assert reopened.get(key) == {"temp": 21.5}
+    reopened.close()
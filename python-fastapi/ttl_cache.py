@@ -0,0 +1,52 @@
+"""
+Small in-process TTL cache with LRU eviction.
+
+Used by app.py to keep the backend export payload and derived results
+(enrichment, insights) for a short time, so endpoints hit by the same
+dashboard load share one fetch and one enrichment pass.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Entries expire ttl seconds after being set; the oldest are evicted past maxsize"""
+
+    def __init__(self, ttl: float, maxsize: int = 64, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value if present and fresh, else default"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or self._clock() >= entry[0]:
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value for ttl seconds"""
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
@@ -0,0 +1,235 @@
+"""
+Weather enrichment with bounded concurrency.
+
+A fixed pool of workers pulls activities from a shared index, so at most
+`concurrency` OpenWeather requests are in flight no matter how long the
+history is. Rate-limited responses (429) are retried with exponential
+backoff (honouring Retry-After up to max_retry_delay; a longer wait fails
+that activity instead of stalling its worker), and progress is reported
+as activities complete. iter_enriched_with_weather yields each activity as soon as its
+lookup finishes, for streaming responses. With a WeatherCache, lookups
+are served from disk when the same grid cell and hour was fetched
+before, and concurrent misses for one cell share a single request. Cache
+reads and writes run in a thread, off the event loop, and each run
+commits its writes once at the end.
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from singleflight import AsyncSingleFlight
+from weather_cache import WeatherCache
+
+logger = logging.getLogger(__name__)
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/onecall/timemachine"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class RetryAfterTooLong(Exception):
+    """A 429 asked to wait longer than the configured maximum"""
+
+    def __init__(self, retry_after: float, max_delay: float):
+        super().__init__(f"Retry-After {retry_after:g}s exceeds the {max_delay:g}s maximum")
+        self.retry_after = retry_after
+
+
+@dataclass
+class EnrichmentStats:
+    """Counters for one enrichment run"""
+    total: int = 0
+    requested: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    cached: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def record_error(self, reason: str) -> None:
+        self.failed += 1
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+
+def _retry_delay(response: httpx.Response, attempt: int, backoff: float, max_delay: float) -> float:
+    """
+    Retry-After when the server sends one, else exponential backoff with
+    jitter, never more than max_delay.
+
+    Raises:
+        RetryAfterTooLong: if Retry-After is above max_delay
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            delay = max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+        else:
+            if delay > max_delay:
+                raise RetryAfterTooLong(delay, max_delay)
+            return delay
+    return min(backoff * (2 ** attempt) * random.uniform(0.5, 1.0), max_delay)
+
+
+async def _request_weather(client: httpx.AsyncClient, url: str, params: Dict[str, Any],
+                           max_retries: int, backoff: float, max_retry_delay: float,
+                           stats: EnrichmentStats, cache: Optional[WeatherCache],
+                           key) -> httpx.Response:
+    stats.requested += 1
+    for attempt in range(max_retries + 1):
+        resp = await client.get(url, params=params, timeout=5.0)
+        if resp.status_code != 429 or attempt == max_retries:
+            break
+        stats.rate_limited += 1
+        delay = _retry_delay(resp, attempt, backoff, max_retry_delay)
+        stats.retries += 1
+        await asyncio.sleep(delay)
+
+    if resp.status_code == 200 and cache is not None:
+        await asyncio.to_thread(cache.set, key, resp.json())
+    return resp
+
+
+async def fetch_weather_for_activity(client: httpx.AsyncClient,
+                                     activity: Dict[str, Any],
+                                     api_key: Optional[str],
+                                     url: str = OPENWEATHER_URL,
+                                     max_retries: int = 3,
+                                     backoff: float = 0.5,
+                                     max_retry_delay: float = 30.0,
+                                     stats: Optional[EnrichmentStats] = None,
+                                     cache: Optional[WeatherCache] = None,
+                                     inflight: Optional[AsyncSingleFlight] = None) -> Dict[str, Any]:
+    """Fetch weather for a single activity, returning an annotated copy"""
+    stats = stats if stats is not None else EnrichmentStats()
+    # The backend payload is shared (cache and coalesced requests), so
+    # enrichment works on a copy
+    item = dict(activity)
+    latlng = activity.get("start_latlng")
+
+    if not (latlng and len(latlng) >= 2 and api_key):
+        return item
+
+    lat, lon = latlng[0], latlng[1]
+    ts = activity.get("start_date")
+    try:
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        unix = int(dt.timestamp())
+
+        key = None
+        if cache is not None:
+            key = cache.key(lat, lon, unix)
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                item['weather'] = cached
+                stats.cached += 1
+                stats.succeeded += 1
+                return item
+
+        params = {"lat": lat, "lon": lon, "dt": unix, "appid": api_key, "units": "metric"}
+
+        def request():
+            return _request_weather(client, url, params, max_retries, backoff, max_retry_delay,
+                                    stats, cache, key)
+
+        if inflight is not None and key is not None:
+            resp = await inflight.do(key, request)
+        else:
+            resp = await request()
+
+        if resp.status_code == 200:
+            item['weather'] = resp.json()
+            stats.succeeded += 1
+        else:
+            if resp.status_code == 429:
+                stats.rate_limited += 1
+            item['weather_error'] = f"HTTP {resp.status_code}"
+            stats.record_error(item['weather_error'])
+    except Exception as e:
+        logger.warning(f"Failed to fetch weather: {type(e).__name__}: {e}")
+        item['weather_error'] = str(e)
+        stats.record_error(type(e).__name__)
+
+    return item
+
+
+async def iter_enriched_with_weather(client: httpx.AsyncClient,
+                                     activities: List[Dict[str, Any]],
+                                     api_key: Optional[str],
+                                     concurrency: int = 10,
+                                     url: str = OPENWEATHER_URL,
+                                     max_retries: int = 3,
+                                     backoff: float = 0.5,
+                                     max_retry_delay: float = 30.0,
+                                     on_progress: Optional[ProgressCallback] = None,
+                                     stats: Optional[EnrichmentStats] = None,
+                                     cache: Optional[WeatherCache] = None
+                                     ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (input index, enriched activity) as each weather lookup finishes.
+
+    At most `concurrency` lookups run at a time. on_progress(done, total) is
+    called per activity; progress is also logged roughly every 10%. Closing
+    the iterator early cancels the remaining lookups.
+    """
+    total = len(activities)
+    stats = stats if stats is not None else EnrichmentStats()
+    stats.total += total
+    finished: "asyncio.Queue[Tuple[int, Dict[str, Any]]]" = asyncio.Queue()
+    inflight = AsyncSingleFlight() if cache is not None else None
+    next_index = 0
+    log_every = max(total // 10, 1)
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            try:
+                item = await fetch_weather_for_activity(
+                    client, activities[i], api_key, url=url,
+                    max_retries=max_retries, backoff=backoff,
+                    max_retry_delay=max_retry_delay, stats=stats,
+                    cache=cache, inflight=inflight
+                )
+            except Exception as e:
+                item = dict(activities[i], weather_error=str(e))
+            finished.put_nowait((i, item))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(max(concurrency, 1), total))]
+    try:
+        for done in range(1, total + 1):
+            index, item = await finished.get()
+            if on_progress is not None:
+                on_progress(done, total)
+            if done % log_every == 0 or done == total:
+                logger.info(f"Weather enrichment: {done}/{total}")
+            yield index, item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if cache is not None:
+            await asyncio.to_thread(cache.flush)
+
+
+async def enrich_with_weather(client: httpx.AsyncClient,
+                              activities: List[Dict[str, Any]],
+                              api_key: Optional[str],
+                              **kwargs) -> List[Dict[str, Any]]:
+    """
+    Enrich activities with weather, returning them in input order.
+
+    Takes the same keyword arguments as iter_enriched_with_weather.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(activities)
+    async for index, item in iter_enriched_with_weather(client, activities, api_key, **kwargs):
+        results[index] = item
+    return results
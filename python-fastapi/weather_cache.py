@@ -0,0 +1,106 @@
+"""
+Persistent cache of historical weather lookups (SQLite).
+
+Historical weather never changes, so OpenWeather timemachine responses are
+stored on disk keyed by a lat/lon grid cell and the UTC hour. Repeated runs
+and nearby activities (same loop, same morning) reuse one lookup. The cell
+size is configurable; 0.05 degrees is roughly 5 km of latitude.
+
+The methods block on SQLite, so async callers run them in a thread
+(asyncio.to_thread). Writes are committed by flush(), once per enrichment
+run, rather than per lookup.
+"""
+import json
+import math
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+CacheKey = Tuple[int, int, int]
+
+
+class WeatherCache:
+    """SQLite-backed weather cache with hit/miss counters"""
+
+    def __init__(self, path: str, cell_deg: float = 0.05):
+        """
+        Args:
+            path: SQLite file (":memory:" for a process-local cache)
+            cell_deg: Grid cell size in degrees for lat and lon
+        """
+        if cell_deg <= 0:
+            raise ValueError("cell_deg must be positive")
+        self.path = path
+        self.cell_deg = cell_deg
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS weather ("
+            " cell_deg REAL NOT NULL, lat_cell INTEGER NOT NULL, lon_cell INTEGER NOT NULL,"
+            " hour INTEGER NOT NULL, payload TEXT NOT NULL, stored_at REAL NOT NULL,"
+            " PRIMARY KEY (cell_deg, lat_cell, lon_cell, hour))"
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM weather").fetchone()[0]
+
+    def key(self, lat: float, lon: float, timestamp: int) -> CacheKey:
+        """Grid cell of (lat, lon) plus the UTC hour of timestamp"""
+        return (
+            math.floor(lat / self.cell_deg),
+            math.floor(lon / self.cell_deg),
+            int(timestamp) // 3600,
+        )
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Cached payload for key, or None (counts a hit or a miss)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM weather WHERE cell_deg = ? AND lat_cell = ? AND lon_cell = ? AND hour = ?",
+                (self.cell_deg, *key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: CacheKey, payload: Any) -> None:
+        """Store a successful lookup (committed by the next flush)"""
+        with self._lock:
+            # Weather for a cell and hour never changes: keep the first lookup
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO weather VALUES (?, ?, ?, ?, ?, ?)",
+                (self.cell_deg, *key, json.dumps(payload), time.time())
+            ).rowcount
+            self._entries += inserted
+            self._pending += inserted
+
+    def flush(self) -> None:
+        """Commit the lookups stored since the last flush"""
+        with self._lock:
+            if self._pending:
+                self._conn.commit()
+                self._pending = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "cell_deg": self.cell_deg,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
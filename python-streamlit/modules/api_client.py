@@ -3,9 +3,10 @@ API Client Module
 Comunicação com Spring Boot e FastAPI
 """
 
+import json
 import requests
 import streamlit as st
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional
 import logging
 from config import STRAVA_API_URL, FASTAPI_URL, REQUEST_TIMEOUT
 
@@ -70,22 +71,74 @@ class StravaAPIClient:
             st.error(f"Erro ao buscar atividades: {str(e)}")
             return []
     
-    def enrich_activities(self, activities: List[Dict]) -> List[Dict]:
-        """Enriquece atividades com dados de weather"""
+    def iter_enriched_activities(self, activities: List[Dict]) -> Iterator[Dict[str, Any]]:
+        """
+        Atividades enriquecidas em streaming (NDJSON do FastAPI)
+
+        Envia as atividades no corpo do POST, sem o FastAPI buscá-las de novo
+        no backend. As já enriquecidas antes (em cache no servidor) chegam
+        primeiro; as demais assim que o clima delas é buscado, na ordem de
+        conclusão (não na ordem original).
+        """
+        with requests.post(
+            f"{self.fastapi_url}/enrich",
+            params={"stream": "true"},
+            json={"activities": activities},
+            stream=True,
+            timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
+    def _cached_enrichments(self, ids: List[int]) -> Dict[str, Any]:
+        """Atividades que o FastAPI já enriqueceu, por id ({"activities", "missing"})"""
+        response = requests.post(
+            f"{self.fastapi_url}/enrich",
+            json={"ids": ids},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def enrich_activities(self, activities: List[Dict],
+                          on_row: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        Enriquece atividades com dados de weather
+        
+        Primeiro pede ao FastAPI só os ids (delta): as atividades já
+        enriquecidas voltam do cache dele. Só as que faltam são enviadas
+        completas, consumindo o stream incrementalmente. on_row é chamado a
+        cada atividade recebida (ex: para atualizar progresso e tabela na
+        página). O resultado segue a ordem original.
+        """
         if not activities:
             return []
         
         try:
-            payload = {"activities": activities}
-            response = requests.post(
-                f"{self.fastapi_url}/enrich",
-                json=payload,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            enriched = response.json().get("activities", activities)
-            logger.info(f"Enriquecidas {len(enriched)} atividades")
-            return enriched
+            ids = [a["id"] for a in activities if a.get("id") is not None]
+            by_id = {}
+            if ids:
+                for row in self._cached_enrichments(ids)["activities"]:
+                    by_id[row["id"]] = row
+                    if on_row is not None:
+                        on_row(row)
+            
+            pending = [a for a in activities if a.get("id") not in by_id]
+            extra = []
+            if pending:
+                for row in self.iter_enriched_activities(pending):
+                    if row.get("id") is None:
+                        extra.append(row)
+                    else:
+                        by_id[row["id"]] = row
+                    if on_row is not None:
+                        on_row(row)
+            
+            enriched = [by_id[a["id"]] for a in activities if a.get("id") in by_id] + extra
+            logger.info(f"Enriquecidas {len(enriched)} atividades ({len(activities) - len(pending)} do cache)")
+            return enriched or activities
         except requests.exceptions.ConnectionError:
             st.warning("⚠️ FastAPI não está rodando (porta 8000)")
             return activities
@@ -95,17 +148,30 @@ class StravaAPIClient:
             return activities
     
     def get_insights(self, activities: List[Dict]) -> Dict[str, Any]:
-        """Gera insights das atividades"""
+        """
+        Gera insights das atividades
+        
+        Envia só os ids quando todas têm id; se o FastAPI não conhece algum
+        (409), reenvia as atividades completas.
+        """
         if not activities:
             return {}
         
         try:
-            payload = {"activities": activities}
-            response = requests.post(
-                f"{self.fastapi_url}/insights",
-                json=payload,
-                timeout=self.timeout
-            )
+            ids = [a.get("id") for a in activities]
+            response = None
+            if all(i is not None for i in ids):
+                response = requests.post(
+                    f"{self.fastapi_url}/insights",
+                    json={"ids": ids},
+                    timeout=self.timeout
+                )
+            if response is None or response.status_code == 409:
+                response = requests.post(
+                    f"{self.fastapi_url}/insights",
+                    json={"activities": activities},
+                    timeout=self.timeout
+                )
             response.raise_for_status()
             insights = response.json()
             logger.info("Insights gerados com sucesso")
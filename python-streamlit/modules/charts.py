@@ -5,25 +5,23 @@ Gráficos interativos com Plotly
 
 import plotly.graph_objects as go
 import plotly.express as px
-import pandas as pd
-from typing import List, Dict, Any
+from typing import Dict
 import logging
+from modules.frames import Activities, as_frame
 
 logger = logging.getLogger(__name__)
 
-def plot_activities_per_month(activities: List[Dict]) -> go.Figure:
+def plot_activities_per_month(activities: Activities) -> go.Figure:
     """Gráfico de atividades por mês"""
-    if not activities:
+    df = as_frame(activities)
+    if df.empty:
         return empty_chart("Nenhuma atividade")
     
     try:
-        df = pd.DataFrame(activities)
-        if 'start_date' not in df.columns:
+        if 'start_dt' not in df.columns:
             return empty_chart("Sem dados de data")
         
-        df['start_date'] = pd.to_datetime(df['start_date'])
-        df['month'] = df['start_date'].dt.to_period('M')
-        monthly = df.groupby('month').size()
+        monthly = df.groupby(df['start_dt'].dt.to_period('M')).size()
         
         fig = px.bar(
             x=monthly.index.astype(str),
@@ -37,20 +35,17 @@ def plot_activities_per_month(activities: List[Dict]) -> go.Figure:
         logger.error(f"Erro ao plotar atividades por mês: {e}")
         return empty_chart(f"Erro: {str(e)}")
 
-def plot_pace_vs_temperature(activities: List[Dict]) -> go.Figure:
+def plot_pace_vs_temperature(activities: Activities) -> go.Figure:
     """Scatter: Pace vs Temperatura"""
-    if not activities:
+    df = as_frame(activities)
+    if df.empty:
         return empty_chart("Nenhuma atividade")
     
     try:
-        df = pd.DataFrame(activities)
-        
-        # Filtrar dados válidos
-        if 'distance' not in df.columns or 'moving_time' not in df.columns:
+        # Filtrar dados válidos (pace em min/km já vem do frame)
+        if 'pace' not in df.columns:
             return empty_chart("Sem dados de distância/tempo")
         
-        df['pace'] = (df['moving_time'] / 60) / (df['distance'] / 1000)  # min/km
-        
         # Tentar obter temperatura do weather se enriquecido
         if 'weather_temperature' in df.columns:
             fig = px.scatter(
@@ -131,13 +126,13 @@ def plot_wind_impact(insights: Dict) -> go.Figure:
         logger.error(f"Erro ao plotar impacto do vento: {e}")
         return empty_chart(f"Erro: {str(e)}")
 
-def plot_metric_cards(activities: List[Dict]) -> tuple:
+def plot_metric_cards(activities: Activities) -> tuple:
     """Retorna métricas para cards (total_activities, total_distance, total_time)"""
-    if not activities:
+    df = as_frame(activities)
+    if df.empty:
         return 0, 0, 0
     
     try:
-        df = pd.DataFrame(activities)
         total_activities = len(df)
         total_distance = df['distance'].sum() / 1000  # converter para km
         total_time = df['moving_time'].sum() / 3600  # converter para horas
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 import pandas as pd
 from config import ACTIVITY_TYPES, WEATHER_CONDITIONS
+from modules.frames import Activities, as_frame
 
 def filter_by_sport() -> List[str]:
     """Widget para filtrar por tipo de esporte"""
@@ -69,8 +70,8 @@ def filter_by_pace_range() -> Tuple[float, float]:
     
     return min_pace, max_pace
 
-def search_activity(activities: List[Dict]) -> List[Dict]:
-    """Widget para buscar atividade por nome"""
+def search_activity(activities: Activities) -> Activities:
+    """Widget para buscar atividade por nome (devolve o mesmo tipo recebido)"""
     search_term = st.text_input(
         "🔍 Buscar por nome da atividade",
         key="search_filter"
@@ -79,59 +80,67 @@ def search_activity(activities: List[Dict]) -> List[Dict]:
     if not search_term:
         return activities
     
-    df = pd.DataFrame(activities)
+    df = as_frame(activities)
     if 'name' not in df.columns:
         return activities
     
     filtered = df[df['name'].str.contains(search_term, case=False, na=False)]
-    return filtered.to_dict('records')
+    if isinstance(activities, pd.DataFrame):
+        return filtered
+    return filtered.drop(columns=['start_dt'], errors='ignore').to_dict('records')
 
 def apply_filters(
-    activities: List[Dict],
+    activities: Activities,
     sport_types: List[str] = None,
     start_date: datetime = None,
     end_date: datetime = None,
     weather_conditions: List[str] = None,
     pace_min: float = None,
     pace_max: float = None
-) -> List[Dict]:
+) -> Activities:
     """
     Aplica múltiplos filtros nas atividades
+
+    Com um DataFrame (ver modules.frames) os filtros viram uma única máscara
+    booleana e o resultado é um DataFrame; com lista, devolve lista de dicts.
     """
-    if not activities:
-        return []
+    df = as_frame(activities)
+    if df.empty:
+        return df if isinstance(activities, pd.DataFrame) else []
     
-    df = pd.DataFrame(activities)
+    mask = pd.Series(True, index=df.index)
     
     # Filtro por tipo de esporte
     if sport_types:
         if 'type' in df.columns:
-            df = df[df['type'].isin(sport_types)]
+            mask &= df['type'].isin(sport_types)
     
     # Filtro por data
     if start_date or end_date:
-        if 'start_date' in df.columns:
-            df['start_date'] = pd.to_datetime(df['start_date'])
+        if 'start_dt' in df.columns:
+            dates = df['start_dt'].dt.date
             if start_date:
-                df = df[df['start_date'].dt.date >= start_date]
+                mask &= dates >= start_date
             if end_date:
-                df = df[df['start_date'].dt.date <= end_date]
+                mask &= dates <= end_date
     
     # Filtro por condição climática
     if weather_conditions:
         if 'weather_condition' in df.columns:
-            df = df[df['weather_condition'].isin(weather_conditions)]
+            mask &= df['weather_condition'].isin(weather_conditions)
     
     # Filtro por pace
     if pace_min is not None or pace_max is not None:
-        if 'distance' in df.columns and 'moving_time' in df.columns:
-            df['pace'] = (df['moving_time'] / 60) / (df['distance'] / 1000)
+        if 'pace' in df.columns:
             if pace_min is not None:
-                df = df[df['pace'] >= pace_min]
+                mask &= df['pace'] >= pace_min
             if pace_max is not None:
-                df = df[df['pace'] <= pace_max]
+                mask &= df['pace'] <= pace_max
     
-    return df.to_dict('records')
+    filtered = df[mask]
+    if isinstance(activities, pd.DataFrame):
+        return filtered
+    return filtered.drop(columns=['start_dt'], errors='ignore').to_dict('records')
 
 def create_filter_panel() -> Dict[str, Any]:
     """Cria painel com todos os filtros e retorna configuração"""
@@ -0,0 +1,58 @@
+"""
+Frames Module
+DataFrame de atividades construído uma vez por sessão
+"""
+
+import streamlit as st
+import pandas as pd
+from typing import List, Dict, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+Activities = Union[List[Dict], pd.DataFrame]
+
+
+def build_activities_frame(activities: List[Dict]) -> pd.DataFrame:
+    """
+    Converte a lista de atividades em DataFrame com colunas derivadas
+
+    Além das colunas originais, adiciona:
+    - start_dt: start_date já convertido para datetime
+    - pace: min/km (moving_time / distance)
+    """
+    df = pd.DataFrame(activities)
+    if df.empty:
+        return df
+
+    if 'start_date' in df.columns:
+        df['start_dt'] = pd.to_datetime(df['start_date'])
+    if 'distance' in df.columns and 'moving_time' in df.columns:
+        df['pace'] = (df['moving_time'] / 60) / (df['distance'] / 1000)
+    return df
+
+
+def as_frame(activities: Activities) -> pd.DataFrame:
+    """Aceita lista de dicts ou um DataFrame já montado (sem copiar)"""
+    if isinstance(activities, pd.DataFrame):
+        return activities
+    return build_activities_frame(activities or [])
+
+
+def get_activities_frame(key: str = 'activities') -> pd.DataFrame:
+    """
+    DataFrame das atividades em st.session_state[key]
+
+    Construído na primeira chamada e reaproveitado entre reruns e páginas
+    enquanto a lista em session_state for a mesma.
+    """
+    activities = st.session_state.get(key) or []
+    cache_key = f"_{key}_frame"
+    cached = st.session_state.get(cache_key)
+    if cached is not None and cached[0] is activities:
+        return cached[1]
+
+    frame = build_activities_frame(activities)
+    st.session_state[cache_key] = (activities, frame)
+    logger.info(f"DataFrame de {len(frame)} atividades montado")
+    return frame
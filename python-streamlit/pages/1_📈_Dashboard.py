@@ -12,6 +12,7 @@ from modules.charts import (
     empty_chart,
     create_summary_chart
 )
+from modules.frames import get_activities_frame
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,9 +46,12 @@ if not st.session_state.activities:
         else:
             st.error("❌ Erro ao buscar atividades")
 
+# DataFrame montado uma vez e compartilhado por métricas e gráficos
+activities_df = get_activities_frame()
+
 # Calcular métricas
-if st.session_state.activities:
-    total_activities, total_distance, total_hours = plot_metric_cards(st.session_state.activities)
+if not activities_df.empty:
+    total_activities, total_distance, total_hours = plot_metric_cards(activities_df)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -86,9 +90,9 @@ if st.session_state.activities:
 st.markdown("---")
 st.subheader("📈 Atividades por Período")
 
-if st.session_state.activities:
+if not activities_df.empty:
     # Gráfico de atividades por mês
-    fig = plot_activities_per_month(st.session_state.activities)
+    fig = plot_activities_per_month(activities_df)
     st.plotly_chart(fig, use_container_width=True)
 else:
     st.info("Nenhuma atividade carregada")
@@ -139,9 +143,23 @@ with col1:
 with col2:
     if st.button("💡 Gerar Insights", use_container_width=True):
         if st.session_state.activities:
-            with st.spinner("Enriquecendo atividades..."):
-                enriched = api_client.enrich_activities(st.session_state.activities)
-                st.session_state.enriched_activities = enriched
+            # Linhas aparecem conforme o clima de cada atividade chega
+            total = len(st.session_state.activities)
+            progress = st.progress(0.0, text="Enriquecendo atividades...")
+            preview = st.empty()
+            rows = []
+            
+            def on_row(row):
+                rows.append(row)
+                progress.progress(min(len(rows) / total, 1.0),
+                                  text=f"Enriquecendo atividades... {len(rows)}/{total}")
+                if len(rows) == 1 or len(rows) % 25 == 0:
+                    preview.dataframe(pd.DataFrame(rows[-25:]), use_container_width=True, hide_index=True)
+            
+            enriched = api_client.enrich_activities(st.session_state.activities, on_row=on_row)
+            st.session_state.enriched_activities = enriched
+            progress.empty()
+            preview.empty()
             
             with st.spinner("Gerando insights..."):
                 insights = api_client.get_insights(enriched)
@@ -4,7 +4,6 @@ Análise detalhada com gráficos interativos
 """
 
 import streamlit as st
-import pandas as pd
 from modules.api_client import get_api_client
 from modules.charts import (
     plot_pace_vs_temperature,
@@ -13,6 +12,7 @@ from modules.charts import (
     empty_chart
 )
 from modules.filters import apply_filters, create_filter_panel
+from modules.frames import get_activities_frame
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,7 +58,7 @@ if not st.session_state.insights and st.session_state.activities:
 filter_config = create_filter_panel()
 
 filtered_activities = apply_filters(
-    st.session_state.activities,
+    get_activities_frame(),
     sport_types=filter_config['sports'] if filter_config['sports'] else None,
     start_date=filter_config['start_date'],
     end_date=filter_config['end_date'],
@@ -126,17 +126,13 @@ with tab3:
 
 with tab4:
     st.subheader("Dados Detalhados")
-    if filtered_activities:
-        df = pd.DataFrame(filtered_activities)
+    if not filtered_activities.empty:
+        df = filtered_activities
         
-        # Selecionar colunas para exibir
-        display_cols = ['name', 'type', 'distance', 'moving_time', 'start_date']
+        # Selecionar colunas para exibir (pace já vem do frame)
+        display_cols = ['name', 'type', 'distance', 'moving_time', 'start_date', 'pace']
         available_cols = [col for col in display_cols if col in df.columns]
         
-        if 'pace' not in df.columns and 'distance' in df.columns and 'moving_time' in df.columns:
-            df['pace'] = (df['moving_time'] / 60) / (df['distance'] / 1000)
-            available_cols.append('pace')
-        
         # Exibir tabela
         st.dataframe(
             df[available_cols],
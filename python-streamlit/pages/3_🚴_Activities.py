@@ -4,9 +4,9 @@ Lista de atividades com filtros e exportação
 """
 
 import streamlit as st
-import pandas as pd
 from modules.api_client import get_api_client
 from modules.filters import search_activity, apply_filters, create_filter_panel
+from modules.frames import get_activities_frame
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,7 +47,7 @@ search_term = st.text_input("🔍 Buscar por nome", key="activities_search")
 # Aplicar filtros
 filter_config = create_filter_panel()
 
-activities = st.session_state.activities
+activities = get_activities_frame()
 
 # Aplicar busca de texto
 if search_term:
@@ -72,8 +72,8 @@ st.info(f"📊 Mostrando {len(activities)} de {len(st.session_state.activities)}
 
 st.subheader("📋 Tabela de Atividades")
 
-if activities:
-    df = pd.DataFrame(activities)
+if not activities.empty:
+    df = activities
     
     # Preparar colunas para exibição
     display_cols = []
@@ -85,10 +85,8 @@ if activities:
         display_cols.append('type')
     if 'distance' in df.columns:
         display_cols.append('distance')
-        df['distance_km'] = df['distance'] / 1000
     if 'moving_time' in df.columns:
         display_cols.append('moving_time')
-        df['duration_min'] = df['moving_time'] / 60
     if 'start_date' in df.columns:
         display_cols.append('start_date')
     
@@ -98,9 +96,9 @@ if activities:
     if 'weather_condition' in df.columns:
         display_cols.append('weather_condition')
     
-    # Criar colunas calculadas
-    if 'distance' in df.columns and 'moving_time' in df.columns:
-        df['pace_min_km'] = (df['moving_time'] / 60) / (df['distance'] / 1000)
+    # Pace calculado uma vez no frame; renomeado só na exibição
+    if 'pace' in df.columns:
+        df = df.rename(columns={'pace': 'pace_min_km'})
         display_cols.append('pace_min_km')
     
     # Exibir tabela